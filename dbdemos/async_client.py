@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import urllib
+
+from .conf import Conf, DBClient
+from .rate_limiter import RateLimiter
+from .retry_policy import RetryPolicy, get_endpoint_family
+
+
+class AsyncDBClient():
+    """Asyncio counterpart of DBClient, used by the bundler/packager to run hundreds of concurrent lightweight calls
+    from a single thread. Same path cleaning, json results, retry policy and rate limits as DBClient.
+    The number of calls in flight is bounded by max_concurrency to keep the memory bounded.
+
+    Requires aiohttp (only needed to build the bundles, not to install the demos):
+        async with AsyncDBClient(conf) as db:
+            r = await db.get("2.0/workspace/list", {"path": "/"})
+    """
+    def __init__(self, conf: Conf, max_concurrency: int = 100, retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None):
+        self.conf = conf
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self._session = None
+        self._semaphore = None
+
+    clean_path = DBClient.clean_path
+
+    async def __aenter__(self):
+        self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_session(self):
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("AsyncDBClient requires aiohttp. Please install it with: pip install aiohttp")
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60),
+                                                  headers={'Accept-Encoding': 'gzip, deflate'})
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def clean_params(params: dict):
+        #aiohttp only accepts str/int/float query parameters, requests drops the None values and sends bool as True/False.
+        if params is None:
+            return None
+        return {k: str(v) if isinstance(v, bool) else v for k, v in params.items() if v is not None}
+
+    async def request(self, method: str, path: str, print_auth_error = True, read_body = None, **kwargs):
+        """read_body(response) is awaited to read the successful responses instead of the json result (ex: streamed downloads)."""
+        import aiohttp
+        path = self.clean_path(path)
+        url = self.conf.workspace_url+"/api/"+path
+        family = get_endpoint_family(path)
+        self.retry_policy.stats.record_call(family)
+        session = self.get_session()
+        if "params" in kwargs:
+            kwargs["params"] = self.clean_params(kwargs["params"])
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.rate_limiter.reserve(family))
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, headers=self.conf.headers, **kwargs) as r:
+                        if read_body is not None and r.status < 400:
+                            return await read_body(r)
+                        status, text, retry_after = r.status, await r.text(), r.headers.get("Retry-After")
+                error_code = self.get_error_code(status, text)
+                if self.retry_policy.is_done_on_replay(family, attempt, error_code):
+                    return {}
+                if not self.retry_policy.should_retry(method, family, attempt, status, error_code, kwargs.get("json")):
+                    return self.get_json_result(url, status, text, print_auth_error)
+                throttled = self.retry_policy.is_throttled(status, error_code)
+                wait_time = self.retry_policy.get_delay(attempt, retry_after, throttled)
+                reason = f"{status} {error_code or ''}".strip()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                if attempt >= self.retry_policy.get_budget(family) or not self.retry_policy.is_idempotent(method, family, kwargs.get("json")):
+                    raise e
+                throttled = False
+                wait_time = self.retry_policy.get_delay(attempt)
+                reason = type(e).__name__
+            if throttled:
+                print(f'WARN: hitting api request limit 429 error: {path}. Sleeping {wait_time:.1f}sec and retrying...')
+            else:
+                print(f'WARN: transient error {reason} on {method} {path}. Sleeping {wait_time:.1f}sec and retrying...')
+            self.retry_policy.stats.record_retry(family, wait_time, throttled)
+            await asyncio.sleep(wait_time)
+            attempt += 1
+
+    async def post(self, path: str, json: dict = {}):
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path: str, json: dict = None):
+        return await self.request("PUT", path, json=json)
+
+    async def patch(self, path: str, json: dict = {}):
+        return await self.request("PATCH", path, json=json)
+
+    async def get(self, path: str, params: dict = {}, print_auth_error = True):
+        return await self.request("GET", path, print_auth_error, params=params)
+
+    async def delete(self, path: str, params: dict = {}):
+        return await self.request("DELETE", path, params=params)
+
+    async def download(self, path: str, params: dict, destination, chunk_size: int = 1024*1024):
+        """Same as DBClient.download. The chunks are written as they're received, overlapping network and disk I/O.
+        File writes run in the default executor, not to block the event loop (a file object destination is written directly: in-memory buffer)."""
+        async def write(r):
+            if not isinstance(destination, str):
+                destination.seek(0)
+                destination.truncate()
+                async for chunk in r.content.iter_chunked(chunk_size):
+                    destination.write(chunk)
+                return {}
+            loop = asyncio.get_running_loop()
+            f = await loop.run_in_executor(None, open, destination+".part", "wb")
+            try:
+                async for chunk in r.content.iter_chunked(chunk_size):
+                    await loop.run_in_executor(None, f.write, chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+            await loop.run_in_executor(None, os.replace, destination+".part", destination)
+            return {}
+        return await self.request("GET", path, read_body=write, params={**params, "direct_download": True})
+
+    def get_error_code(self, status: int, text: str):
+        if status < 400:
+            return None
+        try:
+            body = json.loads(text)
+            return body.get("error_code") if isinstance(body, dict) else None
+        except Exception:
+            return None
+
+    def get_json_result(self, url: str, status: int, text: str, print_auth_error = True):
+        if status == 403:
+            if print_auth_error:
+                print(f"Unauthorized call. Check your PAT token {text} - {url}")
+        try:
+            return json.loads(text)
+        except Exception as e:
+            print(f"API CALL ERROR - can't read json. status: {status} {text} - URL: {url} - {e}")
+            raise e
+
+    async def find_job(self, name, offset = 0, limit = 25):
+        r = await self.get("2.1/jobs/list", {"limit": limit, "offset": offset, "name": urllib.parse.quote_plus(name)})
+        if 'jobs' in r:
+            for job in r['jobs']:
+                if job["settings"]["name"] == name:
+                    return job
+            if r['has_more']:
+                return await self.find_job(name, offset+limit, limit)
+        return None
@@ -0,0 +1,80 @@
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+from . import package_resources
+
+
+class BundleStore:
+    """Resources of the bundles, as shipped in the package.
+    The content of each bundle folder (bundles/<demo>/install_package, bundles/_shared/objects) is compressed in a single zip
+    archive next to it (bundles/<demo>/install_package.zip): the raw folders stay in the source tree for the incremental
+    packaging and the website, but aren't part of the package.
+    Archives are opened once and each file is decompressed on demand. Resources without archive (older packages, local
+    development) are read from the package folder."""
+    EXTENSION = ".zip"
+
+    def __init__(self, package: str = "dbdemos"):
+        self.package = package
+        #archive resource path => ZipFile, None if the folder isn't archived
+        self.archives = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def write_archive(folder_path: str):
+        """Compress the folder content in <folder>.zip (removed if the folder doesn't exist)."""
+        archive_path = folder_path + BundleStore.EXTENSION
+        if not os.path.isdir(folder_path):
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            return
+        with zipfile.ZipFile(archive_path + ".part", "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for root, folders, files in os.walk(folder_path):
+                folders.sort()
+                for file in sorted(files):
+                    path = Path(root, file)
+                    archive.write(path, path.relative_to(folder_path).as_posix())
+        os.replace(archive_path + ".part", archive_path)
+
+    @staticmethod
+    def split_path(path: str):
+        """(archive resource path, path in the archive) of a resource, (None, None) if it can't be archived."""
+        parts = path.strip("/").split("/", 3)
+        if len(parts) < 4 or parts[0] != "bundles":
+            return None, None
+        return "/".join(parts[:3]) + BundleStore.EXTENSION, parts[3]
+
+    def get_archive(self, archive_path: str):
+        with self._lock:
+            if archive_path not in self.archives:
+                archive = None
+                if package_resources.resource_exists(archive_path, self.package):
+                    archive = zipfile.ZipFile(package_resources.resource_stream(archive_path, self.package))
+                self.archives[archive_path] = archive
+            return self.archives[archive_path]
+
+    def read(self, path: str) -> bytes:
+        archive_path, member = BundleStore.split_path(path)
+        archive = self.get_archive(archive_path) if archive_path is not None else None
+        if archive is None:
+            return package_resources.resource_string(path, self.package)
+        try:
+            return archive.read(member)
+        except KeyError:
+            raise FileNotFoundError(f"{member} not found in {archive_path}")
+
+    def isdir(self, path: str) -> bool:
+        archive_path, member = BundleStore.split_path(path)
+        archive = self.get_archive(archive_path) if archive_path is not None else None
+        if archive is None:
+            return package_resources.resource_isdir(path, self.package)
+        prefix = member.rstrip("/") + "/"
+        return any(name.startswith(prefix) for name in archive.namelist())
+
+    def close(self):
+        with self._lock:
+            for archive in self.archives.values():
+                if archive is not None:
+                    archive.close()
+            self.archives = {}
@@ -1,4 +1,6 @@
+import contextlib
 import json
+import os
 from pathlib import Path
 from typing import List
 import requests
@@ -6,8 +8,13 @@ import urllib
 from datetime import date
 import re
 import threading
+import time
 
 from requests import Response
+from requests.adapters import HTTPAdapter
+
+from .retry_policy import RetryPolicy, get_endpoint_family
+from .rate_limiter import RateLimiter
 
 
 def merge_dict(a, b, path=None, override = True):
@@ -70,8 +77,51 @@ class Conf():
                 self.org_id in ["5206439413157315", "984752964297111", "local", "1444828305810485", "2556758628403379"]
 
 class DBClient():
-    def __init__(self, conf: Conf):
+    #Sized to the largest ThreadPoolExecutor hitting the workspace API (packager/bundler use 10 workers).
+    DEFAULT_POOL_SIZE = 10
+
+    def __init__(self, conf: Conf, pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True, retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None, max_concurrency: int = None):
         self.conf = conf
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        #Shared by all the threads using this client: throttles the fragile endpoints only.
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._last_call = threading.local()
+        self._concurrency = None
+        if max_concurrency is not None:
+            self.set_max_concurrency(max_concurrency)
+
+    def set_max_concurrency(self, max_concurrency: int):
+        """Cap the number of calls in flight across all the threads using this client (ex: several demos installed in parallel).
+        The connection pool is resized to the cap so that every call in flight can keep its connection alive."""
+        self._concurrency = threading.BoundedSemaphore(max_concurrency)
+        if max_concurrency > self.pool_size:
+            self.pool_size = max_concurrency
+            self.close()
+
+    def get_session(self) -> requests.Session:
+        """Return the pooled session shared by all the threads using this client (created on first call)."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update({'Accept-Encoding': 'gzip, deflate',
+                                            'Connection': 'keep-alive' if self.keep_alive else 'close'})
+                    self._session = session
+        return self._session
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
     def clean_path(self, path):
         if path.startswith("http"):
@@ -82,45 +132,100 @@ class DBClient():
             path = path[len("api/"):]
         return path
 
-    def post(self, path: str, json: dict = {}, retry = 0):
-        url = self.conf.workspace_url+"/api/"+self.clean_path(path)
-        with requests.post(url, headers = self.conf.headers, json=json, timeout=60) as r:
-            if r.status_code == 429 and retry < 2:
-                import time
-                import random
-                wait_time = 15 * (retry+1) + random.randint(2*retry, 10*retry)
-                print(f'WARN: hitting api request limit 429 error: {path}. Sleeping {wait_time}sec and retrying...')
-                time.sleep(wait_time)
-                print('Retrying call.')
-                return self.post(path, json, retry+1)
+    def request(self, method: str, path: str, print_auth_error = True, read_body = None, **kwargs):
+        """Send the call through the pooled session, retrying throttled/transient errors following the retry policy.
+        read_body(response) reads the successful responses instead of the json result (ex: streamed downloads)."""
+        path = self.clean_path(path)
+        url = self.conf.workspace_url+"/api/"+path
+        family = get_endpoint_family(path)
+        self.retry_policy.stats.record_call(family)
+        self._last_call.throttled = False
+        self._last_call.status = None
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(family)
+            try:
+                with self._concurrency or contextlib.nullcontext(), \
+                     self.get_session().request(method, url, headers = self.conf.headers, timeout=60, **kwargs) as r:
+                    error_code = self.get_error_code(r)
+                    self._last_call.status = r.status_code
+                    if self.retry_policy.is_done_on_replay(family, attempt, error_code):
+                        return {}
+                    if not self.retry_policy.should_retry(method, family, attempt, r.status_code, error_code, kwargs.get("json")):
+                        if read_body is not None and r.status_code < 400:
+                            return read_body(r)
+                        return self.get_json_result(url, r, print_auth_error)
+                    throttled = self.retry_policy.is_throttled(r.status_code, error_code)
+                    wait_time = self.retry_policy.get_delay(attempt, r.headers.get("Retry-After"), throttled)
+                    reason = f"{r.status_code} {error_code or ''}".strip()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if not self.retry_policy.should_retry_exception(method, family, attempt, e, kwargs.get("json")):
+                    raise e
+                throttled = False
+                wait_time = self.retry_policy.get_delay(attempt)
+                reason = type(e).__name__
+            if throttled:
+                print(f'WARN: hitting api request limit 429 error: {path}. Sleeping {wait_time:.1f}sec and retrying...')
             else:
-                return self.get_json_result(url, r)
+                print(f'WARN: transient error {reason} on {method} {path}. Sleeping {wait_time:.1f}sec and retrying...')
+            self.retry_policy.stats.record_retry(family, wait_time, throttled)
+            self._last_call.throttled = self._last_call.throttled or throttled
+            time.sleep(wait_time)
+            attempt += 1
+
+    def last_call_throttled(self) -> bool:
+        """True if the last call sent by the current thread was throttled (429) before succeeding or giving up."""
+        return getattr(self._last_call, "throttled", False)
+
+    def last_call_status(self):
+        """HTTP status of the last response received by the current thread (None if no response)."""
+        return getattr(self._last_call, "status", None)
+
+    def post(self, path: str, json: dict = {}):
+        return self.request("POST", path, json=json)
 
     def put(self, path: str, json: dict = None, data: bytes = None):
-        url = self.conf.workspace_url+"/api/"+self.clean_path(path)
-        headers = self.conf.headers
         if data is not None:
             files = {'file': ('file', data, 'application/octet-stream')}
-            with requests.put(url, headers=headers, files=files, timeout=60) as r:
-                return self.get_json_result(url, r)
-        else:
-            with requests.put(url, headers=headers, json=json, timeout=60) as r:
-                return self.get_json_result(url, r)
+            return self.request("PUT", path, files=files)
+        return self.request("PUT", path, json=json)
 
     def patch(self, path: str, json: dict = {}):
-        url = self.conf.workspace_url+"/api/"+self.clean_path(path)
-        with requests.patch(url, headers = self.conf.headers, json=json, timeout=60) as r:
-            return self.get_json_result(url, r)
+        return self.request("PATCH", path, json=json)
 
     def get(self, path: str, params: dict = {}, print_auth_error = True):
-        url = self.conf.workspace_url+"/api/"+self.clean_path(path)
-        with requests.get(url, headers = self.conf.headers, params=params, timeout=60) as r:
-            return self.get_json_result(url, r, print_auth_error)
+        return self.request("GET", path, print_auth_error, params=params)
 
     def delete(self, path: str, params: dict = {}):
-        url = self.conf.workspace_url+"/api/"+self.clean_path(path)
-        with requests.delete(url, headers = self.conf.headers, params=params, timeout=60) as r:
-            return self.get_json_result(url, r)
+        return self.request("DELETE", path, params=params)
+
+    def download(self, path: str, params: dict, destination, chunk_size: int = 1024*1024):
+        """Stream the raw content of a direct_download call (ex: workspace export) to destination, a file path or a binary file object,
+        chunk by chunk without loading it in memory. Return {} once downloaded, or the json error of the call."""
+        def write(r: Response):
+            if not isinstance(destination, str):
+                #A retried call (connection dropped in the middle of the body) restarts from an empty destination
+                destination.seek(0)
+                destination.truncate()
+                for chunk in r.iter_content(chunk_size):
+                    destination.write(chunk)
+                return {}
+            #Written next to the destination first: an interrupted download doesn't leave a truncated file
+            with open(destination+".part", "wb") as f:
+                for chunk in r.iter_content(chunk_size):
+                    f.write(chunk)
+            os.replace(destination+".part", destination)
+            return {}
+        return self.request("GET", path, read_body=write, params={**params, "direct_download": True}, stream=True)
+
+    def get_error_code(self, r: Response):
+        if r.status_code < 400:
+            return None
+        try:
+            body = r.json()
+            return body.get("error_code") if isinstance(body, dict) else None
+        except Exception:
+            return None
 
     def get_json_result(self, url: str, r: Response, print_auth_error = True):
         if r.status_code == 403:
@@ -243,6 +348,8 @@ class DemoConf():
         self.sql_queries = json_conf.get('sql_queries', [])
         self.bundle = json_conf.get('bundle', False)
         self.env_version = json_conf.get('env_version', 2)
+        #path in the bundle => object name in the shared objects store (see SharedObjects)
+        self.shared_objects = json_conf.get('shared_objects', {})
         
         self.data_folders: List[DataFolder] = []
         for data_folder in json_conf.get('data_folders', []):
@@ -282,6 +389,10 @@ class DemoConf():
         #TODO: this isn't clean, need a better solution
         self.json_conf["notebooks"].append(notebook.__dict__)
 
+    def add_shared_object(self, path: str, name: str):
+        self.shared_objects[path] = name
+        self.json_conf["shared_objects"] = self.shared_objects
+
     def set_pipeline_id(self, id, uid):
         j = json.dumps(self.init_job)
         j = j.replace("{{DYNAMIC_SDP_ID_"+id+"}}", uid)
@@ -1,6 +1,9 @@
 from .exceptions.dbdemos_exception import TokenException
 from .installer import Installer
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
 
 from .installer_report import InstallerReport
 
@@ -128,6 +131,9 @@ def help():
                   <div class="code">dbdemos.install(demo_name: str, path: str = "./", overwrite: bool = False, use_current_cluster = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS", catalog: str = None, schema: str = None, serverless: bool = None, warehouse_name: str = None, skip_genie_rooms: bool = False, dlt_policy_id: str = None, dlt_compute_settings: dict = None)</div>: install the given demo to the given path.<br/><br/>
                   <ul>
                   <li>If overwrite is True, dbdemos will delete the given path folder and re-install the notebooks.</li>
+                  <li>archive_import = True imports the notebooks of each folder as a single archive, with fewer API calls (faster for large demos).</li>
+                  <li>resume = True restarts a failed installation where it stopped, skipping the steps already completed (clusters, pipelines, dashboards...).</li>
+                  <li>With overwrite = True, incremental = True will only re-install the notebooks which changed since the previous installation instead of deleting the folder.</li>
                   <li>use_current_cluster = True will not start a new cluster to init the demo but use the current cluster instead. <strong>Set it to True it if you don't have cluster creation permission</strong>.</li>
                   <li>skip_dashboards = True will not load the DBSQL dashboard if any (faster, use it if the dashboard generation creates some issue).</li>                  
                   <li>If no authentication are provided, dbdemos will use the current user credential & workspace + cloud to install the demo.</li>
@@ -142,7 +148,12 @@ def help():
                   <div class="code">dbdemos.create_cluster(demo_name: str)</div>: install update the interactive cluster for the demo (scoped to the user).<br/><br/>
                 </li>
                 <li>
-                  <div class="code">dbdemos.install_all(path: str = "./", overwrite: bool = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS")</div>: install all the demos to the given path.<br/><br/>
+                  <div class="code">dbdemos.install_all(path: str = "./", overwrite: bool = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS", parallel: int = 1, max_api_concurrency: int = 20, incremental: bool = False)</div>: install all the demos to the given path.<br/><br/>
+                  <ul>
+                  <li>parallel = 4 installs 4 demos at the same time. With parallel > 1, a demo failing doesn't stop the other installations: a summary of all the installations is displayed at the end.</li>
+                  <li>max_api_concurrency caps the number of API calls in flight across all the demos installed in parallel.</li>
+                  <li>With overwrite = True, incremental = True will only re-install the notebooks which changed since the previous installation.</li>
+                  </ul><br/>
                 </li>
                </ul>
             </div>""")
@@ -152,7 +163,7 @@ def help():
         print("""dbdemos.list_demos(category: str = None): list all demos available, can filter per category (ex: 'governance').""")
         print("""dbdemos.install(demo_name: str, path: str = "./", overwrite: bool = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS"): install the given demo to the given path.""")
         print("""dbdemos.create_cluster(demo_name: str): install update the interactive cluster for the demo (scoped to the user).""")
-        print("""dbdemos.install_all(path: str = "./", overwrite: bool = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS")</div>: install all the demos to the given path.""")
+        print("""dbdemos.install_all(path: str = "./", overwrite: bool = False, username: str = None, pat_token: str = None, workspace_url: str = None, skip_dashboards: bool = False, cloud: str = "AWS", parallel: int = 1, max_api_concurrency: int = 20, incremental: bool = False): install all the demos to the given path. With parallel > 1, the demos are installed at the same time and a demo failing doesn't stop the other installations.""")
 
 def list_demos(category = None, installer = None, pat_token = None):
     check_version()
@@ -168,8 +179,7 @@ def list_demos(category = None, installer = None, pat_token = None):
     demos["DBSQL"] = []
     demos["data-science"] = []
     demos["AI-BI"] = []
-    for demo in installer.get_demos_available():
-        conf = installer.get_demo_conf(demo)
+    for conf in installer.get_demos_catalog().values():
         if (category is None or conf.category == category.lower()) and conf.name not in deprecated_demos:
             demos[conf.category].append(conf)
     if installer.report.displayHTML_available():
@@ -229,7 +239,7 @@ def list_dashboards(category = None):
 
 def install(demo_name, path = None, overwrite = False, username = None, pat_token = None, workspace_url = None, skip_dashboards = False, cloud = "AWS", start_cluster: bool = None,
             use_current_cluster: bool = False, current_cluster_id = None, warehouse_name = None, debug = False, catalog = None, schema = None, serverless=None, skip_genie_rooms=False, 
-            create_schema=True, dlt_policy_id = None, dlt_compute_settings = None, github_token = None):
+            create_schema=True, dlt_policy_id = None, dlt_compute_settings = None, github_token = None, incremental = False, resume = False, archive_import = False):
     check_version()
     
     if demo_name == "llm-fine-tuning" :
@@ -271,16 +281,49 @@ def install(demo_name, path = None, overwrite = False, username = None, pat_toke
         #Force dashboard skip as dbsql isn't available to avoid any error.
         skip_dashboards = True
     installer.install_demo(demo_name, path, overwrite, skip_dashboards = skip_dashboards, start_cluster = start_cluster, use_current_cluster = use_current_cluster,
-                           debug = debug, catalog = catalog, schema = schema, serverless = serverless, warehouse_name=warehouse_name, skip_genie_rooms=skip_genie_rooms, create_schema=create_schema, dlt_policy_id = dlt_policy_id, dlt_compute_settings = dlt_compute_settings)
+                           debug = debug, catalog = catalog, schema = schema, serverless = serverless, warehouse_name=warehouse_name, skip_genie_rooms=skip_genie_rooms, create_schema=create_schema, dlt_policy_id = dlt_policy_id, dlt_compute_settings = dlt_compute_settings, incremental = incremental, resume = resume, archive_import = archive_import)
 
 
-def install_all(path = None, overwrite = False, username = None, pat_token = None, workspace_url = None, skip_dashboards = False, cloud = "AWS", start_cluster = None, use_current_cluster = False, catalog = None, schema = None, dlt_policy_id = None, dlt_compute_settings = None):
+def install_all(path = None, overwrite = False, username = None, pat_token = None, workspace_url = None, skip_dashboards = False, cloud = "AWS", start_cluster = None, use_current_cluster = False, catalog = None, schema = None, dlt_policy_id = None, dlt_compute_settings = None,
+                parallel: int = 1, max_api_concurrency: int = 20, incremental = False):
     """
     Install all the bundle demos.
+    :param parallel: number of demos installed at the same time. When > 1, a demo failing doesn't stop the other installations
+                     and a summary of all the installations is displayed at the end.
+    :param max_api_concurrency: maximum number of API calls in flight across all the demos installed in parallel.
+    :param incremental: with overwrite=True, only reinstall the notebooks which changed since the previous installation.
     """
     installer = Installer(username, pat_token, workspace_url, cloud)
-    for demo_name in installer.get_demos_available():
-        installer.install_demo(demo_name, path, overwrite, skip_dashboards = skip_dashboards, start_cluster = start_cluster, use_current_cluster = use_current_cluster, catalog = catalog, schema = schema, dlt_policy_id = dlt_policy_id, dlt_compute_settings = dlt_compute_settings)
+    if parallel <= 1:
+        for demo_name in installer.get_demos_available():
+            installer.install_demo(demo_name, path, overwrite, skip_dashboards = skip_dashboards, start_cluster = start_cluster, use_current_cluster = use_current_cluster, catalog = catalog, schema = schema, dlt_policy_id = dlt_policy_id, dlt_compute_settings = dlt_compute_settings, incremental = incremental)
+    else:
+        #All the demos share the same client (pool, rate limits and retry stats), capped globally.
+        installer.db.set_max_concurrency(max_api_concurrency)
+        def install(demo_name):
+            start = time.time()
+            try:
+                installer.install_demo(demo_name, path, overwrite, skip_dashboards = skip_dashboards, start_cluster = start_cluster, use_current_cluster = use_current_cluster, catalog = catalog, schema = schema, dlt_policy_id = dlt_policy_id, dlt_compute_settings = dlt_compute_settings, incremental = incremental)
+                error = None
+            except Exception as e:
+                print(f"ERROR installing demo {demo_name}: {e}")
+                error = e
+            return {"name": demo_name, "error": error, "duration": time.time() - start}
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            results = list(executor.map(install, installer.get_demos_available()))
+        installer.report.display_install_all_summary(results)
+    print_retry_stats(installer)
+
+def print_retry_stats(installer):
+    """
+    Print how many API calls were retried and how long we waited, per endpoint family.
+    """
+    stats = installer.db.retry_policy.stats
+    if stats.get_total_wait_time() > 0:
+        print(f"API calls retried - total wait time: {stats.get_total_wait_time():.1f}sec")
+        for family, s in sorted(stats.get_summary().items()):
+            if s["retries"] > 0:
+                print(f"   - {family}: {s['retries']} retries ({s['throttled']} throttled) out of {s['calls']} calls, {s['wait_time']}sec waiting")
 
 def check_status_all(username = None, pat_token = None, workspace_url = None, cloud = "AWS"):
     """
@@ -322,25 +365,29 @@ def create_cluster(demo_name, username = None, pat_token = None, workspace_url =
     installer.report.display_install_result(demo_name, demo_conf.description, demo_conf.title, cluster_id = cluster_id, cluster_name = cluster_name)
 
 
+def parse_version(version: str):
+    """Comparable release number (ex: 0.6.34 => (0, 6, 34)), pre-release suffixes are ignored"""
+    return tuple(int(v) for v in re.match(r"[0-9]+(\.[0-9]+)*", version).group(0).split("."))
+
 def check_version():
     """
     Check if a newer version of dbdemos is available on PyPI.
     Prints a warning if the installed version is outdated.
     """
     try:
-        import pkg_resources
+        from importlib.metadata import version
         import requests
         import json
         
         # Get installed version
-        installed_version = pkg_resources.get_distribution('dbdemos').version
+        installed_version = version('dbdemos')
         
         # Get latest version from PyPI
         pypi_response = requests.get("https://pypi.org/pypi/dbdemos/json")
         latest_version = json.loads(pypi_response.text)['info']['version']
         
         # Compare versions
-        if pkg_resources.parse_version(latest_version) > pkg_resources.parse_version(installed_version):
+        if parse_version(latest_version) > parse_version(installed_version):
             print(f"\nWARNING: You are using dbdemos version {installed_version}, however version {latest_version} is available. You should consider upgrading:")
             print("%pip install --upgrade dbdemos")
             print("dbutils.library.restartPython()")
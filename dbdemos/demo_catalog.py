@@ -0,0 +1,64 @@
+import glob
+import json
+import os
+
+from .conf import DemoConf
+
+
+class DemoCatalogEntry():
+    """What's needed to list a demo, without loading its full configuration (notebooks, genie rooms...)"""
+    def __init__(self, name: str, category: str, title: str, description: str, tags: list = [],
+                 custom_schema_supported: bool = False, serverless_supported: bool = False):
+        self.name = name
+        self.category = category
+        self.title = title
+        self.description = description
+        self.tags = tags
+        self.custom_schema_supported = custom_schema_supported
+        self.serverless_supported = serverless_supported
+
+    @staticmethod
+    def from_json(json_conf: dict):
+        return DemoCatalogEntry(json_conf['name'], json_conf['category'], json_conf['title'], json_conf['description'],
+                                json_conf.get('tags', []), json_conf.get('custom_schema_supported', False),
+                                json_conf.get('serverless_supported', False))
+
+    @staticmethod
+    def from_demo_conf(demo_conf: DemoConf):
+        return DemoCatalogEntry(demo_conf.name, demo_conf.category, demo_conf.title, demo_conf.description, demo_conf.tags,
+                                demo_conf.custom_schema_supported, demo_conf.serverless_supported)
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "category": self.category, "title": self.title, "description": self.description, "tags": self.tags,
+                "custom_schema_supported": self.custom_schema_supported, "serverless_supported": self.serverless_supported}
+
+
+class DemoCatalog:
+    """Index of all the demos of the package (bundles/_catalog.json), written by the packager from the bundles conf.json.
+    Listing or checking the demos reads this single file instead of loading the configuration of every demo.
+    The entries are the raw conf values: the template keys ({{CURRENT_USER}}...) aren't used in the listed fields."""
+    FILE_NAME = "_catalog.json"
+    VERSION = 1
+
+    @staticmethod
+    def build(bundles_path: str):
+        """Write the catalog of all the bundles packaged in the folder. Folders starting with _ aren't demos."""
+        entries = []
+        for conf_path in sorted(glob.glob(bundles_path + "/*/conf.json")):
+            if os.path.basename(os.path.dirname(conf_path)).startswith("_"):
+                continue
+            with open(conf_path, "r") as f:
+                entries.append(DemoCatalogEntry.from_json(json.loads(f.read())).to_json())
+        with open(bundles_path + "/" + DemoCatalog.FILE_NAME, "w") as f:
+            f.write(json.dumps({"version": DemoCatalog.VERSION, "demos": entries}, indent=1))
+
+    @staticmethod
+    def load(get_resource):
+        """Return the entries of the package catalog (name => DemoCatalogEntry), None if it doesn't exist (older package) or can't be read."""
+        try:
+            catalog = json.loads(get_resource("bundles/" + DemoCatalog.FILE_NAME))
+        except Exception:
+            return None
+        if catalog.get("version") != DemoCatalog.VERSION:
+            return None
+        return {d["name"]: DemoCatalogEntry.from_json(d) for d in catalog["demos"]}
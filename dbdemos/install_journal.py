@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class InstallJournal:
+    """On-disk journal of an installation (one per workspace, install path and demo), recording the steps completed
+    and the ids they created (pipelines, dashboards, genie rooms, workflows...).
+    When resuming a failed installation, the completed steps are skipped and their result is read back from the journal.
+    The journal is deleted once the installation succeeds.
+    Step results must be json-serializable: use encode/decode to convert them."""
+    DEFAULT_FOLDER = os.path.join(str(Path.home()), ".dbdemos", "journal")
+
+    def __init__(self, workspace_url: str, install_path: str, demo_name: str, params: dict = None, folder: str = None, resume: bool = False):
+        self.folder = folder if folder is not None else InstallJournal.DEFAULT_FOLDER
+        key = hashlib.sha1(f"{workspace_url}|{install_path}|{demo_name}".encode("utf-8")).hexdigest()
+        self.path = os.path.join(self.folder, f"{demo_name}-{key[:16]}.json")
+        #The steps can't be reused if the demo is installed with different options (ex: another schema)
+        self.params_hash = hashlib.sha1(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        self.steps = {}
+        self.enabled = True
+        self._lock = threading.Lock()
+        if resume:
+            self.steps = self.load()
+
+    def load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                journal = json.loads(f.read())
+        except Exception as e:
+            print(f"WARN: can't read the install journal {self.path}, the installation will restart from scratch: {e}")
+            return {}
+        if journal.get("params_hash") != self.params_hash:
+            print(f"WARN: the previous installation used different options, the installation will restart from scratch.")
+            return {}
+        return journal["steps"]
+
+    def is_completed(self, step: str) -> bool:
+        with self._lock:
+            return step in self.steps
+
+    def get_completed_steps(self):
+        with self._lock:
+            return list(self.steps.keys())
+
+    def record(self, step: str, result):
+        with self._lock:
+            self.steps[step] = result
+            self.save()
+
+    def save(self):
+        if not self.enabled:
+            return
+        try:
+            Path(self.folder).mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps({"params_hash": self.params_hash, "steps": self.steps}))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            #The journal is only an optimization, don't fail the installation if the local disk isn't writable.
+            print(f"WARN: can't write the install journal {self.path}, resume won't be available: {e}")
+            self.enabled = False
+
+    def delete(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def step(self, name: str, fn, encode=None, decode=None):
+        """Wrap a step function: skip it and return the journaled result if it was already completed, otherwise run and journal it."""
+        def run_step():
+            if self.is_completed(name):
+                result = self.steps[name]
+                return decode(result) if decode is not None else result
+            result = fn()
+            self.record(name, encode(result) if encode is not None else result)
+            return result
+        return run_step
@@ -0,0 +1,60 @@
+import base64
+import hashlib
+import json
+import threading
+
+
+class InstallManifest:
+    """Content hash of every object imported in an installed demo folder, saved with the demo in the workspace.
+    Used by incremental reinstalls to only re-import the objects which changed and delete the ones removed from the demo,
+    instead of deleting and re-importing the entire folder.
+    Objects are keyed by their path relative to the demo folder."""
+    PATH = "_resources/.dbdemos_install_manifest.json"
+    VERSION = 1
+
+    def __init__(self, previous_objects: dict = None):
+        self.previous_objects = previous_objects if previous_objects is not None else {}
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_hash(import_request: dict) -> str:
+        h = hashlib.sha256(import_request["format"].encode("utf-8"))
+        h.update(import_request["content"].encode("utf-8"))
+        return h.hexdigest()
+
+    def is_unchanged(self, path: str, object_type: str, import_request: dict) -> bool:
+        """Record the object content and return True if the same content was already installed during the previous install."""
+        entry = {"hash": InstallManifest.get_hash(import_request), "object_type": object_type}
+        with self._lock:
+            self.objects[path] = entry
+        return self.previous_objects.get(path) == entry
+
+    def get_removed_objects(self):
+        """Objects installed during the previous install but not part of the demo anymore, as (path, object_type)."""
+        with self._lock:
+            return [(path, o["object_type"]) for path, o in self.previous_objects.items() if path not in self.objects]
+
+    def to_json(self) -> str:
+        with self._lock:
+            return json.dumps({"version": InstallManifest.VERSION, "objects": self.objects}, sort_keys=True)
+
+    @staticmethod
+    def load(db, demo_install_path: str):
+        """Return the manifest saved in the demo folder, or None if the demo was installed without manifest."""
+        r = db.get("2.0/workspace/export", {"path": demo_install_path+"/"+InstallManifest.PATH, "format": "AUTO", "direct_download": False})
+        if "content" not in r:
+            return None
+        try:
+            manifest = json.loads(base64.b64decode(r["content"]).decode("utf-8"))
+        except Exception as e:
+            print(f"WARN: can't read the install manifest, the demo will be fully reinstalled: {e}")
+            return None
+        if manifest.get("version") != InstallManifest.VERSION:
+            return None
+        return InstallManifest(manifest["objects"])
+
+    def save(self, db, demo_install_path: str):
+        content = base64.b64encode(self.to_json().encode("utf-8")).decode("utf-8")
+        return db.post("2.0/workspace/import", {"path": demo_install_path+"/"+InstallManifest.PATH, "content": content,
+                                                 "format": "AUTO", "overwrite": True})
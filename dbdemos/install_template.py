@@ -0,0 +1,91 @@
+import json
+
+from .conf import DemoConf
+from .notebook_parser import NotebookParser, TRACKER_REGEX, LEGACY_TRACKER_REGEX
+from .rewrite_rules import get_dynamic_links_regex, DYNAMIC_LINK_TYPES
+from .schema_replacer import SchemaReplacer
+
+
+class InstallTemplate:
+    """Notebook content prepared at packaging time, saved next to the packaged notebook html (<notebook>.tpl.json).
+    The content is only shipped in the template: the packaged html is the page around an empty notebook model, completed
+    with the template content at install time (and for the website).
+    The install-independent transformations (delete cells, AutoML links, cell positions) are already applied, and the json content
+    is split in segments: the static text, and the slots (odd indexes) containing everything an installation can rewrite
+    (links to the installed resources, catalog/schema references, trackers).
+    The installer only rewrites the slots and serializes the content, instead of parsing and scanning the full notebook."""
+    VERSION = 1
+    EXTENSION = ".tpl.json"
+    #Placeholders used to locate all the catalog/schema rules, whatever the catalog/schema chosen at install time
+    TEMPLATE_CATALOG = "dbdemos_template_catalog"
+    TEMPLATE_SCHEMA = "dbdemos_template_schema"
+    #Install-independent command transformations, applied once to the template content
+    TRANSFORMS = [NotebookParser.remove_delete_cell_command, NotebookParser.remove_automl_result_links_command]
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    @staticmethod
+    def get_path(html_path: str) -> str:
+        return html_path[:-len(".html")] + InstallTemplate.EXTENSION if html_path.endswith(".html") else html_path + InstallTemplate.EXTENSION
+
+    @staticmethod
+    def get_slots(content: str, demo_conf: DemoConf):
+        """Sorted, non overlapping (start, end) ranges of the content which can be rewritten at install time."""
+        spans = []
+        for regex in [get_dynamic_links_regex(tuple(DYNAMIC_LINK_TYPES)), TRACKER_REGEX, LEGACY_TRACKER_REGEX]:
+            spans += [(m.start(), m.end()) for m in regex.finditer(content)]
+        replacer = SchemaReplacer.get(demo_conf.default_catalog, demo_conf.default_schema, InstallTemplate.TEMPLATE_CATALOG,
+                                      InstallTemplate.TEMPLATE_SCHEMA, demo_conf.custom_schema_supported)
+        spans += [(start, min(end, len(content))) for start, end in replacer.get_windows(content)]
+        spans.sort()
+        slots = []
+        for start, end in spans:
+            if len(slots) > 0 and start <= slots[-1][1]:
+                slots[-1][1] = max(slots[-1][1], end)
+            else:
+                slots.append([start, end])
+        return slots
+
+    @staticmethod
+    def from_content(content: str, demo_conf: DemoConf, transformed: bool = False):
+        """Build the template from the packaged notebook content (json model).
+        transformed: the TRANSFORMS were already applied to the content (ex: by the packager, in its single pass on the model)."""
+        if not transformed:
+            pieces = []
+            NotebookParser.write_model(pieces.append, content, InstallTemplate.TRANSFORMS)
+            content = "".join(pieces)
+        segments = []
+        last = 0
+        for start, end in InstallTemplate.get_slots(content, demo_conf):
+            segments += [content[last:start], content[start:end]]
+            last = end
+        segments.append(content[last:])
+        return InstallTemplate(segments)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            f.write(json.dumps({"version": InstallTemplate.VERSION, "segments": self.segments}))
+
+    @staticmethod
+    def load(get_resource, path: str):
+        """Return the template of the packaged notebook, None if it doesn't exist (older package) or can't be read."""
+        try:
+            template = json.loads(get_resource(path))
+        except Exception:
+            return None
+        if template.get("version") != InstallTemplate.VERSION:
+            return None
+        return InstallTemplate(template["segments"])
+
+    def get_content(self, rewrite_slot) -> str:
+        """Notebook content (json model) with all the slots rewritten by rewrite_slot(text)"""
+        return "".join([rewrite_slot(s) if i % 2 == 1 else s for i, s in enumerate(self.segments)])
+
+    def get_packaged_content(self) -> str:
+        """Notebook content as packaged, without install rewrites"""
+        return "".join(self.segments)
+
+    def get_html(self, html: str, rewrite_slot) -> str:
+        """The packaged notebook html, with the rewritten content"""
+        return NotebookParser.set_html_content(html, self.get_content(rewrite_slot))
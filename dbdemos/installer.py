@@ -1,6 +1,5 @@
 import collections
 
-import pkg_resources
 
 
 from .conf import DBClient, DemoConf, Conf, ConfTemplate, merge_dict, DemoNotebook
@@ -14,6 +13,17 @@ from .tracker import Tracker
 from .notebook_parser import NotebookParser
 from .installer_workflows import InstallerWorkflow
 from .installer_repos import InstallerRepo
+from .rate_limiter import AdaptiveConcurrency
+from .task_graph import TaskGraph
+from .install_manifest import InstallManifest
+from .install_journal import InstallJournal
+from .notebook_archive import NotebookArchive
+from .rewrite_rules import RewriteRules
+from .install_template import InstallTemplate
+from .shared_objects import SharedObjects
+from .bundle_store import BundleStore
+from . import package_resources
+from .demo_catalog import DemoCatalog, DemoCatalogEntry
 from pathlib import Path
 import time
 import json
@@ -24,7 +34,6 @@ from datetime import date
 import urllib
 import threading
 from dbdemos.sql_query import SQLQueryExecutor
-from databricks.sdk import WorkspaceClient
 
 class Installer:
     def __init__(self, username = None, pat_token = None, workspace_url = None, cloud = None, org_id: str = None, current_cluster_id: str = None, github_token: str = None):
@@ -51,9 +60,17 @@ class Installer:
         self.installer_dashboard = InstallerDashboard(self)
         self.installer_genie = InstallerGenie(self)
         self.sql_query_executor = SQLQueryExecutor()
-        #Slows down on GCP as the dashboard API is very sensitive to back-pressure
-        # 1 dashboard at a time to reduce import pression as it seems to be creating new errors.
-        self.max_workers = 1 if self.get_current_cloud() == "GCP" else 1
+        #Bundle files are read from the compressed archives of the package
+        self.bundle_store = BundleStore()
+        self.demos_catalog = None
+        self.endpoint_lock = threading.Lock()
+        #Back-pressure is handled per endpoint family by the client rate limiter, so notebooks can be imported in parallel.
+        #Slows down the dashboard API further on GCP as it is very sensitive to back-pressure.
+        if self.get_current_cloud() == "GCP":
+            self.db.rate_limiter.set_limit("lakeview", 0.5, 1)
+        self.max_workers = DBClient.DEFAULT_POOL_SIZE
+        #Ramps up the parallel notebook imports while the workspace keeps up, backs off on 429.
+        self.import_concurrency = AdaptiveConcurrency(initial=2, max_limit=self.max_workers)
 
 
     def get_dbutils(self):
@@ -201,13 +218,22 @@ class Installer:
         demos["lakehouse"] = []
         demo_availables = self.get_demos_available()
         if demo_name not in demo_availables:
-            for demo in demo_availables:
-                conf = self.get_demo_conf(demo)
+            for conf in self.get_demos_catalog().values():
                 demos[conf.category].append(conf)
             self.report.display_demo_name_error(demo_name, demos)
 
     def get_demos_available(self):
-        return set(pkg_resources.resource_listdir("dbdemos", "bundles"))
+        #Folders starting with _ contain the resources shared by the demos (see SharedObjects)
+        return set([d for d in package_resources.resource_listdir("bundles") if not d.startswith("_")])
+
+    def get_demos_catalog(self):
+        """name => DemoCatalogEntry of the demos available, from the package catalog loaded once.
+        Demos missing from the catalog (older package) are loaded from their conf."""
+        if self.demos_catalog is None:
+            catalog = DemoCatalog.load(self.get_resource) or {}
+            self.demos_catalog = {name: catalog[name] if name in catalog else DemoCatalogEntry.from_demo_conf(self.get_demo_conf(name))
+                                  for name in sorted(self.get_demos_available())}
+        return self.demos_catalog
 
     def get_demo_conf(self, demo_name:str, catalog:str = None, schema:str = None, demo_folder: str = ""):
         demo = self.get_resource(f"bundles/{demo_name}/conf.json")
@@ -218,11 +244,11 @@ class Installer:
         return DemoConf(demo_name, json.loads(conf_template.replace_template_key(demo)), catalog, schema)
 
     def get_resource(self, path, decode=True):
-        resource = pkg_resources.resource_string("dbdemos", path)
+        resource = self.bundle_store.read(path)
         return resource.decode('UTF-8') if decode else resource
     
     def resource_isdir(self, path):
-        return pkg_resources.resource_isdir("dbdemos", path)
+        return self.bundle_store.isdir(path)
 
     def test_premium_pricing(self):
         try:
@@ -246,6 +272,7 @@ class Installer:
 
     def create_or_check_schema(self, demo_conf: DemoConf, create_schema: bool, debug=True):
         """Create or verify schema exists based on create_schema parameter"""
+        from databricks.sdk import WorkspaceClient
         ws = WorkspaceClient(token=self.db.conf.pat_token, host=self.db.conf.workspace_url)
         try:
             catalog = ws.catalogs.get(demo_conf.catalog)
@@ -278,7 +305,8 @@ class Installer:
 
     def install_demo(self, demo_name, install_path, overwrite=False, update_cluster_if_exists = True, skip_dashboards = False, start_cluster = None,
                      use_current_cluster = False, debug = False, catalog = None, schema = None, serverless=False, warehouse_name = None, skip_genie_rooms=False, 
-                     create_schema=True, dlt_policy_id = None, dlt_compute_settings = None):
+                     create_schema=True, dlt_policy_id = None, dlt_compute_settings = None, incremental = False, resume = False,
+                     archive_import = False):
         # first get the demo conf.
         if install_path is None:
             install_path = self.get_current_folder()
@@ -313,29 +341,73 @@ class Installer:
                 self.report.display_serverless_warn(Exception('This DBDemo content is not yet updated to Serverless/Express!'), demo_conf)
 
         self.report.display_install_info(demo_conf, install_path, catalog, schema)
+        rewrite_rules = RewriteRules(demo_conf)
         self.tracker.track_install(demo_conf.category, demo_name)
         use_cluster_id = self.current_cluster_id if use_current_cluster else None
-        try:
-            cluster_id, cluster_name = self.load_demo_cluster(demo_name, demo_conf, update_cluster_if_exists, start_cluster, use_cluster_id)
-        except ClusterException as e:
-            #Fallback to current cluster if we can't create a cluster.
-            cluster_id = self.current_cluster_id
-            self.report.display_cluster_creation_warn(e, demo_conf)
-            cluster_name = "Current Cluster"
-        self.check_if_install_folder_exists(demo_name, install_path, demo_conf, overwrite, debug)
-        pipeline_ids = self.load_demo_pipelines(demo_name, demo_conf, debug, serverless, dlt_policy_id, dlt_compute_settings)
+
+        def load_cluster():
+            try:
+                return self.load_demo_cluster(demo_name, demo_conf, update_cluster_if_exists, start_cluster, use_cluster_id)
+            except ClusterException as e:
+                #Fallback to current cluster if we can't create a cluster.
+                self.report.display_cluster_creation_warn(e, demo_conf)
+                return self.current_cluster_id, "Current Cluster"
+
+        params = {"overwrite": overwrite, "catalog": catalog, "schema": schema, "serverless": serverless, "warehouse_name": warehouse_name, "skip_dashboards": skip_dashboards,
+                  "skip_genie_rooms": skip_genie_rooms, "use_current_cluster": use_current_cluster, "dlt_policy_id": dlt_policy_id, "dlt_compute_settings": dlt_compute_settings, "incremental": incremental}
+        journal = InstallJournal(self.db.conf.workspace_url, install_path, demo_name, params, resume=resume)
+        if len(journal.get_completed_steps()) > 0:
+            print(f"Resuming the previous installation, skipping the steps already completed: {journal.get_completed_steps()}")
+
+        def set_pipeline_ids(pipeline_ids):
+            #Skipped pipelines step: the workflows still need the pipeline ids
+            for pipeline in pipeline_ids:
+                if "error" not in pipeline:
+                    demo_conf.set_pipeline_id(pipeline["id"], pipeline["uid"])
+            return pipeline_ids
+
+        # Independent resources are created in parallel. Everything written under the install folder waits for the folder check (which can delete it),
+        # pipelines and repos too, so that an existing folder stops the install before creating anything else.
+        # Workflows reference the pipeline ids (set_pipeline_id) and the notebooks links to all the resources, so they come last.
+        # Each step is journaled so that a failed installation can be resumed.
+        graph = TaskGraph(max_workers=4)
+        r = graph.results
+        def add(name, fn, depends_on = None, priority = 0, encode = None, decode = None):
+            graph.add(name, journal.step(name, fn, encode, decode), depends_on, priority)
+        add("cluster", load_cluster, decode=tuple)
+        #When resumed, the folder already contains some of our objects: always use a manifest to overwrite them.
+        add("folder_check", lambda: self.check_if_install_folder_exists(demo_name, install_path, demo_conf, overwrite, debug, incremental), priority=1,
+            encode=lambda m: None if m is None else m.previous_objects, decode=lambda objects: InstallManifest(objects))
+        add("pipelines", lambda: self.load_demo_pipelines(demo_name, demo_conf, debug, serverless, dlt_policy_id, dlt_compute_settings), depends_on=["folder_check"], priority=1,
+            decode=set_pipeline_ids)
         # Create Genie rooms before dashboards so we can optionally inject their uid into dashboards
-        genie_rooms = self.installer_genie.install_genies(demo_conf, install_path, warehouse_name, skip_genie_rooms, debug)
-        dashboards = [] if skip_dashboards else self.installer_dashboard.install_dashboards(demo_conf, install_path, warehouse_name, debug, genie_rooms)
-        repos = self.installer_repo.install_repos(demo_conf, debug)
-        workflows = self.installer_workflow.install_workflows(demo_conf, use_cluster_id, warehouse_name, serverless, debug)
-        init_job = self.installer_workflow.create_demo_init_job(demo_conf, use_cluster_id, warehouse_name, serverless, debug)
-        all_workflows = workflows if init_job["id"] is None else workflows + [init_job]
-        notebooks = self.install_notebooks(demo_name, install_path, demo_conf, cluster_name, cluster_id, pipeline_ids, dashboards, all_workflows, repos, overwrite, use_current_cluster, genie_rooms, debug)
-        self.installer_workflow.start_demo_init_job(demo_conf, init_job, debug)
-        for pipeline in pipeline_ids:
-            if "run_after_creation" in pipeline and pipeline["run_after_creation"]:
-                self.db.post(f"2.0/pipelines/{pipeline['uid']}/updates", { "full_refresh": True })
+        add("genie_rooms", lambda: self.installer_genie.install_genies(demo_conf, install_path, warehouse_name, skip_genie_rooms, debug), depends_on=["folder_check"], priority=1)
+        add("dashboards", lambda: [] if skip_dashboards else self.installer_dashboard.install_dashboards(demo_conf, install_path, warehouse_name, debug, r["genie_rooms"], rewrite_rules), depends_on=["genie_rooms"])
+        add("repos", lambda: self.installer_repo.install_repos(demo_conf, debug), depends_on=["folder_check"])
+        add("workflows", lambda: self.installer_workflow.install_workflows(demo_conf, use_cluster_id, warehouse_name, serverless, debug), depends_on=["pipelines"])
+        add("init_job", lambda: self.installer_workflow.create_demo_init_job(demo_conf, use_cluster_id, warehouse_name, serverless, debug), depends_on=["pipelines"])
+        def install_notebooks():
+            cluster_id, cluster_name = r["cluster"]
+            all_workflows = r["workflows"] if r["init_job"]["id"] is None else r["workflows"] + [r["init_job"]]
+            return self.install_notebooks(demo_name, install_path, demo_conf, cluster_name, cluster_id, r["pipelines"], r["dashboards"], all_workflows, r["repos"], overwrite, use_current_cluster, r["genie_rooms"], debug, r["folder_check"], archive_import, rewrite_rules)
+        add("notebooks", install_notebooks, depends_on=["cluster", "folder_check", "pipelines", "genie_rooms", "dashboards", "repos", "workflows", "init_job"],
+            encode=lambda notebooks: [n.path for n in notebooks], decode=lambda paths: [n for n in demo_conf.notebooks if n.path in paths])
+        graph.run()
+        if debug:
+            print(f"    Install tasks duration: {', '.join([f'{k}: {v:.1f}s' for k, v in graph.durations.items()])} - critical path: {graph.get_critical_path_duration():.1f}s")
+
+        cluster_id, cluster_name = r["cluster"]
+        pipeline_ids, dashboards, workflows, init_job, notebooks, genie_rooms = r["pipelines"], r["dashboards"], r["workflows"], r["init_job"], r["notebooks"], r["genie_rooms"]
+        def set_init_job_run_id(run_id):
+            init_job['run_id'] = run_id
+            return run_id
+        journal.step("start_init_job", lambda: self.installer_workflow.start_demo_init_job(demo_conf, init_job, debug), decode=set_init_job_run_id)()
+        def run_pipelines():
+            for pipeline in pipeline_ids:
+                if "run_after_creation" in pipeline and pipeline["run_after_creation"]:
+                    self.db.post(f"2.0/pipelines/{pipeline['uid']}/updates", { "full_refresh": True })
+        journal.step("run_pipelines", run_pipelines)()
+        journal.delete()
 
         self.report.display_install_result(demo_name, demo_conf.description, demo_conf.title, install_path, notebooks, init_job['uid'], init_job['run_id'], serverless, cluster_id, cluster_name, pipeline_ids, dashboards, workflows, genie_rooms)
 
@@ -365,6 +437,11 @@ class Installer:
         return None
 
     def get_or_create_endpoint(self, username: str, demo_conf: DemoConf, default_endpoint_name: str ="dbdemos-shared-endpoint", warehouse_name: str = None, throw_error: bool = False):
+        #Demos installed in parallel (install_all) wait for the shared warehouse created by the first one, instead of all creating it.
+        with self.endpoint_lock:
+            return self.get_or_create_endpoint_locked(username, demo_conf, default_endpoint_name, warehouse_name, throw_error)
+
+    def get_or_create_endpoint_locked(self, username: str, demo_conf: DemoConf, default_endpoint_name: str ="dbdemos-shared-endpoint", warehouse_name: str = None, throw_error: bool = False):
         try:
             ds = self.get_demo_datasource(warehouse_name)
         except Exception as e:
@@ -411,89 +488,183 @@ class Installer:
         return None
 
     #Check if the folder already exists, and delete it if needed.
-    def check_if_install_folder_exists(self, demo_name: str, install_path: str, demo_conf: DemoConf, overwrite=False, debug=False):
+    #For incremental installs, returns the manifest of the objects to compare with (the folder is kept when we have one).
+    def check_if_install_folder_exists(self, demo_name: str, install_path: str, demo_conf: DemoConf, overwrite=False, debug=False, incremental=False):
         install_path = install_path+"/"+demo_name
         s = self.db.get("2.0/workspace/get-status", {"path": install_path})
         if 'object_type' in s:
             if not overwrite:
                 self.report.display_folder_already_existing(ExistingResourceException(install_path, s), demo_conf)
-            if debug:
-                print(f"    Folder {install_path} already exists. Deleting the existing content...")
             assert install_path.lower() not in ['/users', '/repos', '/shared', '/workspace', '/workspace/shared', '/workspace/users'],\
                 "Demo name is missing, shouldn't happen. Fail to prevent main deletion."
+            if incremental:
+                manifest = InstallManifest.load(self.db, install_path)
+                if manifest is not None:
+                    if debug:
+                        print(f"    Folder {install_path} already exists. Only the content changed will be reinstalled.")
+                    #Dashboards and genie rooms are always recreated
+                    for folder in ["_dashboards", "_genie_spaces"]:
+                        self.db.post("2.0/workspace/delete", {"path": install_path+"/"+folder, 'recursive': True})
+                    return manifest
+                print(f"WARN: no install manifest found in {install_path}, the demo will be fully reinstalled.")
+            if debug:
+                print(f"    Folder {install_path} already exists. Deleting the existing content...")
             d = self.db.post("2.0/workspace/delete", {"path": install_path, 'recursive': True})
             if 'error_code' in d:
                 self.report.display_folder_permission(FolderDeletionException(install_path, d), demo_conf)
+        return InstallManifest() if incremental else None
 
     def install_notebooks(self, demo_name: str, install_path: str, demo_conf: DemoConf, cluster_name: str, cluster_id: str,
-                          pipeline_ids, dashboards, workflows, repos, overwrite=False, use_current_cluster=False, genie_rooms = [], debug=False):
+                          pipeline_ids, dashboards, workflows, repos, overwrite=False, use_current_cluster=False, genie_rooms = [], debug=False,
+                          manifest: InstallManifest = None, archive_import = False, rewrite_rules: RewriteRules = None):
         assert len(demo_name) > 4, "wrong demo name. Fail to prevent potential delete errors."
         if debug:
             print(f'    Installing notebooks')
         install_path = install_path+"/"+demo_name
+        #Same rewrites for all the notebooks and files of the demo
+        rewrite_rules = (rewrite_rules or RewriteRules(demo_conf)).with_resources(dashboards, genie_rooms, pipeline_ids, repos, workflows)
         folders_created = set()
         #Avoid multiple mkdirs in parallel as it's creating error.
         folders_created_lock = threading.Lock()
         def load_notebook(notebook):
             return load_notebook_path(notebook, "bundles/"+demo_name+"/install_package/"+notebook.get_clean_path())
 
+        def get_bundle_resource(path, decode=True):
+            #The files shared by all the demos are in the shared objects store
+            return self.get_resource(SharedObjects.get_resource_path(demo_conf, path), decode)
+
+        #Notebooks of the sub-folders only containing notebooks are grouped in one DBC archive per folder, imported in 1 call.
+        #Skipped when the folder content is compared to the previous install (manifest), as a DBC import can't overwrite a folder.
+        archives = {}
+        archives_lock = threading.Lock()
+        if archive_import and manifest is None:
+            def get_top_folder(n):
+                return n.get_clean_path().split("/")[0] if "/" in n.get_clean_path() else None
+            non_notebook_folders = {get_top_folder(n) for n in demo_conf.notebooks if n.object_type in ["FILE", "DIRECTORY"]}
+            for folder in {get_top_folder(n) for n in demo_conf.notebooks} | {"_resources"}:
+                if folder is not None and folder not in non_notebook_folders:
+                    archives[folder] = []
+
         def load_notebook_path(notebook: DemoNotebook, template_path):
-            parent = str(Path(install_path+"/"+notebook.get_clean_path()).parent)
-            with folders_created_lock:
-                if parent not in folders_created:
-                    r = self.db.post("2.0/workspace/mkdirs", {"path": parent})
-                    folders_created.add(parent)
-                    if 'error_code' in r:
-                        if r['error_code'] == "RESOURCE_ALREADY_EXISTS":
-                            self.report.display_folder_creation_error(FolderCreationException(install_path, r), demo_conf)
+            path = install_path+"/"+notebook.get_clean_path()
             if notebook.object_type == "FILE":
-                file = self.get_resource(template_path, decode=False)
+                file = get_bundle_resource(template_path, decode=False)
                 # Decode file content, replace schema, then re-encode
                 file_content = file.decode('utf-8')
-                file_content = NotebookParser.replace_schema_in_content(file_content, demo_conf)
+                file_content = rewrite_rules.replace_schema(file_content)
                 file_encoded = base64.b64encode(file_content.encode('utf-8')).decode("utf-8")
-                r = self.db.post(f"2.0/workspace/import", {"path": install_path+"/"+notebook.get_clean_path(), "content": file_encoded, "format": "AUTO", "overwrite": False})
-                if 'error_code' in r:
-                    self.report.display_folder_creation_error(FolderCreationException(f"{install_path}/{notebook.get_clean_path()}", r), demo_conf)
+                import_request = {"path": path, "content": file_encoded, "format": "AUTO", "overwrite": False}
             elif notebook.object_type == "DIRECTORY":
-                zip_folder = self.get_resource(template_path+".zip", decode=False)
+                zip_folder = get_bundle_resource(template_path+".zip", decode=False)
                 zip_folder_encoded = base64.b64encode(zip_folder).decode("utf-8")
-                r = self.db.post(f"2.0/workspace/import", {"path": install_path+"/"+notebook.get_clean_path()+".zip", "content": zip_folder_encoded, "format": "AUTO", "overwrite": False})
-                if 'error_code' in r:
-                    self.report.display_folder_creation_error(FolderCreationException(f"{install_path}/{notebook.get_clean_path()}", r), demo_conf)
+                import_request = {"path": path+".zip", "content": zip_folder_encoded, "format": "AUTO", "overwrite": False}
             else:
-                html = self.get_resource(template_path+".html")
-                parser = NotebookParser(html)
-                if notebook.add_cluster_setup_cell and not use_current_cluster:
-                    self.add_cluster_setup_cell(parser, demo_name, cluster_name, cluster_id, self.db.conf.workspace_url)
-                parser.replace_dynamic_links_lakeview_dashboards(dashboards)
-                parser.replace_dynamic_links_genie(genie_rooms)
-                parser.remove_automl_result_links()
-                parser.replace_schema(demo_conf)
-                parser.replace_dynamic_links_pipeline(pipeline_ids)
-                parser.replace_dynamic_links_repo(repos)
-                parser.remove_delete_cell()
-                parser.replace_dynamic_links_workflow(workflows)
-                parser.set_tracker_tag(self.get_org_id(), self.get_uid(), demo_conf.category, demo_name, notebook.get_clean_path(), self.db.conf.username)
-                content = parser.get_html()
+                html = get_bundle_resource(template_path+".html")
+                tracker_url = NotebookParser.get_tracker_url(self.get_org_id(), self.get_uid(), demo_conf.category, demo_name, notebook.get_clean_path(), self.db.conf.username)
+                folder = notebook.get_clean_path().split("/")[0]
+                in_archive = "/" in notebook.get_clean_path() and folder in archives
+                add_cluster_cell = notebook.add_cluster_setup_cell and not use_current_cluster
+                #The notebook content is in the precompiled template (see Packager), the html is the page around it.
+                #Older packages don't have a template: the content is in the html.
+                template = InstallTemplate.load(get_bundle_resource, InstallTemplate.get_path(template_path+".html"))
+                if template is not None and not in_archive and not add_cluster_cell:
+                    #Fast path: only the slots are rewritten.
+                    content = template.get_html(html, lambda slot: NotebookParser.replace_tracker_tag(
+                        rewrite_rules.replace_schema(rewrite_rules.replace_dynamic_links(slot)), tracker_url))
+                else:
+                    parser = NotebookParser(html, content=template.get_packaged_content() if template is not None else None)
+                    #Text replacements first, then the command transformations in a single pass on the parsed model.
+                    parser.rewrite(rewrite_rules)
+                    parser.content = NotebookParser.replace_tracker_tag(parser.content, tracker_url)
+                    parser.transform_commands([NotebookParser.remove_delete_cell_command, NotebookParser.remove_automl_result_links_command])
+                    if add_cluster_cell:
+                        self.add_cluster_setup_cell(parser, demo_name, cluster_name, cluster_id, self.db.conf.workspace_url)
+                    if in_archive:
+                        with archives_lock:
+                            archives[folder].append((notebook, parser))
+                        return notebook
+                    content = parser.get_html()
                 content = base64.b64encode(content.encode("utf-8")).decode("utf-8")
-                r = self.db.post("2.0/workspace/import", {"path": install_path+"/"+notebook.get_clean_path(), "content": content, "format": "HTML"})
-                if 'error_code' in r:
-                    self.report.display_folder_creation_error(FolderCreationException(f"{install_path}/{notebook.get_clean_path()}", r), demo_conf)
+                import_request = {"path": path, "content": content, "format": "HTML"}
+
+            if manifest is not None:
+                if manifest.is_unchanged(notebook.get_clean_path(), notebook.object_type, import_request):
+                    return notebook
+                import_request["overwrite"] = True
+                #A folder can't be overwritten by an import, delete the previous version first (if any)
+                if notebook.object_type == "DIRECTORY":
+                    self.db.post("2.0/workspace/delete", {"path": path, 'recursive': True})
+            return import_object(notebook, import_request)
+
+        def import_object(notebook: DemoNotebook, import_request):
+            parent = str(Path(install_path+"/"+notebook.get_clean_path()).parent)
+            with folders_created_lock:
+                if parent not in folders_created:
+                    r = self.db.post("2.0/workspace/mkdirs", {"path": parent})
+                    folders_created.add(parent)
+                    if 'error_code' in r:
+                        if r['error_code'] == "RESOURCE_ALREADY_EXISTS":
+                            self.report.display_folder_creation_error(FolderCreationException(install_path, r), demo_conf)
+            r = self.import_to_workspace(import_request)
+            if 'error_code' in r:
+                self.report.display_folder_creation_error(FolderCreationException(f"{install_path}/{notebook.get_clean_path()}", r), demo_conf)
             return notebook
 
-        #Always adds the licence notebooks
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            notebooks = [
-                DemoNotebook("_resources/LICENSE", "LICENSE", "Demo License"),
-                DemoNotebook("_resources/NOTICE", "NOTICE", "Demo Notice"),
-                DemoNotebook("_resources/README", "README", "Readme")
-            ]
-            def load_notebook_template(notebook):
-                load_notebook_path(notebook, f"template/{notebook.title}")
-            collections.deque(executor.map(load_notebook_template, notebooks))
+        def import_archive(folder, notebooks):
+            archive = NotebookArchive(folder)
+            for notebook, parser in notebooks:
+                archive.add_notebook(notebook.get_clean_path()[len(folder)+1:], parser.get_notebook_model())
+            if archive.get_size() <= NotebookArchive.MAX_SIZE:
+                r = self.import_to_workspace({"path": install_path+"/"+folder, "content": archive.get_content(), "format": "DBC"})
+                if 'error_code' not in r:
+                    if debug:
+                        print(f"    Imported {len(notebooks)} notebooks under {folder} as a single archive")
+                    return
+                print(f"WARN: couldn't import the {folder} folder as an archive, importing the notebooks one by one: {r}")
+            #The archive import can have (partially) succeeded server side: the notebooks overwrite what it created
+            for notebook, parser in notebooks:
+                content = base64.b64encode(parser.get_html().encode("utf-8")).decode("utf-8")
+                import_object(notebook, {"path": install_path+"/"+notebook.get_clean_path(), "content": content, "format": "HTML", "overwrite": True})
+
+        #Always adds the licence notebooks, imported with the demo notebooks
+        licenses = [
+            DemoNotebook("_resources/LICENSE", "LICENSE", "Demo License"),
+            DemoNotebook("_resources/NOTICE", "NOTICE", "Demo Notice"),
+            DemoNotebook("_resources/README", "README", "Readme")
+        ]
+        def load_notebook_template(notebook):
+            load_notebook_path(notebook, f"template/{notebook.title}")
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            return [n for n in executor.map(load_notebook, demo_conf.notebooks)]
+            license_futures = [executor.submit(load_notebook_template, n) for n in licenses]
+            notebooks = [n for n in executor.map(load_notebook, demo_conf.notebooks)]
+            #The licenses can be part of the _resources archive
+            for future in license_futures:
+                future.result()
+            collections.deque(executor.map(lambda a: import_archive(*a), [(f, n) for f, n in archives.items() if len(n) > 0]))
+        if manifest is not None:
+            self.remove_deleted_objects(install_path, manifest, debug)
+            manifest.save(self.db, install_path)
+        return notebooks
+
+    def remove_deleted_objects(self, demo_install_path: str, manifest: InstallManifest, debug=False):
+        """Delete the objects installed by the previous install which aren't part of the demo anymore."""
+        for path, object_type in manifest.get_removed_objects():
+            if debug:
+                print(f"    Deleting {path} ({object_type}), removed from the demo")
+            self.db.post("2.0/workspace/delete", {"path": demo_install_path+"/"+path, 'recursive': object_type == "DIRECTORY"})
+
+    def import_to_workspace(self, import_request: dict):
+        """Import an object in the workspace, within the adaptive concurrency limit shared by all the import threads."""
+        start = self.import_concurrency.acquire()
+        healthy = False
+        try:
+            r = self.db.post("2.0/workspace/import", import_request)
+            #Only back-pressure (429, 5xx) reduces the concurrency: other errors (ex: RESOURCE_ALREADY_EXISTS) are the demo's own
+            status = self.db.last_call_status()
+            healthy = not self.db.last_call_throttled() and status is not None and status < 500
+            return r
+        finally:
+            self.import_concurrency.release(start, healthy)
 
     def load_demo_pipelines(self, demo_name, demo_conf: DemoConf, debug=False, serverless=False, dlt_policy_id = None, dlt_compute_settings = None):
         #default cluster conf
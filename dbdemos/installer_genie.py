@@ -1,8 +1,5 @@
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from databricks.sdk import WorkspaceClient
-from databricks.sdk.service.catalog import VolumeType
-from databricks.sdk.service.sql import StatementState
 
 from dbdemos.sql_query import SQLQueryExecutor
 from .conf import DataFolder, DemoConf, GenieRoom
@@ -10,6 +7,7 @@ from .exceptions.dbdemos_exception import GenieCreationException, DataLoaderExce
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
+    from databricks.sdk import WorkspaceClient
     from .installer import Installer
 
 
@@ -44,6 +42,7 @@ class InstallerGenie:
         return rooms
 
     def install_genie(self, room: GenieRoom, genie_path, warehouse_id, debug=True):
+        from databricks.sdk import WorkspaceClient
         #Genie rooms don't allow / anymore
         ws = WorkspaceClient(token=self.installer.db.conf.pat_token, host=self.installer.db.conf.workspace_url)
         self.create_temp_table_for_genie_creation(ws, room, warehouse_id, debug)
@@ -135,7 +134,7 @@ class InstallerGenie:
 
     # we need to have the table existing before creating the genie room, however they're created in SDP which is in a job and not yet available.
     # This is a workaround to create a temp table with a property that will be used to delete it once the genie room is created so that the SDP table can run without issue.
-    def create_temp_table_for_genie_creation(self, ws: WorkspaceClient, room: GenieRoom, warehouse_id, debug=False):
+    def create_temp_table_for_genie_creation(self, ws: 'WorkspaceClient', room: GenieRoom, warehouse_id, debug=False):
         for table in room.table_identifiers:
             if not ws.tables.exists(table).table_exists:
                 sql_query = f"CREATE TABLE IF NOT EXISTS {table} TBLPROPERTIES ('dbdemos.mock_table_for_genie' = 1);"
@@ -153,6 +152,7 @@ class InstallerGenie:
     def load_genie_data(self, demo_conf: DemoConf, warehouse_id, debug=True):
         if demo_conf.data_folders:
             print(f"Loading data in your schema {demo_conf.catalog}.{demo_conf.schema} using warehouse {warehouse_id}, this might take a few seconds (you can use another warehouse with the option: warehouse_name='xxx')...")
+            from databricks.sdk import WorkspaceClient
             ws = WorkspaceClient(token=self.installer.db.conf.pat_token, host=self.installer.db.conf.workspace_url)
             if any(d.target_volume_folder_name is not None for d in demo_conf.data_folders):
                 self.create_raw_data_volume(ws, demo_conf, debug)
@@ -165,7 +165,7 @@ class InstallerGenie:
         if demo_conf.sql_queries:
             self.run_sql_queries(ws, demo_conf, warehouse_id, debug)
 
-    def run_sql_queries(self, ws: WorkspaceClient, demo_conf: DemoConf, warehouse_id, debug=True):
+    def run_sql_queries(self, ws: 'WorkspaceClient', demo_conf: DemoConf, warehouse_id, debug=True):
         for batch in demo_conf.sql_queries:
             with ThreadPoolExecutor(max_workers=5) as ex:
                 futures = [ex.submit(self.sql_query_executor.execute_query, ws, q, warehouse_id=warehouse_id, debug=debug) for q in batch]
@@ -180,7 +180,7 @@ class InstallerGenie:
     def get_current_cluster_id(self):
         return json.loads(self.installer.get_dbutils_tags_safe()['clusterId'])
 
-    def load_data(self, ws: WorkspaceClient, data_folder: DataFolder, warehouse_id, conf: DemoConf, debug=True):
+    def load_data(self, ws: 'WorkspaceClient', data_folder: DataFolder, warehouse_id, conf: DemoConf, debug=True):
         # Load table to a table
         if data_folder.target_table_name:
             try:
@@ -206,7 +206,7 @@ class InstallerGenie:
     import threading
     _volume_creation_lock = threading.Lock()
 
-    def create_raw_data_volume(self, ws: WorkspaceClient, demo_conf: DemoConf, debug=True):
+    def create_raw_data_volume(self, ws: 'WorkspaceClient', demo_conf: DemoConf, debug=True):
         with InstallerGenie._volume_creation_lock:
             full_volume_name = f"{demo_conf.catalog}/{demo_conf.schema}/{InstallerGenie.VOLUME_NAME}"
             try:
@@ -215,6 +215,7 @@ class InstallerGenie:
                 if debug:
                     print(f"Volume {full_volume_name} doesn't seem to exist, creating it - {e}")
                 try:
+                    from databricks.sdk.service.catalog import VolumeType
                     ws.volumes.create(
                         catalog_name=demo_conf.catalog,
                         schema_name=demo_conf.schema,
@@ -230,11 +231,11 @@ class InstallerGenie:
     # --------------------------------------------------------------------------------------------------------------------------------------------  
     # Experimental, first upload data to the volume as some warehouse don't have access to the S3 bucket directly when instance profiles exist.
     # --------------------------------------------------------------------------------------------------------------------------------------------  
-    def load_data_through_volume(self, ws: WorkspaceClient, data_folders: list[DataFolder], warehouse_id: str, demo_conf: DemoConf, debug=True):
+    def load_data_through_volume(self, ws: 'WorkspaceClient', data_folders: list[DataFolder], warehouse_id: str, demo_conf: DemoConf, debug=True):
         print('INFO: Basic Credential error detected downloading the files from our demo S3 bucket. Will try to load data to volume first, please wait as this might take a while...')
         self.create_raw_data_volume(ws, demo_conf, debug)
 
-        def load_data_and_create_table(ws: WorkspaceClient, data_folder: DataFolder, warehouse_id: str, demo_conf: DemoConf, debug=True):
+        def load_data_and_create_table(ws: 'WorkspaceClient', data_folder: DataFolder, warehouse_id: str, demo_conf: DemoConf, debug=True):
             self.load_data_to_volume(ws, demo_conf, data_folder, debug)
             self.create_table_from_volume(ws, data_folder, warehouse_id, demo_conf, debug)
 
@@ -245,7 +246,7 @@ class InstallerGenie:
                 future.result()
 
 
-    def load_data_to_volume(self, ws: WorkspaceClient, data_folder: DataFolder, demo_conf: DemoConf, debug=True):
+    def load_data_to_volume(self, ws: 'WorkspaceClient', data_folder: DataFolder, demo_conf: DemoConf, debug=True):
         assert data_folder.source_format in ["csv", "json", "parquet"], "data loader through volume only support csv, json and parquet"
 
         import requests
@@ -322,7 +323,7 @@ class InstallerGenie:
         except Exception as e:
             raise DataLoaderException(f"Error loading data from S3: {str(e)}")
 
-    def create_table_from_volume(self, ws: WorkspaceClient, data_folder: DataFolder, warehouse_id, conf: DemoConf, debug=True):
+    def create_table_from_volume(self, ws: 'WorkspaceClient', data_folder: DataFolder, warehouse_id, conf: DemoConf, debug=True):
         self.sql_query_executor.execute_query(ws, f"""CREATE TABLE IF NOT EXISTS {conf.catalog}.{conf.schema}.{data_folder.target_table_name} as 
                                             SELECT * FROM read_files('/Volumes/{conf.catalog}/{conf.schema}/{InstallerGenie.VOLUME_NAME}/{data_folder.source_folder}',  
                                             format => '{data_folder.source_format}', 
@@ -436,6 +436,24 @@ class InstallerReport:
             first.sort(key=lambda n: n.get_clean_path())
             print(f"Start with the first notebook {demo_name}/{first[0].get_clean_path()}{cluster_instruction}: {self.workspace_url}/#workspace{install_path}/{demo_name}/{first[0].get_clean_path()}.")
 
+    def display_install_all_summary(self, results):
+        """results: list of {"name", "error", "duration"} for each demo installed by install_all."""
+        failed = [r for r in results if r["error"] is not None]
+        title = f"{len(results) - len(failed)}/{len(results)} demos installed"
+        if self.displayHTML_available():
+            from dbruntime.display import displayHTML
+            rows = ""
+            for r in results:
+                status = "OK" if r["error"] is None else f"""<span style="color: #eb0707">ERROR</span>: <div class="code">{r["error"]}</div>"""
+                rows += f"""<div class="notebook">{r["name"]} ({r["duration"]:.0f}s): {status}</div>"""
+            displayHTML(f"""{InstallerReport.CSS_REPORT}<div class="dbdemos_install"><h1>{title}</h1>{rows}</div>""")
+        else:
+            print("----------------------------------------------------")
+            print(f"------------- {title}: -------------")
+            for r in results:
+                status = "OK" if r["error"] is None else f"ERROR - {type(r['error']).__name__}: {r['error']}"
+                print(f"    - {r['name']} ({r['duration']:.0f}s): {status}")
+
     def display_schema_creation_error(self, exception: Exception, demo_conf: DemoConf):
         self.display_error(exception, f"""Can't create catalog/schema `{demo_conf.catalog}`.`{demo_conf.schema}`. <br/>
                                         Please verify you have the proper permissions to create catalogs and schemas, or install the demo in another location:<br/>
@@ -1,4 +1,5 @@
 from .conf import DBClient, DemoConf, Conf, ConfTemplate, merge_dict
+import asyncio
 import time
 import json
 import re
@@ -24,7 +25,9 @@ class JobBundler:
         merge_dict(cluster_conf, demo_cluster_conf)
         return cluster_conf
 
-    def load_bundles_conf(self):
+    def load_bundles_conf(self, use_async: bool = False):
+        if use_async:
+            return asyncio.run(self.load_bundles_conf_async())
         #if not self.staging_reseted:
         #    self.reset_staging_repo()
         print("scanning folder for bundles...")
@@ -51,10 +54,37 @@ class JobBundler:
         with ThreadPoolExecutor(max_workers=5) as executor:
             collections.deque(executor.map(self.add_bundle_from_config, bundle_set))
 
-    def add_bundle_from_config(self, bundle_config_paths):
+    async def load_bundles_conf_async(self, max_concurrency: int = 100):
+        """Same as load_bundles_conf, but scans the repo and downloads all the bundle configs concurrently from a single thread."""
+        from .async_client import AsyncDBClient
+        #if not self.staging_reseted:
+        #    self.reset_staging_repo()
+        print("scanning folder for bundles (async)...")
+        async with AsyncDBClient(self.conf, max_concurrency) as db:
+            async def find_conf_files(path):
+                objects = await db.get("2.0/workspace/list", {"path": path})
+                if "objects" not in objects:
+                    return []
+                bundle_configs = [o['path'] for o in objects["objects"] if o['object_type'] == 'NOTEBOOK' and o['path'].endswith("/bundle_config")]
+                sub_folders = await asyncio.gather(*[find_conf_files(o['path']) for o in objects["objects"] if o['object_type'] == 'DIRECTORY'])
+                return bundle_configs + [c for configs in sub_folders for c in configs]
+
+            async def add_bundle(bundle_config_path):
+                path = self.get_bundle_path_from_config(bundle_config_path)
+                print(f"add bundle under {path}")
+                file = await db.get("2.0/workspace/export", {"path": bundle_config_path, "format": "SOURCE", "direct_download": False})
+                self.add_bundle_from_export(path, bundle_config_path, file)
+
+            bundle_configs = await find_conf_files(self.conf.get_repo_path())
+            await asyncio.gather(*[add_bundle(c) for c in set(bundle_configs)])
+
+    def get_bundle_path_from_config(self, bundle_config_path):
         #Remove the /Repos/xxx from the path (we need it from the repo root)
-        path = bundle_config_paths[len(self.conf.get_repo_path()):]
-        path = path[:-len("_resources/bundle_config")-1]
+        path = bundle_config_path[len(self.conf.get_repo_path()):]
+        return path[:-len("_resources/bundle_config")-1]
+
+    def add_bundle_from_config(self, bundle_config_paths):
+        path = self.get_bundle_path_from_config(bundle_config_paths)
         print(f"add bundle under {path}")
         self.add_bundle(path)
 
@@ -72,6 +102,9 @@ class JobBundler:
         config_path = self.conf.get_repo_path()+"/"+bundle_path+"/"+config_path
 
         file = self.db.get("2.0/workspace/export", {"path": config_path, "format": "SOURCE", "direct_download": False})
+        self.add_bundle_from_export(bundle_path, config_path, file)
+
+    def add_bundle_from_export(self, bundle_path, config_path, file):
         if "content" not in file:
             raise Exception(f"Couldn't download bundle file: {config_path}. Check your bundle path if you added it manualy.")
         content = base64.b64decode(file['content']).decode('utf8')
@@ -126,9 +159,12 @@ class JobBundler:
             self.head_commit_id = r['head_commit_id']
         self.staging_reseted = True
 
-    def start_and_wait_bundle_jobs(self, force_execution: bool = False, skip_execution: bool = False, recreate_jobs: bool = False):
+    def start_and_wait_bundle_jobs(self, force_execution: bool = False, skip_execution: bool = False, recreate_jobs: bool = False, use_async: bool = False):
         self.create_or_update_bundle_jobs(recreate_jobs)
-        self.run_bundle_jobs(force_execution, skip_execution)
+        if use_async:
+            asyncio.run(self.run_bundle_jobs_async(force_execution, skip_execution))
+        else:
+            self.run_bundle_jobs(force_execution, skip_execution)
         self.wait_for_bundle_jobs_completion()
 
     def create_or_update_bundle_jobs(self, recreate_jobs: bool = False):
@@ -151,46 +187,74 @@ class JobBundler:
         return response.json()['sha']
     
     def run_bundle_jobs(self, force_execution: bool = False, skip_execution = False):
+        head_commit = None
         if not force_execution:
             head_commit = self.get_head_commit()
         with ThreadPoolExecutor(max_workers=10) as executor:
             def run_job(demo_conf):
                 if demo_conf.job_id is not None:
-                    execute = True
                     runs = self.db.get("2.1/jobs/runs/list", {"job_id": demo_conf.job_id, 'limit': 2, 'expand_tasks': "true"})
-                    #Last run was successful
+                    run = None
                     if 'runs' in runs and len(runs['runs']) > 0:
                         run = runs['runs'][0]
                         if run["status"]["state"] != "TERMINATED":
                             run = self.cancel_job_run(demo_conf, run)
-                        if not force_execution:
-                            if "termination_details" not in run["status"]:
-                                raise Exception(f"termination_details missing, should not happen. Job {demo_conf.name} status is {run['status']}")
-                            elif run["status"]["termination_details"]["code"] == "SUCCESS":
-                                print(f"Job {demo_conf.name} status is {run['status']['termination_details']}...")
-                                if skip_execution:
-                                    execute = False
-                                    demo_conf.run_id = run['run_id']
-                                    print(f"skipping job execution {demo_conf.name} as it was already run and skip_execution=True.")
-                                else:
-                                    #last run was using the same commit version.
-                                    most_recent_commit = ''
-                                    for task in run['tasks']:
-                                        # Safely get the commit if git_source and git_snapshot exist
-                                        task_commit = task.get('git_source', {}).get('git_snapshot', {}).get('used_commit', '')
-                                        if task_commit > most_recent_commit:
-                                            most_recent_commit = task_commit
-                                    if not self.check_if_demo_file_changed_since_commit(demo_conf, most_recent_commit, head_commit) and most_recent_commit != '':
-                                        execute = False
-                                        demo_conf.run_id = run['run_id']
-                                        print(f"skipping job execution for {demo_conf.name} as no files changed since last run. run with force_execution=true to override this check.")
-                                    
-                    if execute:
+                    demo_conf.run_id = self.get_reusable_run_id(demo_conf, run, head_commit, force_execution, skip_execution)
+                    if demo_conf.run_id is None:
                         run = self.db.post("2.1/jobs/run-now", {"job_id": demo_conf.job_id})
                         demo_conf.run_id = run["run_id"]
 
             collections.deque(executor.map(run_job, [c[1] for c in self.bundles.items()]))
 
+    async def run_bundle_jobs_async(self, force_execution: bool = False, skip_execution = False, max_concurrency: int = 100):
+        """Same as run_bundle_jobs, with all the demos checked/started concurrently from a single thread.
+        The GitHub calls are blocking and run in the default executor."""
+        from .async_client import AsyncDBClient
+        loop = asyncio.get_running_loop()
+        head_commit = None
+        if not force_execution:
+            head_commit = await loop.run_in_executor(None, self.get_head_commit)
+        async with AsyncDBClient(self.conf, max_concurrency) as db:
+            async def run_job(demo_conf):
+                if demo_conf.job_id is not None:
+                    runs = await db.get("2.1/jobs/runs/list", {"job_id": demo_conf.job_id, 'limit': 2, 'expand_tasks': "true"})
+                    run = None
+                    if 'runs' in runs and len(runs['runs']) > 0:
+                        run = runs['runs'][0]
+                        if run["status"]["state"] != "TERMINATED":
+                            run = await self.cancel_job_run_async(db, demo_conf, run)
+                    demo_conf.run_id = await loop.run_in_executor(None, self.get_reusable_run_id, demo_conf, run, head_commit, force_execution, skip_execution)
+                    if demo_conf.run_id is None:
+                        run = await db.post("2.1/jobs/run-now", {"job_id": demo_conf.job_id})
+                        demo_conf.run_id = run["run_id"]
+
+            await asyncio.gather(*[run_job(c) for c in self.bundles.values()])
+
+    def get_reusable_run_id(self, demo_conf: DemoConf, run, head_commit, force_execution: bool = False, skip_execution = False):
+        """Returns the id of the last run if it can be reused instead of running the job again, None otherwise."""
+        #Last run was successful
+        if run is None or force_execution:
+            return None
+        if "termination_details" not in run["status"]:
+            raise Exception(f"termination_details missing, should not happen. Job {demo_conf.name} status is {run['status']}")
+        if run["status"]["termination_details"]["code"] != "SUCCESS":
+            return None
+        print(f"Job {demo_conf.name} status is {run['status']['termination_details']}...")
+        if skip_execution:
+            print(f"skipping job execution {demo_conf.name} as it was already run and skip_execution=True.")
+            return run['run_id']
+        #last run was using the same commit version.
+        most_recent_commit = ''
+        for task in run['tasks']:
+            # Safely get the commit if git_source and git_snapshot exist
+            task_commit = task.get('git_source', {}).get('git_snapshot', {}).get('used_commit', '')
+            if task_commit > most_recent_commit:
+                most_recent_commit = task_commit
+        if not self.check_if_demo_file_changed_since_commit(demo_conf, most_recent_commit, head_commit) and most_recent_commit != '':
+            print(f"skipping job execution for {demo_conf.name} as no files changed since last run. run with force_execution=true to override this check.")
+            return run['run_id']
+        return None
+
     def wait_for_bundle_jobs_completion(self):
         for _, demo_conf in self.bundles.items():
             if demo_conf.run_id is not None:
@@ -330,4 +394,16 @@ class JobBundler:
             time.sleep(10)
         return run
 
+    async def cancel_job_run_async(self, db, demo_conf: DemoConf, run):
+        print(f"Job {demo_conf.name} status is {run['status']['state']}, cancelling it...")
+        await db.post("2.1/jobs/runs/cancel-all", {"job_id": demo_conf.job_id})
+        await asyncio.sleep(5)
+        while True:
+            run = await db.get("2.1/jobs/runs/get", {"run_id": run['run_id']})
+            if run["status"]["state"] == "TERMINATED":
+                break
+            print(f"Waiting for job {demo_conf.name} to be terminated after cancellation...")
+            await asyncio.sleep(10)
+        return run
+
   
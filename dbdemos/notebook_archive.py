@@ -0,0 +1,33 @@
+import base64
+import io
+import json
+import zipfile
+
+
+class NotebookArchive:
+    """In-memory DBC archive of notebooks, imported in a single 2.0/workspace/import call (format DBC) instead of one call per notebook.
+    The archive contains a root folder (the workspace folder created by the import) with one json notebook model per notebook,
+    named after the notebook path and the language extension, as in the DBC exports."""
+    EXTENSIONS = {"python": "python", "sql": "sql", "scala": "scala", "r": "r"}
+    #The import API is limited to 10MB per request, keep a margin for the base64 encoding (+33%).
+    MAX_SIZE = 7 * 1024 * 1024
+
+    def __init__(self, root_folder: str):
+        self.root_folder = root_folder
+        self.paths = []
+        self._buffer = io.BytesIO()
+        self._zip = zipfile.ZipFile(self._buffer, "w", zipfile.ZIP_DEFLATED)
+
+    def add_notebook(self, relative_path: str, model: dict):
+        """relative_path: notebook path under the archive root folder. model: the notebook json model (see NotebookParser.get_notebook_model)"""
+        extension = NotebookArchive.EXTENSIONS.get(str(model.get("language", "python")).lower(), "python")
+        self._zip.writestr(f"{self.root_folder}/{relative_path}.{extension}", json.dumps(model))
+        self.paths.append(relative_path)
+
+    def get_size(self) -> int:
+        return self._buffer.tell()
+
+    def get_content(self) -> str:
+        """Close the archive and return its base64 content, ready to be imported."""
+        self._zip.close()
+        return base64.b64encode(self._buffer.getvalue()).decode("utf-8")
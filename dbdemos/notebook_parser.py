@@ -1,32 +1,264 @@
 from dbdemos.conf import DemoConf
 
 from .tracker import Tracker
+from .schema_replacer import SchemaReplacer
+from .rewrite_rules import RewriteRules
 import urllib
 import re
 import base64
+import io
 import json
 
+#Compiled once, the same rewrites are applied to all the notebooks
+NOTEBOOK_MODEL_MARKER = "__DATABRICKS_NOTEBOOK_MODEL = '"
+TRACKER_REGEX = re.compile(r"""(<img\s*width=\\?"1px\\?"\s*src=\\?")(https:\/\/ppxrzfxige\.execute-api\.us-west-2\.amazonaws\.com\/v1\/analytics.*?)(\\?"\s?\/?>)""")
+LEGACY_TRACKER_REGEX = re.compile(r"""(<img\s*width=\\?"1px\\?"\s*src=\\?")(https:\/\/www\.google-analytics\.com\/collect.*?)(\\?"\s?\/?>)""")
+UNCOMMENT_TAG_REGEX = re.compile(r'[#-]{1,2}\s*UNCOMMENT_FOR_DEMO ?')
+AUTOML_LINK_REGEX = re.compile('display_automl_[a-zA-Z]*_link')
+JSON_WHITESPACE_REGEX = re.compile(r'[ \t\n\r]*')
+JSON_DECODER = json.JSONDecoder()
+#Minisite pages
+ROBOTS_META = '<meta name="robots" content="nofollow, noindex">'
+SEO_SCRIPT = ("<script>window.addEventListener('load', function(event) { "
+              "if (/bot|google|baidu|bing|msn|teoma|slurp|yandex/i.test(navigator.userAgent)) {"
+                  "document.getElementById('no_js_render').style.display = 'block';"
+              "};"
+              "});")
+
+
 class NotebookParser:
 
-    def __init__(self, html):
+    def __init__(self, html, lazy = False, content = None):
+        """content: notebook content (json model), when the html is only the page around an empty model (packaged notebook, see InstallTemplate)"""
         self.html = html
-        self.raw_content, self.content = self.get_notebook_content(html)
+        #The notebook content is kept either as json string (for text replacements) or as parsed model (for command
+        #transformations), and only converted when switching from one to the other, not for each transformation.
+        self._model = None
+        #Lazy mode: the model is never fully parsed. Command transformations and model updates are kept pending, and applied
+        #while the content is written, parsing one command at a time (reduces the peak memory for notebooks with large results).
+        self.lazy = lazy
+        self._pending_transforms = []
+        self._pending_updates = {}
+        self._content = content if content is not None else self.get_notebook_content(html)[1]
+
+    @property
+    def html(self):
+        return self._html
+
+    @html.setter
+    def html(self, html):
+        self._html = html
+        #position of the base64 notebook model in the html, found again if the html changes
+        self._model_offsets = None
+
+    @staticmethod
+    def get_model_offsets(html):
+        start = html.find(NOTEBOOK_MODEL_MARKER)
+        end = html.find("'", start + len(NOTEBOOK_MODEL_MARKER)) if start >= 0 else -1
+        if end < 0:
+            raise Exception("Can't find the notebook model (__DATABRICKS_NOTEBOOK_MODEL) in the notebook html")
+        return start + len(NOTEBOOK_MODEL_MARKER), end
+
+    @property
+    def raw_content(self):
+        if self._model_offsets is None:
+            self._model_offsets = NotebookParser.get_model_offsets(self._html)
+        return self._html[self._model_offsets[0]:self._model_offsets[1]]
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = json.dumps(self._model)
+            self._model = None
+        self.apply_pending()
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        self._content = content
+        self._model = None
+
+    def get_model(self):
+        """Parsed notebook model. The json content is invalidated as the model is expected to be updated in place."""
+        if self._model is None:
+            self.apply_pending()
+            self._model = json.loads(self._content)
+        self._content = None
+        return self._model
 
     def get_notebook_content(self, html):
-        match = re.search(r'__DATABRICKS_NOTEBOOK_MODEL = \'(.*?)\'', html)
-        raw_content = match.group(1)
+        start, end = NotebookParser.get_model_offsets(html)
+        if html is self._html:
+            self._model_offsets = (start, end)
+        raw_content = html[start:end]
         content = base64.b64decode(raw_content).decode('utf-8')
         content = urllib.parse.unquote(content)
         return raw_content, content
 
-    def get_html(self):
-        content = json.loads(self.content)
+    def get_notebook_model(self):
+        content = self.get_model()
         #force the position to avoid bug during import
         for i in range(len(content["commands"])):
             content["commands"][i]['position'] = i
-        content = json.dumps(content)
+        return content
+
+    def transform_commands(self, transforms):
+        """Apply a list of command transformations in a single pass over the notebook model.
+        Each transformation takes a command and returns it (updated in place or not), or None to remove the cell."""
+        if self.lazy and self._model is None:
+            self._pending_transforms += transforms
+            return
+        content = self.get_model()
+        commands = []
+        for c in content["commands"]:
+            for transform in transforms:
+                c = transform(c)
+                if c is None:
+                    break
+            if c is not None:
+                commands.append(c)
+        content["commands"] = commands
+
+    def update_model(self, key, update):
+        """Set model[key] = update(current value, None if missing)"""
+        if self.lazy and self._model is None:
+            previous = self._pending_updates.get(key)
+            self._pending_updates[key] = update if previous is None else lambda value: update(previous(value))
+            return
+        content = self.get_model()
+        content[key] = update(content.get(key))
+
+    def apply_pending(self):
+        if len(self._pending_transforms) > 0 or len(self._pending_updates) > 0:
+            pieces = []
+            NotebookParser.write_model(pieces.append, self._content, self._pending_transforms, self._pending_updates)
+            self._content = "".join(pieces)
+            self._pending_transforms, self._pending_updates = [], {}
+
+    @staticmethod
+    def iter_model(content: str):
+        """Yield the (key, value) of the top-level json model, parsed incrementally. The commands value is a generator
+        parsing the commands one at a time, and must be consumed before getting the next key."""
+        def skip_whitespace(i):
+            return JSON_WHITESPACE_REGEX.match(content, i).end()
+        def expect(i, char):
+            if content[i] != char:
+                raise Exception(f"Invalid notebook model: expected {char} at position {i}")
+        end_of_commands = [None]
+        def iter_commands(i):
+            expect(i, "[")
+            i = skip_whitespace(i + 1)
+            while content[i] != "]":
+                command, i = JSON_DECODER.raw_decode(content, i)
+                yield command
+                i = skip_whitespace(i)
+                if content[i] == ",":
+                    i = skip_whitespace(i + 1)
+                else:
+                    expect(i, "]")
+            end_of_commands[0] = i + 1
+
+        i = skip_whitespace(0)
+        expect(i, "{")
+        i = skip_whitespace(i + 1)
+        while content[i] != "}":
+            key, i = JSON_DECODER.raw_decode(content, i)
+            i = skip_whitespace(i)
+            expect(i, ":")
+            i = skip_whitespace(i + 1)
+            if key == "commands":
+                yield key, iter_commands(i)
+                if end_of_commands[0] is None:
+                    raise Exception("The commands must be consumed before the next model key")
+                i = end_of_commands[0]
+            else:
+                value, i = JSON_DECODER.raw_decode(content, i)
+                yield key, value
+            i = skip_whitespace(i)
+            if content[i] == ",":
+                i = skip_whitespace(i + 1)
+            else:
+                expect(i, "}")
+
+    @staticmethod
+    def write_model(write, content: str, transforms = None, updates = None):
+        """Write the json content with the command transformations and model updates applied (and the cell positions fixed),
+        one command at a time. The output is the same as json.dumps on the updated model."""
+        transforms = transforms or []
+        updates = updates or {}
+        write("{")
+        keys = []
+        for key, value in NotebookParser.iter_model(content):
+            write((", " if len(keys) > 0 else "") + json.dumps(key) + ": ")
+            keys.append(key)
+            if key == "commands":
+                write("[")
+                position = 0
+                for c in value:
+                    for transform in transforms:
+                        c = transform(c)
+                        if c is None:
+                            break
+                    if c is not None:
+                        #force the position to avoid bug during import
+                        c['position'] = position
+                        write((", " if position > 0 else "") + json.dumps(c))
+                        position += 1
+                write("]")
+            else:
+                write(json.dumps(updates[key](value) if key in updates else value))
+        #new keys are added at the end, as in the model
+        for key, update in updates.items():
+            if key not in keys:
+                write((", " if len(keys) > 0 else "") + json.dumps(key) + ": " + json.dumps(update(None)))
+                keys.append(key)
+        write("}")
+
+    def get_html(self):
+        if self.lazy and self._model is None:
+            html = io.StringIO()
+            self.write_html(html)
+            return html.getvalue()
+        if self._model_offsets is None:
+            self._model_offsets = NotebookParser.get_model_offsets(self._html)
+        return NotebookParser.set_html_content(self._html, json.dumps(self.get_notebook_model()), self._model_offsets)
+
+    def write_html(self, f):
+        """Write the notebook html in the file. In lazy mode, the content is encoded while it's generated instead of being built in memory."""
+        if not self.lazy or self._model is not None:
+            f.write(self.get_html())
+            return
+        if self._model_offsets is None:
+            self._model_offsets = NotebookParser.get_model_offsets(self._html)
+        start, end = self._model_offsets
+        f.write(self._html[:start])
+        write_encoded, flush = NotebookParser.get_content_encoder(f)
+        NotebookParser.write_model(write_encoded, self._content, self._pending_transforms, self._pending_updates)
+        flush()
+        f.write(self._html[end:])
+
+    @staticmethod
+    def get_content_encoder(f):
+        """write(text) encoding the notebook content in the file as it's received, and flush() writing the last bytes."""
+        remaining = [b""]
+        def write(text):
+            #base64 encoding by blocks of 3 bytes, the remaining bytes are encoded with the next chunk
+            data = remaining[0] + urllib.parse.quote(text, safe="()*''").encode('utf-8')
+            size = len(data) - len(data) % 3
+            f.write(base64.b64encode(data[:size]).decode('utf-8'))
+            remaining[0] = data[size:]
+        def flush():
+            f.write(base64.b64encode(remaining[0]).decode('utf-8'))
+            remaining[0] = b""
+        return write, flush
+
+    @staticmethod
+    def set_html_content(html, content: str, model_offsets = None):
+        """Return the html with the given notebook content (json model)"""
+        start, end = model_offsets if model_offsets is not None else NotebookParser.get_model_offsets(html)
         content = urllib.parse.quote(content, safe="()*''")
-        return self.html.replace(self.raw_content, base64.b64encode(content.encode('utf-8')).decode('utf-8'))
+        #Splice the new model at its position instead of searching & replacing it in the full html
+        return "".join([html[:start], base64.b64encode(content.encode('utf-8')).decode('utf-8'), html[end:]])
 
     def contains(self, str):
         return str in self.content
@@ -36,25 +268,32 @@ class NotebookParser:
         self.html = re.sub("""<script>\s?window\.__STATIC_SETTINGS__.*</script>""", "", self.html)
 
     def set_tracker_tag(self, org_id, uid, category, demo_name, notebook, username):
-        #Replace internal tags with dbdemos
+        self.content = NotebookParser.replace_tracker_tag(self.content, NotebookParser.get_tracker_url(org_id, uid, category, demo_name, notebook, username))
+
+    @staticmethod
+    def get_tracker_url(org_id, uid, category, demo_name, notebook, username):
+        """Tracker url of the notebook, None if the tracker is disabled"""
         if Tracker.enable_tracker:
             tracker = Tracker(org_id, uid, username)
+            return tracker.get_track_url(category, demo_name, "VIEW", notebook)
+        return None
+
+    @staticmethod
+    def replace_tracker_tag(content: str, tracker_url: str = None) -> str:
+        #Replace internal tags with dbdemos
+        if tracker_url is not None:
             #Our demos in the repo already have tags used when we clone the notebook directly.
             #We need to update the tracker with the demo configuration & dbdemos setup.
-            tracker_url = tracker.get_track_url(category, demo_name, "VIEW", notebook)
-            r = r"""(<img\s*width=\\?"1px\\?"\s*src=\\?")(https:\/\/ppxrzfxige\.execute-api\.us-west-2\.amazonaws\.com\/v1\/analytics.*?)(\\?"\s?\/?>)"""
-            self.content = re.sub(r, rf'\1{tracker_url}\3', self.content)
+            content = TRACKER_REGEX.sub(rf'\1{tracker_url}\3', content)
 
             #old legacy tracker, to be migrted & emoved
-            r = r"""(<img\s*width=\\?"1px\\?"\s*src=\\?")(https:\/\/www\.google-analytics\.com\/collect.*?)(\\?"\s?\/?>)"""
-            self.content = re.sub(r, rf'\1{tracker_url}\3', self.content)
-        else:
-            #Remove all the tracker from the notebook
-            self.replace_in_notebook(r"""<img\s*width=\\?"1px\\?"\s*src=\\?"https:\/\/www\.google-analytics\.com\/collect.*?\\?"\s?\/?>""", "", True)
-            self.replace_in_notebook(r"""<img\s*width=\\?"1px\\?"\s*src=\\?"https:\/\/ppxrzfxige\.execute-api\.us-west-2\.amazonaws\.com\/v1\/analytics.*?\\?"\s?\/?>""", "", True)
+            return LEGACY_TRACKER_REGEX.sub(rf'\1{tracker_url}\3', content)
+        #Remove all the tracker from the notebook
+        content = LEGACY_TRACKER_REGEX.sub("", content)
+        return TRACKER_REGEX.sub("", content)
 
     def remove_uncomment_tag(self):
-        self.replace_in_notebook('[#-]{1,2}\s*UNCOMMENT_FOR_DEMO ?', '', True)
+        self.replace_in_notebook(UNCOMMENT_TAG_REGEX, '', True)
 
     ##Remove the __build to avoid catalog conflict during build vs test
     # TODO: improve build and get a separate metastore for tests vs build.
@@ -63,9 +302,16 @@ class NotebookParser:
 
     def remove_robots_meta(self):
         #Drop the noindex tag
-        self.html = self.html.replace('<meta name="robots" content="nofollow, noindex">', '')
+        self.html = self.html.replace(ROBOTS_META, '')
 
     def add_cell_as_html_for_seo(self):
+        html = NotebookParser.get_seo_html(self.get_model()["commands"])
+        if len(html) > 0:
+            self.html = self.html.replace('<body>', NotebookParser.get_seo_div(html))
+            self.html = self.html.replace('<script>', SEO_SCRIPT, 1)
+
+    @staticmethod
+    def get_seo_html(commands):
         #Add div as hidden HTML for SEO to capture the main information in the page.
         def md_to_html(text):
             if text.startswith('%md-sandbox'):
@@ -78,74 +324,46 @@ class NotebookParser:
                 text = re.sub(rf'\s*{tag}\s*(.*)', rf'<h{i}>\1</h{i}>', text)
             text = text.replace('\n', '<br/>')
             return text
-        #Drop the noindex tag
-        content = json.loads(self.content)
         html = ""
-        for c in content["commands"]:
+        for c in commands:
             if c['command'].startswith('%md'):
                 html += '<div>'+md_to_html(c['command'])+'</div>'
-        if len(html) > 0:
-            self.html = self.html.replace('<body>', f'''<body><div id='no_js_render' style='display: none'>{html}</div>''')
-            self.html = self.html.replace('<script>', "<script>window.addEventListener('load', function(event) { "
-                                                        "if (/bot|google|baidu|bing|msn|teoma|slurp|yandex/i.test(navigator.userAgent)) {"
-                                                            "document.getElementById('no_js_render').style.display = 'block';"
-                                                        "};"
-                                                      "});", 1)
+        return html
 
     @staticmethod
-    def _replace_with_optional_escaped_quotes(content: str, old: str, new: str) -> str:
-        """
-        Helper to replace text handling both escaped and unescaped quotes.
-        In JSON content, quotes are escaped as \", but in parsed content they're not.
-        We handle both by trying replacements with escaped quotes first, then unescaped.
-        This is much faster than using regex.
-        """
-        # Try with escaped quotes first (JSON format: \")
-        old_escaped = old.replace('"', '\\"')
-        new_escaped = new.replace('"', '\\"')
-        content = content.replace(old_escaped, new_escaped)
-
-        # Then try with unescaped quotes (plain text format: ")
-        content = content.replace(old, new)
-
-        return content
+    def get_seo_div(seo_html):
+        return f'''<body><div id='no_js_render' style='display: none'>{seo_html}</div>'''
+
+    def get_minisite_html(self, notebook_path):
+        """Html of the minisite page, same as remove_robots_meta + add_cell_as_html_for_seo + remove_delete_cell +
+        add_javascript_to_minisite_relative_links + get_html, with the model parsed once. The html tags are only searched
+        & replaced in the html around the notebook model, which is encoded and spliced once."""
+        seo_html = NotebookParser.get_seo_html(self.get_model()["commands"])
+        self.remove_delete_cell()
+        if self._model_offsets is None:
+            self._model_offsets = NotebookParser.get_model_offsets(self._html)
+        start, end = self._model_offsets
+        parts = [self._html[:start], self._html[end:]]
+        script_added = False
+        for i in range(len(parts)):
+            parts[i] = parts[i].replace(ROBOTS_META, '')
+            if len(seo_html) > 0:
+                parts[i] = parts[i].replace('<body>', NotebookParser.get_seo_div(seo_html))
+                #The script is added to the first <script> tag of the page only
+                if not script_added and '<script>' in parts[i]:
+                    parts[i] = parts[i].replace('<script>', SEO_SCRIPT, 1)
+                    script_added = True
+            parts[i] = parts[i].replace('</body>', NotebookParser.get_minisite_links_script(notebook_path) + '</body>')
+        return NotebookParser.set_html_content(parts[0] + parts[1], json.dumps(self.get_notebook_model()), (len(parts[0]), len(parts[0])))
 
     @staticmethod
     def replace_schema_in_content(content: str, demo_conf: DemoConf) -> str:
         """
         Static method to replace schema/catalog references in any content string.
         Used for both notebook content and FILE object types.
+        All the replacements are done in a single scan, see SchemaReplacer for the rules.
         """
-        #main__build is used during the build process to avoid collision with default main.
-        # #main_build is used because agent don't support __ in their catalog name - TODO should improve this and move everything to main_build
-        content = NotebookParser._replace_with_optional_escaped_quotes(content, 'catalog = "main__build"', 'catalog = "main"')
-        content = NotebookParser._replace_with_optional_escaped_quotes(content, 'catalog = "main_build"', 'catalog = "main"')
-        content = content.replace(f'main__build.{demo_conf.default_schema}', f'main.{demo_conf.default_schema}')
-        content = content.replace(f'main_build.{demo_conf.default_schema}', f'main.{demo_conf.default_schema}')
-        content = content.replace('Volumes/main__build', 'Volumes/main')
-        content = content.replace('Volumes/main_build', 'Volumes/main')
-
-        #TODO we need to unify this across all demos.
-        if demo_conf.custom_schema_supported:
-            content = re.sub(r"\$catalog=[0-9a-z_]*\s{1,3}\$schema=[0-9a-z_]*", f"$catalog={demo_conf.catalog} $schema={demo_conf.schema}", content)
-            content = re.sub(r"\$catalog=[0-9a-z_]*\s{1,3}\$db=[0-9a-z_]*", f"$catalog={demo_conf.catalog} $db={demo_conf.schema}", content)
-            content = content.replace(f"{demo_conf.default_catalog}.{demo_conf.default_schema}", f"{demo_conf.catalog}.{demo_conf.schema}")
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'dbutils.widgets.text("catalog", "{demo_conf.default_catalog}"', f'dbutils.widgets.text("catalog", "{demo_conf.catalog}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'dbutils.widgets.text("schema", "{demo_conf.default_schema}"', f'dbutils.widgets.text("schema", "{demo_conf.schema}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'dbutils.widgets.text("db", "{demo_conf.default_schema}"', f'dbutils.widgets.text("db", "{demo_conf.schema}"')
-            content = content.replace(f'Volumes/{demo_conf.default_catalog}/{demo_conf.default_schema}', f'Volumes/{demo_conf.catalog}/{demo_conf.schema}')
-
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'catalog = "{demo_conf.default_catalog}"', f'catalog = "{demo_conf.catalog}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'dbName = db = "{demo_conf.default_schema}"', f'dbName = db = "{demo_conf.schema}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'schema = dbName = db = "{demo_conf.default_schema}"', f'schema = dbName = db = "{demo_conf.schema}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'db = "{demo_conf.default_schema}"', f'db = "{demo_conf.schema}"')
-            content = NotebookParser._replace_with_optional_escaped_quotes(content, f'schema = "{demo_conf.default_schema}"', f'schema = "{demo_conf.schema}"')
-            content = content.replace(f'USE SCHEMA {demo_conf.default_schema}', f'USE SCHEMA {demo_conf.schema}')
-            content = content.replace(f'USE CATALOG {demo_conf.default_catalog}', f'USE CATALOG {demo_conf.catalog}')
-            content = content.replace(f'CREATE CATALOG IF NOT EXISTS {demo_conf.default_catalog}', f'CREATE CATALOG IF NOT EXISTS {demo_conf.catalog}')
-            content = content.replace(f'CREATE SCHEMA IF NOT EXISTS {demo_conf.default_schema}', f'CREATE SCHEMA IF NOT EXISTS {demo_conf.schema}')
-
-        return content
+        return SchemaReplacer.for_demo(demo_conf).replace(content)
 
     def replace_schema(self, demo_conf: DemoConf):
         """Replace schema/catalog in notebook content"""
@@ -166,21 +384,21 @@ class NotebookParser:
             "position": position,
             "command": cell_content
         }
-        content = json.loads(self.content)
-        content["commands"].insert(position, command)
-        self.content = json.dumps(content)
+        self.get_model()["commands"].insert(position, command)
 
     #as auto ml links are unique per workspace, we have to delete them
     def remove_automl_result_links(self):
-        if "display_automl_" in self.content:
-            content = json.loads(self.content)
-            for c in content["commands"]:
-                if re.search('display_automl_[a-zA-Z]*_link', c["command"]):
-                    if 'results' in c and c['results'] is not None and 'data' in c['results'] and c['results']['data'] is not None and len(c['results']['data']) > 0:
-                        contains_exp_link = len([d for d in c['results']['data'] if 'Data exploration notebook' in d['data']]) > 0
-                        if contains_exp_link:
-                            c['results']['data'] = [{'type': 'ansi', 'data': 'Please run the notebook cells to get your AutoML links (from the begining)', 'name': None, 'arguments': {}, 'addedWidgets': {}, 'removedWidgets': [], 'datasetInfos': [], 'metadata': {}}]
-            self.content = json.dumps(content)
+        if self._content is None or "display_automl_" in self._content:
+            self.transform_commands([NotebookParser.remove_automl_result_links_command])
+
+    @staticmethod
+    def remove_automl_result_links_command(c):
+        if "display_automl_" in c["command"] and AUTOML_LINK_REGEX.search(c["command"]):
+            if 'results' in c and c['results'] is not None and 'data' in c['results'] and c['results']['data'] is not None and len(c['results']['data']) > 0:
+                contains_exp_link = len([d for d in c['results']['data'] if 'Data exploration notebook' in d['data']]) > 0
+                if contains_exp_link:
+                    c['results']['data'] = [{'type': 'ansi', 'data': 'Please run the notebook cells to get your AutoML links (from the begining)', 'name': None, 'arguments': {}, 'addedWidgets': {}, 'removedWidgets': [], 'datasetInfos': [], 'metadata': {}}]
+        return c
 
 
     #Will change the content to
@@ -192,7 +410,11 @@ class NotebookParser:
     def add_javascript_to_minisite_relative_links(self, notebook_path):
         # Add JavaScript to the HTML (not content) that intercepts link clicks
         # This is much more reliable than trying to modify the notebook content
+        # Insert the script before </body>
+        self.html = self.html.replace('</body>', NotebookParser.get_minisite_links_script(notebook_path) + '</body>')
 
+    @staticmethod
+    def get_minisite_links_script(notebook_path):
         # Get the notebook's directory (remove filename)
         notebook_dir = '/'.join(notebook_path.split('/')[:-1])
         script = f"""
@@ -318,56 +540,54 @@ class NotebookParser:
         }})();
         </script>
         """
-
-        # Insert the script before </body>
-        self.html = self.html.replace('</body>', script + '</body>')
+        return script
 
     #Set the environment metadata to the notebook.
     # TODO: might want to re-evaluate this once we move to ipynb format as it'll be set in the ipynb file, as metadata.
     def set_environement_metadata(self, client_version: str = "3"):
-        content = json.loads(self.content)
-        env_metadata = content.get("environmentMetadata", {})
-        if env_metadata is None:
-            env_metadata = {}
-        if ("client" not in env_metadata or 
-            env_metadata["client"] is None or 
-            int(env_metadata["client"]) < int(client_version)):
-            env_metadata["client"] = str(client_version)
-        content["environmentMetadata"] = env_metadata
-        self.content = json.dumps(content)
+        def update(env_metadata):
+            if env_metadata is None:
+                env_metadata = {}
+            if ("client" not in env_metadata or
+                env_metadata["client"] is None or
+                int(env_metadata["client"]) < int(client_version)):
+                env_metadata["client"] = str(client_version)
+            return env_metadata
+        self.update_model("environmentMetadata", update)
 
     def hide_commands_and_results(self):
-        #
+        self.remove_demo_tools_references()
+        self.transform_commands([NotebookParser.hide_commands_and_results_command])
+
+    def remove_demo_tools_references(self):
         self.replace_in_notebook('e2-demo-tools', 'xxxx', True)
-        content = json.loads(self.content)
-        for c in content["commands"]:
-            if "#hide_this_code" in c["command"].lower():
-                c["hideCommandCode"] = True
-            if "%run " in c["command"]:
-                c["hideCommandResult"] = True
-            if "results" in c and  c["results"] is not None and "data" in c["results"] and c["results"]["data"] is not None and \
-                    c["results"]["type"] == "table" and len(c["results"]["data"])>0 and str(c["results"]["data"][0][0]).startswith("This Delta Live Tables query is syntactically valid"):
-                c["hideCommandResult"] = True
-        self.content = json.dumps(content)
+
+    @staticmethod
+    def hide_commands_and_results_command(c):
+        if "#hide_this_code" in c["command"].lower():
+            c["hideCommandCode"] = True
+        if "%run " in c["command"]:
+            c["hideCommandResult"] = True
+        if "results" in c and  c["results"] is not None and "data" in c["results"] and c["results"]["data"] is not None and \
+                c["results"]["type"] == "table" and len(c["results"]["data"])>0 and str(c["results"]["data"][0][0]).startswith("This Delta Live Tables query is syntactically valid"):
+            c["hideCommandResult"] = True
+        return c
 
     def remove_delete_cell(self):
-        content = json.loads(self.content)
-        content["commands"] = [c for c in content["commands"] if "#dbdemos__delete_this_cell" not in c["command"].lower()]
-        self.content = json.dumps(content)
+        self.transform_commands([NotebookParser.remove_delete_cell_command])
+
+    @staticmethod
+    def remove_delete_cell_command(c):
+        return None if "#dbdemos__delete_this_cell" in c["command"].lower() else c
 
     def replace_dynamic_links(self, items, name, link_path):
         if len(items) == 0:
             return
-        matches = re.finditer(rf'<a\s*dbdemos-{name}-id=\\?[\'"](?P<item_id>.*?)\\?[\'"]\s*href=\\?[\'"].*?\/?{link_path}\/(?P<item_uid>[a-zA-Z0-9_-]*).*?>', self.content)
-        for match in matches:
-            item_id = match.groupdict()["item_id"]
-            installed = False
-            for i in items:
-                if i["id"] == item_id:
-                    installed = True
-                    self.content = self.content.replace(match.groupdict()["item_uid"], str(i['uid']))
-            if not installed:
-                print(f'''ERROR: couldn't find {name} with dbdemos-{name}-id={item_id}''')
+        self.content = RewriteRules.replace_links(self.content, [(name, link_path, RewriteRules.get_link_uids(name, items))])
+
+    def rewrite(self, rewrite_rules: RewriteRules):
+        """Replace the links to the installed resources and the catalog/schema, see RewriteRules"""
+        self.content = rewrite_rules.replace_schema(rewrite_rules.replace_dynamic_links(self.content))
 
 
     def replace_dynamic_links_workflow(self, workflows):
@@ -0,0 +1,32 @@
+from functools import lru_cache
+from importlib import resources
+
+
+@lru_cache(maxsize=None)
+def get_package_root(package: str = "dbdemos"):
+    """Root of the package resources (importlib.resources Traversable), resolved once per package"""
+    return resources.files(package)
+
+
+def get_resource(path: str, package: str = "dbdemos"):
+    return get_package_root(package).joinpath(*[p for p in path.split("/") if p])
+
+
+def resource_string(path: str, package: str = "dbdemos") -> bytes:
+    return get_resource(path, package).read_bytes()
+
+
+def resource_exists(path: str, package: str = "dbdemos") -> bool:
+    return get_resource(path, package).is_file() or get_resource(path, package).is_dir()
+
+
+def resource_isdir(path: str, package: str = "dbdemos") -> bool:
+    return get_resource(path, package).is_dir()
+
+
+def resource_listdir(path: str, package: str = "dbdemos"):
+    return [r.name for r in get_resource(path, package).iterdir()]
+
+
+def resource_stream(path: str, package: str = "dbdemos"):
+    return get_resource(path, package).open("rb")
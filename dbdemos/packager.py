@@ -1,71 +1,269 @@
-import pkg_resources
+import asyncio
+import contextlib
+import functools
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from .conf import DBClient, DemoConf, Conf, DemoNotebook
 from .notebook_parser import NotebookParser
+from .install_template import InstallTemplate
+from .packaging_manifest import PackagingManifest
+from .shared_objects import SharedObjects
+from .bundle_store import BundleStore
+from . import package_resources
+from .demo_catalog import DemoCatalog
 import json
 import os
 import re
 import shutil
-import base64
+import sys
+import threading
 from .job_bundler import JobBundler
-from concurrent.futures import ThreadPoolExecutor
-import collections
+from .task_graph import TaskGraph
 import zipfile
 import io
 
 
+@lru_cache(maxsize=None)
+def get_template(name: str) -> str:
+    """Website templates, loaded once per process"""
+    return package_resources.resource_string("template/"+name).decode('UTF-8')
+
+
+@lru_cache(maxsize=None)
+def get_processing_version() -> str:
+    """Hash of the code transforming the exported notebooks: any change in it invalidates the incremental packaging"""
+    h = hashlib.sha256()
+    for module in ["packager.py", "notebook_parser.py", "install_template.py", "rewrite_rules.py", "schema_replacer.py", "shared_objects.py"]:
+        h.update((Path(__file__).parent / module).read_bytes())
+    return h.hexdigest()
+
+
+def read_file(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def build_minisite_page(bundle_path: str, minisite_path: str, demo_name: str, notebook_path: str, clean_path: str):
+    """Write the website page of a notebook of the bundle. Module function, to run in the minisite process pool."""
+    Path(minisite_path).mkdir(parents=True, exist_ok=True)
+    full_path = minisite_path+"/"+clean_path+".html"
+    Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
+
+    # Check if we have a code file (.py or .sql) or notebook HTML file
+    # Code files are stored with their full extension in the bundle
+    if notebook_path.endswith(('.py', '.sql')):
+        # Code file - path already includes extension (.py or .sql)
+        source_file_path = bundle_path + "/" + clean_path
+        file_type = clean_path.split('.')[-1].upper()
+        print(f"  Generating HTML from {file_type} file: {source_file_path}")
+        Packager.generate_html_from_code_file(source_file_path, full_path, demo_name)
+    else:
+        # Standard notebook HTML file - append .html extension
+        source_file_path = bundle_path + "/" + clean_path + ".html"
+        if not os.path.exists(source_file_path):
+            raise FileNotFoundError(f"Could not find notebook file: {source_file_path}")
+        with open(source_file_path, "r") as f:
+            html = f.read()
+        #The notebook content is in the template, the packaged html is the page around it
+        template = InstallTemplate.load(read_file, InstallTemplate.get_path(source_file_path))
+        parser = NotebookParser(html, content=template.get_packaged_content() if template is not None else None)
+        html = parser.get_minisite_html(clean_path)
+        with open(full_path, "w") as f:
+            f.write(html)
+
+
 class Packager:
     DASHBOARD_IMPORT_API = "_import_api"
-    def __init__(self, conf: Conf, jobBundler: JobBundler):
-        self.db = DBClient(conf)
+    def __init__(self, conf: Conf, jobBundler: JobBundler, max_workers: int = 30):
+        #Global limit of concurrent packaging tasks (exports, minisite pages...), across all the demos
+        self.max_workers = max_workers
+        self.db = DBClient(conf, pool_size=max_workers)
         self.jobBundler = jobBundler
-
-    def package_all(self, iframe_root_src = "./"):
-        def package_demo(demo_conf: DemoConf):
-            self.clean_bundle(demo_conf)
-            self.package_demo(demo_conf)
-            if len(demo_conf.dashboards) > 0:
-                self.extract_lakeview_dashboards(demo_conf)
-            self.build_minisite(demo_conf, iframe_root_src)
-            
-        confs = [demo_conf for _, demo_conf in self.jobBundler.bundles.items()]        
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            collections.deque(executor.map(package_demo, confs))
-
-    def clean_bundle(self, demo_conf: DemoConf):
+        #demo name => PackagingManifest of the demo being packaged
+        self.manifests = {}
+        self.minisite_pool = None
+        #the demos are started concurrently, the staging repo must only be reset once
+        self.staging_lock = threading.Lock()
+
+    def package_all(self, iframe_root_src = "./", use_async: bool = False, incremental: bool = False):
+        """Package all the demos. In incremental mode, only the notebooks which changed since the previous packaging are exported again."""
+        if use_async:
+            return asyncio.run(self.package_all_async(iframe_root_src, incremental=incremental))
+
+        #All the demos are split in tasks (notebook exports, dashboards, minisite pages) scheduled in a single graph
+        graph = TaskGraph(max_workers=self.max_workers)
+        for demo_conf in self.jobBundler.bundles.values():
+            self.add_package_tasks(graph, demo_conf, iframe_root_src, incremental)
+        with self.use_minisite_pool():
+            graph.run()
+        self.save_shared_objects()
+
+    def save_shared_objects(self):
+        """Files of the package shared by all the bundles: shared objects store and demo catalog"""
+        SharedObjects.remove_unreferenced(self.get_bundles_path())
+        BundleStore.write_archive(SharedObjects.get_objects_path(self.get_bundles_path()))
+        DemoCatalog.build(self.get_bundles_path())
+
+    def get_bundles_path(self):
+        return "dbdemos/bundles"
+
+    @contextlib.contextmanager
+    def use_minisite_pool(self):
+        """Build the website pages in a pool of processes (one per core): parsing & encoding the notebooks is CPU bound."""
+        if self.minisite_pool is not None:
+            yield self.minisite_pool
+            return
+        #fork is fast & safe on linux only (macOS system frameworks aren't fork-safe): other platforms keep their default
+        context = multiprocessing.get_context("fork" if sys.platform.startswith("linux") else None)
+        with ProcessPoolExecutor(mp_context=context) as pool:
+            #Start the workers now, before the packaging threads: forking while other threads are running can deadlock.
+            pool.submit(int).result()
+            self.minisite_pool = pool
+            try:
+                yield pool
+            finally:
+                self.minisite_pool = None
+
+    def add_package_tasks(self, graph: TaskGraph, demo_conf: DemoConf, iframe_root_src = "./", incremental: bool = False):
+        """Add the tasks packaging the demo to the graph. The longest exports are started first, based on the size of the previous
+        packaging (pre-run notebooks first for a new bundle). Demos with the largest notebooks are also started first."""
+        name = demo_conf.name
+        sizes = {notebook.path: self.estimate_export_size(demo_conf, notebook) for notebook in demo_conf.notebooks}
+        graph.add(f"{name}/start", lambda: self.start_package_demo(demo_conf, incremental), priority=max(sizes.values(), default=0))
+        notebook_tasks = []
+        for notebook in demo_conf.notebooks:
+            task = f"{name}/notebook/{notebook.path}"
+            graph.add(task, lambda notebook=notebook: self.download_notebook(demo_conf, notebook, graph.results[f"{name}/start"]),
+                      depends_on=[f"{name}/start"], priority=sizes[notebook.path])
+            notebook_tasks.append(task)
+        graph.add(f"{name}/global_setup", lambda: self.package_global_setup_notebook(demo_conf, [graph.results[t] for t in notebook_tasks]),
+                  depends_on=notebook_tasks)
+        dashboard_tasks = []
+        for d in demo_conf.dashboards:
+            task = f"{name}/dashboard/{d['id']}"
+            graph.add(task, lambda d=d: self.extract_lakeview_dashboard(demo_conf, d), depends_on=[f"{name}/start"])
+            dashboard_tasks.append(task)
+        graph.add(f"{name}/manifest", lambda: self.save_manifest(demo_conf), depends_on=[f"{name}/global_setup"] + dashboard_tasks)
+        graph.add(f"{name}/archive", lambda: self.save_archive(demo_conf), depends_on=[f"{name}/manifest"])
+        #The global setup notebook isn't published on the website: the pages only need their own notebook
+        page_tasks = []
+        for notebook in demo_conf.get_notebooks_to_publish():
+            task = f"{name}/minisite/{notebook.path}"
+            graph.add(task, lambda notebook=notebook: self.build_minisite_page(demo_conf, notebook),
+                      depends_on=[f"{name}/notebook/{notebook.path}"], priority=sizes[notebook.path])
+            page_tasks.append(task)
+        graph.add(f"{name}/minisite", lambda: self.build_minisite_index(demo_conf, iframe_root_src), depends_on=[f"{name}/manifest"] + page_tasks)
+
+    def estimate_export_size(self, demo_conf: DemoConf, notebook: DemoNotebook):
+        full_path = demo_conf.get_bundle_path()+"/"+notebook.get_clean_path()
+        for path in [InstallTemplate.get_path(full_path+".html"), full_path+".zip", full_path]:
+            if os.path.isfile(path):
+                return os.path.getsize(path)
+        return 10000000 if notebook.pre_run else 1000000
+
+    async def package_all_async(self, iframe_root_src = "./", max_concurrency: int = 100, incremental: bool = False):
+        """Same as package_all, with the exports of all the demos running concurrently from a single thread (requires aiohttp)."""
+        from .async_client import AsyncDBClient
+        with self.use_minisite_pool() as pool:
+            async with AsyncDBClient(self.db.conf, max_concurrency, rate_limiter=self.db.rate_limiter) as db:
+                #The file processing (hashes, notebook parsing, zip) runs in threads, not to stall the downloads in flight
+                async def package_demo(demo_conf: DemoConf):
+                    await self.run_blocking(self.clean_bundle, demo_conf, incremental)
+                    await self.package_demo_async(db, demo_conf)
+                    if len(demo_conf.dashboards) > 0:
+                        await self.extract_lakeview_dashboards_async(db, demo_conf)
+                    await self.run_blocking(self.save_manifest, demo_conf)
+                    await self.run_blocking(self.save_archive, demo_conf)
+                    await asyncio.gather(*[asyncio.wrap_future(pool.submit(build_minisite_page, *self.get_minisite_page_args(demo_conf, notebook)))
+                                           for notebook in demo_conf.get_notebooks_to_publish()])
+                    await self.run_blocking(self.build_minisite_index, demo_conf, iframe_root_src)
+                await asyncio.gather(*[package_demo(c) for c in self.jobBundler.bundles.values()])
+        self.save_shared_objects()
+
+    @staticmethod
+    async def run_blocking(f, *args):
+        """Run the blocking function in the default executor of the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(f, *args))
+
+    def clean_bundle(self, demo_conf: DemoConf, incremental: bool = False):
+        #Incremental: keep the previous outputs, the stale ones are removed once the demo is packaged
+        if incremental:
+            self.manifests[demo_conf.name] = PackagingManifest.load(demo_conf.get_bundle_root_path())
+            return
         if Path(demo_conf.get_bundle_root_path()).exists():
             shutil.rmtree(demo_conf.get_bundle_root_path())
+        self.manifests[demo_conf.name] = PackagingManifest(demo_conf.get_bundle_root_path())
+
+    def get_manifest(self, demo_conf: DemoConf) -> PackagingManifest:
+        return self.manifests.setdefault(demo_conf.name, PackagingManifest(demo_conf.get_bundle_root_path()))
+
+    def save_manifest(self, demo_conf: DemoConf):
+        manifest = self.get_manifest(demo_conf)
+        manifest.remove_stale_outputs(demo_conf.get_bundle_path())
+        manifest.save()
+
+    def save_archive(self, demo_conf: DemoConf):
+        """The bundle is shipped compressed in the package (see BundleStore), the raw folder is kept for the next packaging."""
+        BundleStore.write_archive(demo_conf.get_bundle_path())
 
+    def get_export_source(self, demo_conf: DemoConf, **version):
+        """Version of the notebook source, and of the demo settings used to process it"""
+        return {**version, "env_version": demo_conf.env_version, "default_catalog": demo_conf.default_catalog, "default_schema": demo_conf.default_schema,
+                "custom_schema_supported": demo_conf.custom_schema_supported, "install_template": InstallTemplate.VERSION,
+                "packager": get_processing_version()}
+
+    def get_export_outputs(self, full_path, object_type = 'NOTEBOOK'):
+        if object_type == 'NOTEBOOK':
+            return [full_path+".html", InstallTemplate.get_path(full_path+".html")]
+        elif object_type == 'DIRECTORY':
+            return [full_path+".zip"]
+        return [full_path]
+
+
+    def get_dashboard_repo_path(self, demo_conf: DemoConf, dashboard):
+        repo_path = self.jobBundler.conf.get_repo_path()+"/"+demo_conf.path+"/_resources/dashboards/"+dashboard['id']+".lvdash.json"
+        return os.path.realpath(repo_path)
 
     def extract_lakeview_dashboards(self, demo_conf: DemoConf):
         for d in demo_conf.dashboards:
-            repo_path = self.jobBundler.conf.get_repo_path()+"/"+demo_conf.path+"/_resources/dashboards/"+d['id']+".lvdash.json"
-            repo_path = os.path.realpath(repo_path)
-            dashboard_file = self.db.get("2.0/workspace/export", {"path": repo_path, "format": "SOURCE", "direct_download": False})
-            if 'error_code' in dashboard_file:
-                raise Exception(f"Couldn't find dashboard {repo_path} in repo. Check repo ID in bundle conf file and make sure the dashboard is here. "
-                                f"{dashboard_file['error_code']} - {dashboard_file['message']}")
-            dashboard_file = base64.b64decode(dashboard_file['content']).decode('utf-8')
-            full_path = demo_conf.get_bundle_path()+"/_resources/dashboards/"+d['id']+".lvdash.json"
-            Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
-            with open(full_path, "w") as f:
-                f.write(dashboard_file)
-
-
-    def process_file_content(self, file, destination_path, extension = ""):
-        # Decode base64 content from the folder dict
-        file_content = base64.b64decode(file['content'])
-        with open(destination_path + extension, "wb") as f:
-            f.write(file_content)
+            self.extract_lakeview_dashboard(demo_conf, d)
+
+    def extract_lakeview_dashboard(self, demo_conf: DemoConf, dashboard):
+        repo_path = self.get_dashboard_repo_path(demo_conf, dashboard)
+        full_path = self.get_dashboard_destination(demo_conf, dashboard)
+        dashboard_file = self.db.download("2.0/workspace/export", {"path": repo_path, "format": "SOURCE"}, full_path)
+        self.save_lakeview_dashboard(demo_conf, repo_path, dashboard_file, full_path)
+
+    async def extract_lakeview_dashboards_async(self, db, demo_conf: DemoConf):
+        async def extract(d):
+            repo_path = self.get_dashboard_repo_path(demo_conf, d)
+            full_path = await self.run_blocking(self.get_dashboard_destination, demo_conf, d)
+            dashboard_file = await db.download("2.0/workspace/export", {"path": repo_path, "format": "SOURCE"}, full_path)
+            self.save_lakeview_dashboard(demo_conf, repo_path, dashboard_file, full_path)
+        await asyncio.gather(*[extract(d) for d in demo_conf.dashboards])
+
+    def get_dashboard_destination(self, demo_conf: DemoConf, dashboard):
+        full_path = demo_conf.get_bundle_path()+"/_resources/dashboards/"+dashboard['id']+".lvdash.json"
+        Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
+        return full_path
+
+    def save_lakeview_dashboard(self, demo_conf: DemoConf, repo_path, dashboard_file, full_path):
+        #The dashboard is streamed to its destination, only check the result of the export
+        if 'error_code' in dashboard_file:
+            raise Exception(f"Couldn't find dashboard {repo_path} in repo. Check repo ID in bundle conf file and make sure the dashboard is here. "
+                            f"{dashboard_file['error_code']} - {dashboard_file['message']}")
+        self.get_manifest(demo_conf).add_output(full_path)
 
     def process_notebook_content(self, demo_conf: DemoConf, html, full_path):
-        #Replace notebook content.
-        parser = NotebookParser(html)
+        #Replace notebook content. Lazy parser: the pre-run notebooks can contain large results.
+        parser = NotebookParser(html, lazy=True)
         parser.remove_uncomment_tag()
-        parser.set_environement_metadata(demo_conf.env_version)
         parser.remove_dbdemos_build()
+        parser.remove_demo_tools_references()
         #parser.remove_static_settings()
-        parser.hide_commands_and_results()
         #Moving away from the initial 00-global-setup, remove it once migration is completed
         requires_global_setup_v2 = False
         if parser.contains("00-global-setup-v2"):
@@ -73,83 +271,195 @@ class Packager:
             requires_global_setup_v2 = True
         elif parser.contains("00-global-setup"):
             raise Exception("00-global-setup is deprecated. Please use 00-global-setup-v2 instead.")
+        #Model updates last, so that the notebook is only parsed & serialized once, install transformations included
+        parser.set_environement_metadata(demo_conf.env_version)
+        parser.transform_commands([NotebookParser.hide_commands_and_results_command] + InstallTemplate.TRANSFORMS)
+        #Precompiled content for the installer, which only has to rewrite the catalog/schema & links
+        InstallTemplate.from_content(parser.content, demo_conf, transformed=True).save(InstallTemplate.get_path(full_path))
+        #The content is only shipped in the template: the html is the page around an empty model
         with open(full_path, "w") as f:
-            f.write(parser.get_html())
-            return requires_global_setup_v2
-
-    def package_demo(self, demo_conf: DemoConf):
+            f.write(NotebookParser.set_html_content(parser.html, ""))
+        return requires_global_setup_v2
+
+    def package_demo(self, demo_conf: DemoConf, iframe_root_src = "./", incremental: bool = False):
+        """Package a single demo, with the same scheduling as package_all"""
+        graph = TaskGraph(max_workers=self.max_workers)
+        self.add_package_tasks(graph, demo_conf, iframe_root_src, incremental)
+        with self.use_minisite_pool():
+            graph.run()
+        self.save_shared_objects()
+
+    def start_package_demo(self, demo_conf: DemoConf, incremental: bool = False):
+        """Prepare the bundle folder and return the job run of the pre-run notebooks (None if the demo doesn't have any)"""
         print(f"packaging demo {demo_conf.name} ({demo_conf.path})")
-        if len(demo_conf.get_notebooks_to_publish()) > 0 and not self.jobBundler.staging_reseted:
-            self.jobBundler.reset_staging_repo()
+        self.clean_bundle(demo_conf, incremental)
+        self.reset_staging_repo(demo_conf)
+        run = None
         if len(demo_conf.get_notebooks_to_run()) > 0:
             run = self.db.get("2.1/jobs/runs/get", {"run_id": demo_conf.run_id, "include_history": False})
-            if 'state' not in run:
-                raise Exception(f"Can't get the last job {self.db.conf.workspace_url}/#job/{demo_conf.job_id}/run/{demo_conf.run_id} state for demo {demo_conf.name}: {run}")
-            if run['state']['result_state'] != 'SUCCESS':
-                raise Exception(f"last job {self.db.conf.workspace_url}/#job/{demo_conf.job_id}/run/{demo_conf.run_id} failed for demo {demo_conf.name}. Can't package the demo. {run['state']}")
-
-        def download_notebook_html(notebook: DemoNotebook):
-            full_path = demo_conf.get_bundle_path()+"/"+notebook.get_clean_path()
-            print(f"downloading {notebook.path} to {full_path}")
-            Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
-            if not notebook.pre_run:
-                repo_path = self.jobBundler.conf.get_repo_path()+"/"+demo_conf.path+"/"+notebook.path
-                repo_path = os.path.realpath(repo_path)
-                #print(f"downloading from repo {repo_path}")
-                status = self.db.get("2.0/workspace/get-status", {"path": repo_path})
-                if 'error_code' in status:
-                    raise Exception(f"Couldn't find file {repo_path} in workspace. Check notebook path in bundle conf file. {status['error_code']} - {status['message']}")
-                #We add the type of the object in the conf to know how to load it back.
-                demo_conf.update_notebook_object_type(notebook, status['object_type'])
-                if status['object_type'] == 'NOTEBOOK':
-                    file = self.db.get("2.0/workspace/export", {"path": repo_path, "format": "HTML", "direct_download": False})
-                    if 'error_code' in file:
-                        raise Exception(f"Couldn't find file {repo_path} in workspace. Check notebook path in bundle conf file. {file['error_code']} - {file['message']}")
-                    html = base64.b64decode(file['content']).decode('utf-8')
-                    return self.process_notebook_content(demo_conf, html, full_path+".html")
-                elif status['object_type'] == 'DIRECTORY':
-                    folder = self.db.get("2.0/workspace/export", {"path": repo_path, "format": "AUTO", "direct_download": True})
-                    return self.process_file_content(folder, full_path, ".zip")
-                elif status['object_type'] == 'FILE':
-                    file = self.db.get("2.0/workspace/export", {"path": repo_path, "format": "AUTO", "direct_download": True})
-                    return self.process_file_content(file, full_path)
-                else:
-                    raise Exception(f"Unsupported object type {status['object_type']} for {repo_path}")
-            else:
-                tasks = [t for t in run['tasks'] if t['notebook_task']['notebook_path'].endswith(notebook.get_clean_path())]
-                if len(tasks) == 0:
-                    raise Exception(f"couldn't find task for notebook {notebook.path}. Please re-run the job & make sure the stating git repo is synch / reseted.")
-                #print(f"Exporting notebook from job run {tasks[0]['run_id']}")
-                notebook_result = self.db.get("2.1/jobs/runs/export", {'run_id': tasks[0]['run_id'], 'views_to_export': 'ALL'})
-                if "views" not in notebook_result:
-                    raise Exception(f"couldn't get notebook for run {tasks[0]['run_id']} - {notebook.path}. {demo_conf.name}. You probably did a run repair. Please re run the job. - {notebook_result}")
-                html = notebook_result["views"][0]["content"]
-                return self.process_notebook_content(demo_conf, html, full_path+".html")
-            
+            self.check_job_run(demo_conf, run)
+        return run
 
-        requires_global_setup_v2 = False
-        
-        # Process notebooks in parallel with max 5 workers
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            # Submit all notebooks for processing and collect futures
-            futures = [executor.submit(download_notebook_html, notebook) for notebook in demo_conf.notebooks]
-            
-            # Process results as they complete
-            for future in futures:
-                rv1 = future.result()
-                if rv1:
-                    requires_global_setup_v2 = True
+    def reset_staging_repo(self, demo_conf: DemoConf):
+        if len(demo_conf.get_notebooks_to_publish()) > 0:
+            with self.staging_lock:
+                if not self.jobBundler.staging_reseted:
+                    self.jobBundler.reset_staging_repo()
+
+    def package_global_setup_notebook(self, demo_conf: DemoConf, notebook_results):
+        #Add the global notebook if required
+        if any(notebook_results):
+            init_notebook = self.add_global_setup_notebook(demo_conf)
+            file = self.db.download("2.0/workspace/export", {"path": self.jobBundler.conf.get_repo_path() +"/"+ init_notebook.path, "format": "HTML"},
+                                    self.get_global_setup_destination(demo_conf, init_notebook))
+            self.save_global_setup_notebook(demo_conf, init_notebook, file)
+
+    async def package_demo_async(self, db, demo_conf: DemoConf):
+        """Export all the notebooks of the demo concurrently using the given AsyncDBClient."""
+        print(f"packaging demo {demo_conf.name} ({demo_conf.path})")
+        self.reset_staging_repo(demo_conf)
+        run = None
+        if len(demo_conf.get_notebooks_to_run()) > 0:
+            run = await db.get("2.1/jobs/runs/get", {"run_id": demo_conf.run_id, "include_history": False})
+            self.check_job_run(demo_conf, run)
+
+        results = await asyncio.gather(*[self.download_notebook_async(db, demo_conf, notebook, run) for notebook in demo_conf.notebooks])
 
         #Add the global notebook if required
-        if requires_global_setup_v2:
-            init_notebook = DemoNotebook("_resources/00-global-setup-v2", "Global init", "Global init")
-            demo_conf.add_notebook(init_notebook)
-            file = self.db.get("2.0/workspace/export", {"path": self.jobBundler.conf.get_repo_path() +"/"+ init_notebook.path, "format": "HTML", "direct_download": False})
-            if 'error_code' in file:
-                raise Exception(f"Couldn't find file '{self.jobBundler.conf.get_repo_path()}/{init_notebook.path}' in workspace. Check notebook path in bundle conf file. {file['error_code']} - {file['message']}")
-            html = base64.b64decode(file['content']).decode('utf-8')
-            with open(demo_conf.get_bundle_path() + "/" + init_notebook.path+".html", "w") as f:
-                f.write(html)
+        if any(results):
+            init_notebook = self.add_global_setup_notebook(demo_conf)
+            file = await db.download("2.0/workspace/export", {"path": self.jobBundler.conf.get_repo_path() +"/"+ init_notebook.path, "format": "HTML"},
+                                    await self.run_blocking(self.get_global_setup_destination, demo_conf, init_notebook))
+            await self.run_blocking(self.save_global_setup_notebook, demo_conf, init_notebook, file)
+
+    def check_job_run(self, demo_conf: DemoConf, run):
+        if 'state' not in run:
+            raise Exception(f"Can't get the last job {self.db.conf.workspace_url}/#job/{demo_conf.job_id}/run/{demo_conf.run_id} state for demo {demo_conf.name}: {run}")
+        if run['state']['result_state'] != 'SUCCESS':
+            raise Exception(f"last job {self.db.conf.workspace_url}/#job/{demo_conf.job_id}/run/{demo_conf.run_id} failed for demo {demo_conf.name}. Can't package the demo. {run['state']}")
+
+    def add_global_setup_notebook(self, demo_conf: DemoConf):
+        init_notebook = DemoNotebook("_resources/00-global-setup-v2", "Global init", "Global init")
+        demo_conf.add_notebook(init_notebook)
+        return init_notebook
+
+    def get_global_setup_destination(self, demo_conf: DemoConf, init_notebook: DemoNotebook):
+        full_path = demo_conf.get_bundle_path() + "/" + init_notebook.path+".html"
+        Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
+        return full_path
+
+    def save_global_setup_notebook(self, demo_conf: DemoConf, init_notebook: DemoNotebook, file):
+        if 'error_code' in file:
+            raise Exception(f"Couldn't find file '{self.jobBundler.conf.get_repo_path()}/{init_notebook.path}' in workspace. Check notebook path in bundle conf file. {file['error_code']} - {file['message']}")
+        #Same notebook in all the demos: saved once in the shared objects, referenced in the bundle conf
+        name = SharedObjects.store(self.get_bundles_path(), self.get_global_setup_destination(demo_conf, init_notebook))
+        demo_conf.add_shared_object(init_notebook.path+".html", name)
+
+    #The download is split between the API calls (sync or async) and the processing of the export, shared by both.
+    def download_notebook(self, demo_conf: DemoConf, notebook: DemoNotebook, run):
+        full_path = self.get_notebook_destination(demo_conf, notebook)
+        if not notebook.pre_run:
+            repo_path = self.get_notebook_repo_path(demo_conf, notebook)
+            status = self.db.get("2.0/workspace/get-status", {"path": repo_path})
+            object_type = self.get_notebook_object_type(demo_conf, notebook, repo_path, status)
+            source = self.get_export_source(demo_conf, object_type=object_type, modified_at=status.get('modified_at'))
+            outputs = self.get_export_outputs(full_path, object_type)
+            unchanged = self.get_manifest(demo_conf).get_unchanged(notebook.path, source, outputs)
+            if unchanged is not None:
+                print(f"{notebook.path} unchanged since last packaging, skipping export")
+                return unchanged['requires_global_setup_v2']
+            destination = self.get_export_destination(full_path, object_type)
+            file = self.db.download("2.0/workspace/export", self.get_export_params(repo_path, object_type), destination)
+            requires_global_setup_v2 = self.save_notebook_export(demo_conf, repo_path, object_type, file, destination, full_path)
+        else:
+            task_run_id = self.get_notebook_task_run_id(notebook, run)
+            source = self.get_export_source(demo_conf, run_id=task_run_id)
+            outputs = self.get_export_outputs(full_path)
+            unchanged = self.get_manifest(demo_conf).get_unchanged(notebook.path, source, outputs)
+            if unchanged is not None:
+                print(f"{notebook.path} unchanged since last packaging (run {task_run_id}), skipping export")
+                return unchanged['requires_global_setup_v2']
+            notebook_result = self.db.get("2.1/jobs/runs/export", {'run_id': task_run_id, 'views_to_export': 'ALL'})
+            requires_global_setup_v2 = self.save_run_export(demo_conf, notebook, task_run_id, notebook_result, full_path)
+        self.get_manifest(demo_conf).add(notebook.path, source, outputs, requires_global_setup_v2)
+        return requires_global_setup_v2
+
+    async def download_notebook_async(self, db, demo_conf: DemoConf, notebook: DemoNotebook, run):
+        full_path = self.get_notebook_destination(demo_conf, notebook)
+        if not notebook.pre_run:
+            repo_path = self.get_notebook_repo_path(demo_conf, notebook)
+            status = await db.get("2.0/workspace/get-status", {"path": repo_path})
+            object_type = self.get_notebook_object_type(demo_conf, notebook, repo_path, status)
+            source = self.get_export_source(demo_conf, object_type=object_type, modified_at=status.get('modified_at'))
+            outputs = self.get_export_outputs(full_path, object_type)
+            unchanged = await self.run_blocking(self.get_manifest(demo_conf).get_unchanged, notebook.path, source, outputs)
+            if unchanged is not None:
+                print(f"{notebook.path} unchanged since last packaging, skipping export")
+                return unchanged['requires_global_setup_v2']
+            destination = self.get_export_destination(full_path, object_type)
+            file = await db.download("2.0/workspace/export", self.get_export_params(repo_path, object_type), destination)
+            requires_global_setup_v2 = await self.run_blocking(self.save_notebook_export, demo_conf, repo_path, object_type, file, destination, full_path)
+        else:
+            task_run_id = self.get_notebook_task_run_id(notebook, run)
+            source = self.get_export_source(demo_conf, run_id=task_run_id)
+            outputs = self.get_export_outputs(full_path)
+            unchanged = await self.run_blocking(self.get_manifest(demo_conf).get_unchanged, notebook.path, source, outputs)
+            if unchanged is not None:
+                print(f"{notebook.path} unchanged since last packaging (run {task_run_id}), skipping export")
+                return unchanged['requires_global_setup_v2']
+            notebook_result = await db.get("2.1/jobs/runs/export", {'run_id': task_run_id, 'views_to_export': 'ALL'})
+            requires_global_setup_v2 = await self.run_blocking(self.save_run_export, demo_conf, notebook, task_run_id, notebook_result, full_path)
+        await self.run_blocking(self.get_manifest(demo_conf).add, notebook.path, source, outputs, requires_global_setup_v2)
+        return requires_global_setup_v2
+
+    def get_notebook_destination(self, demo_conf: DemoConf, notebook: DemoNotebook):
+        full_path = demo_conf.get_bundle_path()+"/"+notebook.get_clean_path()
+        print(f"downloading {notebook.path} to {full_path}")
+        Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
+        return full_path
+
+    def get_notebook_repo_path(self, demo_conf: DemoConf, notebook: DemoNotebook):
+        repo_path = self.jobBundler.conf.get_repo_path()+"/"+demo_conf.path+"/"+notebook.path
+        return os.path.realpath(repo_path)
+
+    def get_notebook_object_type(self, demo_conf: DemoConf, notebook: DemoNotebook, repo_path, status):
+        if 'error_code' in status:
+            raise Exception(f"Couldn't find file {repo_path} in workspace. Check notebook path in bundle conf file. {status['error_code']} - {status['message']}")
+        #We add the type of the object in the conf to know how to load it back.
+        demo_conf.update_notebook_object_type(notebook, status['object_type'])
+        if status['object_type'] not in ['NOTEBOOK', 'DIRECTORY', 'FILE']:
+            raise Exception(f"Unsupported object type {status['object_type']} for {repo_path}")
+        return status['object_type']
+
+    def get_export_params(self, repo_path, object_type):
+        if object_type == 'NOTEBOOK':
+            return {"path": repo_path, "format": "HTML"}
+        return {"path": repo_path, "format": "AUTO"}
+
+    def get_export_destination(self, full_path, object_type):
+        #Notebooks are processed before being saved, the other objects are streamed to their output file (DIRECTORY as .zip)
+        if object_type == 'NOTEBOOK':
+            return io.BytesIO()
+        return self.get_export_outputs(full_path, object_type)[0]
+
+    def save_notebook_export(self, demo_conf: DemoConf, repo_path, object_type, file, destination, full_path):
+        if 'error_code' in file:
+            raise Exception(f"Couldn't find file {repo_path} in workspace. Check notebook path in bundle conf file. {file['error_code']} - {file['message']}")
+        if object_type == 'NOTEBOOK':
+            return self.process_notebook_content(demo_conf, destination.getvalue().decode('utf-8'), full_path+".html")
+        return False
+
+    def get_notebook_task_run_id(self, notebook: DemoNotebook, run):
+        tasks = [t for t in run['tasks'] if t['notebook_task']['notebook_path'].endswith(notebook.get_clean_path())]
+        if len(tasks) == 0:
+            raise Exception(f"couldn't find task for notebook {notebook.path}. Please re-run the job & make sure the stating git repo is synch / reseted.")
+        return tasks[0]['run_id']
+
+    def save_run_export(self, demo_conf: DemoConf, notebook: DemoNotebook, task_run_id, notebook_result, full_path):
+        if "views" not in notebook_result:
+            raise Exception(f"couldn't get notebook for run {task_run_id} - {notebook.path}. {demo_conf.name}. You probably did a run repair. Please re run the job. - {notebook_result}")
+        html = notebook_result["views"][0]["content"]
+        return self.process_notebook_content(demo_conf, html, full_path+".html")
 
     def get_file_icon_svg(self, file_path: str) -> str:
         """
@@ -257,7 +567,8 @@ class Packager:
 
         return html
 
-    def generate_html_from_code_file(self, code_file_path: str, output_html_path: str, demo_name: str):
+    @staticmethod
+    def generate_html_from_code_file(code_file_path: str, output_html_path: str, demo_name: str):
         """
         Generate HTML file from .py or .sql code file with syntax highlighting
 
@@ -290,7 +601,7 @@ class Packager:
         code_content_escaped = html.escape(code_content)
 
         # Load the code viewer template
-        template = pkg_resources.resource_string("dbdemos", "template/code_viewer.html").decode('UTF-8')
+        template = get_template("code_viewer.html")
 
         # Replace placeholders
         template = template.replace("{{FILE_NAME}}", file_name)
@@ -310,37 +621,23 @@ class Packager:
     def build_minisite(self, demo_conf: DemoConf, iframe_root_src = "./"):
         notebooks_to_publish = demo_conf.get_notebooks_to_publish()
         print(f"Build minisite for demo {demo_conf.name} ({demo_conf.path}) - {notebooks_to_publish}")
-        minisite_path = demo_conf.get_minisite_path()
+        with self.use_minisite_pool() as pool:
+            futures = [pool.submit(build_minisite_page, *self.get_minisite_page_args(demo_conf, notebook)) for notebook in notebooks_to_publish]
+            for future in futures:
+                future.result()
+        self.build_minisite_index(demo_conf, iframe_root_src)
 
-        for notebook in notebooks_to_publish:
-            Path(minisite_path).mkdir(parents=True, exist_ok=True)
-            full_path = minisite_path+"/"+notebook.get_clean_path()+".html"
-            Path(full_path[:full_path.rindex("/")]).mkdir(parents=True, exist_ok=True)
-
-            # Check if we have a code file (.py or .sql) or notebook HTML file
-            # Code files are stored with their full extension in the bundle
-            clean_path = notebook.get_clean_path()
-
-            if notebook.path.endswith(('.py', '.sql')):
-                # Code file - path already includes extension (.py or .sql)
-                source_file_path = demo_conf.get_bundle_path() + "/" + clean_path
-                file_type = clean_path.split('.')[-1].upper()
-                print(f"  Generating HTML from {file_type} file: {source_file_path}")
-                self.generate_html_from_code_file(source_file_path, full_path, demo_conf.name)
-            else:
-                # Standard notebook HTML file - append .html extension
-                source_file_path = demo_conf.get_bundle_path() + "/" + clean_path + ".html"
-                if not os.path.exists(source_file_path):
-                    raise FileNotFoundError(f"Could not find notebook file: {source_file_path}")
-                with open(source_file_path, "r") as f:
-                    parser = NotebookParser(f.read())
-                with open(full_path, "w") as f:
-                    parser.remove_robots_meta()
-                    parser.add_cell_as_html_for_seo()
-                    parser.remove_delete_cell()
-                    parser.add_javascript_to_minisite_relative_links(notebook.get_clean_path())
-                    f.write(parser.get_html())
+    def get_minisite_page_args(self, demo_conf: DemoConf, notebook: DemoNotebook):
+        return demo_conf.get_bundle_path(), demo_conf.get_minisite_path(), demo_conf.name, notebook.path, notebook.get_clean_path()
 
+    def build_minisite_page(self, demo_conf: DemoConf, notebook: DemoNotebook):
+        if self.minisite_pool is None:
+            return build_minisite_page(*self.get_minisite_page_args(demo_conf, notebook))
+        return self.minisite_pool.submit(build_minisite_page, *self.get_minisite_page_args(demo_conf, notebook)).result()
+
+    def build_minisite_index(self, demo_conf: DemoConf, iframe_root_src = "./"):
+        notebooks_to_publish = demo_conf.get_notebooks_to_publish()
+        minisite_path = demo_conf.get_minisite_path()
         # Build the tree structure from all notebooks
         tree = self.build_tree_structure(notebooks_to_publish)
 
@@ -348,7 +645,7 @@ class Packager:
         tree_html = self.render_tree_html(tree, iframe_root_src)
 
         # Create the index file
-        template = pkg_resources.resource_string("dbdemos", "template/index.html").decode('UTF-8')
+        template = get_template("index.html")
         template = template.replace("{{LEFT_MENU}}", tree_html)
         template = template.replace("{{TITLE}}", demo_conf.title)
         template = template.replace("{{DESCRIPTION}}", demo_conf.description)
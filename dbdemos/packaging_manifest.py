@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class PackagingManifest:
+    """Source version (workspace modification time or job run id) and output hash of every notebook exported in a bundle,
+    saved in the bundle folder (not shipped in the package).
+    Used by incremental packaging to skip the export & processing of the notebooks which didn't change since the previous
+    packaging, and to remove the outputs of the notebooks which aren't part of the demo anymore.
+    The source version includes a hash of the packager code, so a change in the notebook processing exports everything again."""
+    FILE_NAME = ".packaging_manifest.json"
+    VERSION = 1
+
+    def __init__(self, bundle_root_path: str, previous_notebooks: dict = None):
+        self.path = bundle_root_path + "/" + PackagingManifest.FILE_NAME
+        self.previous_notebooks = previous_notebooks if previous_notebooks is not None else {}
+        self.notebooks = {}
+        #Other files written in the bundle during this packaging (dashboards, global setup...)
+        self.outputs = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_file_hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def get_unchanged(self, notebook_path: str, source: dict, outputs):
+        """Return the entry of the previous packaging if the notebook source is the same and its outputs are still there, untouched.
+        The entry is then kept in the new manifest. Return None if the notebook has to be exported again."""
+        previous = self.previous_notebooks.get(notebook_path)
+        if previous is None or None in source.values() or previous["source"] != source or sorted(previous["outputs"]) != sorted(outputs):
+            return None
+        for output, output_hash in previous["outputs"].items():
+            if not os.path.exists(output) or PackagingManifest.get_file_hash(output) != output_hash:
+                return None
+        with self._lock:
+            self.notebooks[notebook_path] = previous
+        return previous
+
+    def add(self, notebook_path: str, source: dict, outputs, requires_global_setup_v2):
+        entry = {"source": source, "outputs": {o: PackagingManifest.get_file_hash(o) for o in outputs},
+                 "requires_global_setup_v2": bool(requires_global_setup_v2)}
+        with self._lock:
+            self.notebooks[notebook_path] = entry
+
+    def add_output(self, path: str):
+        with self._lock:
+            self.outputs.add(path)
+
+    def remove_stale_outputs(self, bundle_path: str):
+        """Delete the files of the bundle which weren't produced by this packaging (notebooks removed from the demo)."""
+        with self._lock:
+            outputs = set(self.outputs)
+            for entry in self.notebooks.values():
+                outputs.update(entry["outputs"])
+        for root, _, files in os.walk(bundle_path):
+            for file in files:
+                path = Path(root, file).as_posix()
+                if path not in outputs:
+                    print(f"removing {path}, not part of the demo anymore")
+                    os.remove(path)
+
+    def to_json(self) -> str:
+        with self._lock:
+            return json.dumps({"version": PackagingManifest.VERSION, "notebooks": self.notebooks}, sort_keys=True, indent=1)
+
+    def save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            f.write(self.to_json())
+
+    @staticmethod
+    def load(bundle_root_path: str):
+        """Return the manifest of the previous packaging, empty if the bundle was never packaged or can't be read."""
+        path = bundle_root_path + "/" + PackagingManifest.FILE_NAME
+        if not os.path.exists(path):
+            return PackagingManifest(bundle_root_path)
+        try:
+            with open(path, "r") as f:
+                manifest = json.loads(f.read())
+        except Exception as e:
+            print(f"WARN: can't read the packaging manifest, the demo will be fully packaged: {e}")
+            return PackagingManifest(bundle_root_path)
+        if manifest.get("version") != PackagingManifest.VERSION:
+            return PackagingManifest(bundle_root_path)
+        return PackagingManifest(bundle_root_path, manifest["notebooks"])
@@ -0,0 +1,101 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding up to `burst` tokens. Thread-safe."""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long (sec) the caller must wait before using it.
+        Tokens can be borrowed in advance: concurrent callers get increasing waits instead of all retrying at once."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Client-side rate limit per endpoint family (see retry_policy.get_endpoint_family), shared by all the threads
+    using the same DBClient. Families without limit aren't throttled. The longest matching prefix wins.
+    Limits are expressed as (calls per second, burst)."""
+    DEFAULT_LIMITS = {
+        "workspace/import": (10, 10),
+        "lakeview": (2, 2),
+        "jobs": (5, 5),
+    }
+
+    def __init__(self, limits: dict = None):
+        self._lock = threading.Lock()
+        self.buckets = {}
+        limits = RateLimiter.DEFAULT_LIMITS if limits is None else limits
+        for family, (rate, burst) in limits.items():
+            self.set_limit(family, rate, burst)
+
+    def set_limit(self, family: str, rate: float, burst: int = 1):
+        with self._lock:
+            self.buckets[family] = TokenBucket(rate, burst)
+
+    def get_bucket(self, family: str):
+        prefixes = [p for p in self.buckets if family == p or family.startswith(p+"/")]
+        if len(prefixes) == 0:
+            return None
+        return self.buckets[max(prefixes, key=len)]
+
+    def reserve(self, family: str) -> float:
+        bucket = self.get_bucket(family)
+        return 0 if bucket is None else bucket.reserve()
+
+    def acquire(self, family: str):
+        wait_time = self.reserve(family)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit for parallel API calls: the limit grows by 1 after each window of `limit` healthy calls
+    (and stays the same while calls are slower than `latency_threshold` sec), and is halved when a call is throttled
+    or fails (at most once per `cooldown` sec, as all the calls in flight usually fail together)."""
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 10, latency_threshold: float = 10, cooldown: float = 1):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._healthy_calls = 0
+        self._last_decrease = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot. Returns the start time to give back to release()."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, start: float, healthy: bool = True):
+        latency = time.monotonic() - start
+        with self._condition:
+            self.in_flight -= 1
+            if not healthy:
+                self._healthy_calls = 0
+                if time.monotonic() - self._last_decrease > self.cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = time.monotonic()
+            elif latency <= self.latency_threshold:
+                self._healthy_calls += 1
+                if self._healthy_calls >= int(self.limit):
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._healthy_calls = 0
+            self._condition.notify_all()
@@ -0,0 +1,151 @@
+import collections
+import random
+import requests
+import re
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+
+def get_endpoint_family(path: str) -> str:
+    """Group an API path by endpoint family, dropping the version and the resource ids.
+    ex: 2.0/workspace/import => workspace/import, 2.1/jobs/runs/get => jobs/runs, 2.0/repos/1234 => repos"""
+    parts = path.split("?")[0].strip("/").split("/")
+    if len(parts) > 0 and re.match(r"^\d+\.\d+$", parts[0]):
+        parts = parts[1:]
+    family = []
+    for part in parts[:2]:
+        if not re.match(r"^[a-z_-]+$", part):
+            break
+        family.append(part)
+    return "/".join(family)
+
+
+class RetryStats:
+    """Thread-safe counters of the calls retried by a DBClient, per endpoint family."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = collections.Counter()
+        self.retries = collections.Counter()
+        self.throttled = collections.Counter()
+        self.wait_time = collections.Counter()
+
+    def record_call(self, family: str):
+        with self._lock:
+            self.calls[family] += 1
+
+    def record_retry(self, family: str, wait_time: float, throttled: bool):
+        with self._lock:
+            self.retries[family] += 1
+            self.wait_time[family] += wait_time
+            if throttled:
+                self.throttled[family] += 1
+
+    def get_total_wait_time(self) -> float:
+        with self._lock:
+            return sum(self.wait_time.values())
+
+    def get_summary(self) -> dict:
+        with self._lock:
+            return {family: {"calls": self.calls[family], "retries": self.retries[family],
+                             "throttled": self.throttled[family], "wait_time": round(self.wait_time[family], 1)}
+                    for family in self.calls}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.retries.clear()
+            self.throttled.clear()
+            self.wait_time.clear()
+
+
+class RetryPolicy:
+    """Decides if a workspace API call should be retried and how long to wait before the next attempt.
+
+    - 429 / REQUEST_LIMIT_EXCEEDED are always retried: the call was throttled and not processed.
+    - 5xx / TEMPORARILY_UNAVAILABLE / connection errors are only retried for idempotent calls
+      (all verbs except POST, the POST endpoints listed in IDEMPOTENT_POSTS, and the imports with overwrite).
+    - Replays of a processed call failing as the work is already done (DONE_ON_REPLAY) are successful calls.
+    - Waits use exponential backoff with jitter, or the Retry-After header when the server sends it.
+      Throttled calls without Retry-After wait at least min_throttled_delay.
+    - Each endpoint family has its own retry budget (see DEFAULT_BUDGETS, longest prefix wins).
+    """
+    THROTTLING_ERROR_CODES = {"REQUEST_LIMIT_EXCEEDED"}
+    TRANSIENT_ERROR_CODES = {"TEMPORARILY_UNAVAILABLE"}
+    TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+    #POST calls which can safely be replayed (same final state if the first call was processed). A replayed delete of a
+    #processed call fails as the object is already gone: see DONE_ON_REPLAY.
+    IDEMPOTENT_POSTS = {"workspace/mkdirs", "workspace/delete", "workspace/get-status",
+                        "clusters/start", "clusters/edit", "clusters/delete", "libraries/install",
+                        "jobs/reset", "jobs/delete"}
+    #POST calls which can only be replayed with "overwrite": true. Without it, a replay of a call processed before the
+    #error fails with RESOURCE_ALREADY_EXISTS.
+    IDEMPOTENT_WITH_OVERWRITE = {"workspace/import"}
+    #Error of a replayed call meaning that a previous attempt was processed: the call succeeded.
+    DONE_ON_REPLAY = {"workspace/delete": "RESOURCE_DOES_NOT_EXIST"}
+    DEFAULT_BUDGETS = {"workspace/import": 5, "lakeview": 5}
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 2, max_delay: float = 60, budgets: dict = None, min_throttled_delay: float = 15):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        #Same as the fixed 15sec wait on 429 used before the retry policy: the workspace limits are per minute
+        self.min_throttled_delay = min_throttled_delay
+        self.budgets = dict(RetryPolicy.DEFAULT_BUDGETS) if budgets is None else budgets
+        self.stats = RetryStats()
+
+    def get_budget(self, family: str) -> int:
+        prefixes = [p for p in self.budgets if family == p or family.startswith(p+"/")]
+        if len(prefixes) == 0:
+            return self.max_retries
+        return self.budgets[max(prefixes, key=len)]
+
+    def is_idempotent(self, method: str, family: str, body: dict = None) -> bool:
+        if method.upper() != "POST" or family in RetryPolicy.IDEMPOTENT_POSTS:
+            return True
+        return family in RetryPolicy.IDEMPOTENT_WITH_OVERWRITE and isinstance(body, dict) and body.get("overwrite") is True
+
+    def is_done_on_replay(self, family: str, attempt: int, error_code: str = None) -> bool:
+        """True if the error of a retried call means that an attempt before the transient error was processed (ex: folder already deleted)."""
+        return attempt > 0 and error_code is not None and RetryPolicy.DONE_ON_REPLAY.get(family) == error_code
+
+    def is_throttled(self, status_code: int, error_code: str = None) -> bool:
+        return status_code == 429 or error_code in RetryPolicy.THROTTLING_ERROR_CODES
+
+    def should_retry(self, method: str, family: str, attempt: int, status_code: int, error_code: str = None, body: dict = None) -> bool:
+        if attempt >= self.get_budget(family):
+            return False
+        if self.is_throttled(status_code, error_code):
+            return True
+        if status_code in RetryPolicy.TRANSIENT_STATUS_CODES or error_code in RetryPolicy.TRANSIENT_ERROR_CODES:
+            return self.is_idempotent(method, family, body)
+        return False
+
+    def should_retry_exception(self, method: str, family: str, attempt: int, exception: Exception, body: dict = None) -> bool:
+        if attempt >= self.get_budget(family):
+            return False
+        #ChunkedEncodingError: connection dropped while the body was read
+        return isinstance(exception, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)) \
+            and self.is_idempotent(method, family, body)
+
+    def get_delay(self, attempt: int, retry_after: str = None, throttled: bool = False) -> float:
+        delay = self.parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.max_delay)
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        return max(delay, self.min_throttled_delay) if throttled else delay
+
+    @staticmethod
+    def parse_retry_after(retry_after: str):
+        """Retry-After is either a number of seconds or an HTTP date. Returns None if missing/invalid."""
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
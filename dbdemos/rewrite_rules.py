@@ -0,0 +1,91 @@
+import re
+from functools import lru_cache
+
+from .conf import DemoConf
+from .schema_replacer import SchemaReplacer
+
+#main__build is used during the build process to avoid collision with default main. #main_build is used because agent don't support __ in their catalog name.
+DASHBOARD_BUILD_CATALOG_REGEXES = [(re.compile(r"`?main[_]{1,2}build`"), "main"),
+                                   (re.compile(r"main[_]{1,2}build\."), "main."),
+                                   (re.compile(r"`main[_]{1,2}build`\."), "`main`.")]
+
+#(item type, link path) of the links updated with the uid of the resources installed
+DYNAMIC_LINK_TYPES = [("dashboard", "/sql/dashboardsv3"),
+                      ("genie", "/genie/rooms"),
+                      ("pipeline", "#joblist/pipelines"),
+                      ("repo", "#workspace"),
+                      ("workflow", "#job")]
+
+
+@lru_cache(maxsize=None)
+def get_dynamic_links_regex(link_types: tuple):
+    """Single regex matching the links of all the (item type, link path), one named alternative per type"""
+    patterns = []
+    for name, link_path in link_types:
+        patterns.append(rf'(?P<{name}><a\s*dbdemos-{name}-id=\\?[\'"](?P<{name}_id>.*?)\\?[\'"]\s*href=\\?[\'"].*?\/?{link_path}\/(?P<{name}_uid>[a-zA-Z0-9_-]*).*?>)')
+    return re.compile("|".join(patterns))
+
+
+class RewriteRules:
+    """Content rewrites of a demo installation (catalog/schema, links to the installed resources), compiled once
+    per install and shared by all the notebooks, files and dashboards of the demo."""
+
+    def __init__(self, demo_conf: DemoConf):
+        self.demo_conf = demo_conf
+        self.schema_replacer = SchemaReplacer.for_demo(demo_conf)
+        self.dashboard_schema_regex = None
+        if demo_conf.custom_schema_supported:
+            self.dashboard_schema_regex = re.compile(r"`?" + re.escape(demo_conf.default_catalog) + r"`?\.`?" + re.escape(demo_conf.default_schema) + r"`?")
+        #item type => {item id => installed uid}
+        self.links = {}
+
+    def with_resources(self, dashboards=None, genie_rooms=None, pipelines=None, repos=None, workflows=None):
+        """Return the rules with the dynamic links of the resources installed (items as {"id": ..., "uid": ...})."""
+        rules = RewriteRules.__new__(RewriteRules)
+        rules.__dict__.update(self.__dict__)
+        rules.links = {}
+        for name, items in [("dashboard", dashboards), ("genie", genie_rooms), ("pipeline", pipelines), ("repo", repos), ("workflow", workflows)]:
+            if items:
+                rules.links[name] = RewriteRules.get_link_uids(name, items)
+        return rules
+
+    @staticmethod
+    def get_link_uids(name, items):
+        uids = {}
+        for i in items:
+            uid = str(i["uid"])
+            #Repo links are relative to #workspace/
+            if name == "repo" and uid.startswith("/"):
+                uid = uid[1:]
+            uids[i["id"]] = uid
+        return uids
+
+    @staticmethod
+    def replace_links(content: str, links) -> str:
+        """Replace the uid of all the dbdemos links in a single pass. links: list of (item type, link path, {item id: uid})"""
+        if len(links) == 0:
+            return content
+        uids = {name: item_uids for name, link_path, item_uids in links}
+        def replace_link(match):
+            name = match.lastgroup
+            item_id = match.group(f"{name}_id")
+            if item_id not in uids[name]:
+                print(f'''ERROR: couldn't find {name} with dbdemos-{name}-id={item_id}''')
+                return match.group(0)
+            #Only the uid is replaced, within the link
+            start, end = match.start(f"{name}_uid") - match.start(), match.end(f"{name}_uid") - match.start()
+            return match.group(0)[:start] + uids[name][item_id] + match.group(0)[end:]
+        return get_dynamic_links_regex(tuple((name, link_path) for name, link_path, item_uids in links)).sub(replace_link, content)
+
+    def replace_dynamic_links(self, content: str) -> str:
+        return RewriteRules.replace_links(content, [(name, link_path, self.links[name]) for name, link_path in DYNAMIC_LINK_TYPES if name in self.links])
+
+    def replace_schema(self, content: str) -> str:
+        return self.schema_replacer.replace(content)
+
+    def replace_dashboard_schema(self, definition: str) -> str:
+        for regex, replacement in DASHBOARD_BUILD_CATALOG_REGEXES:
+            definition = regex.sub(replacement, definition)
+        if self.dashboard_schema_regex is not None:
+            return self.dashboard_schema_regex.sub(f"`{self.demo_conf.catalog}`.`{self.demo_conf.schema}`", definition)
+        return definition
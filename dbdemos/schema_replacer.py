@@ -0,0 +1,121 @@
+import re
+from functools import lru_cache
+
+
+class SchemaReplacer:
+    """Replace the catalog/schema references of the demo content (notebooks, files) with the catalog/schema of the installation.
+    The rules are an ordered list of replacements, a rule being able to rewrite the output of a previous one
+    (ex: main__build => main => custom catalog), built once per catalog/schema configuration.
+    Every rule pattern contains an anchor (main__build, $catalog=, the default schema...). The anchors are searched once,
+    and the rules are only applied on the windows of content around them, instead of scanning the full notebook
+    (mostly results and images) once per rule."""
+    #Windows closer than this are merged, to keep the number of windows (and python calls) low on dense content
+    MERGE_DISTANCE = 32 * 1024
+
+    def __init__(self, default_catalog: str, default_schema: str, catalog: str, schema: str, custom_schema_supported: bool):
+        self.rules = [(old, new, regex) for old, new, regex in
+                      SchemaReplacer.get_rules(default_catalog, default_schema, catalog, schema, custom_schema_supported) if old != new]
+        self.regex_rules = {old: re.compile(old) for old, new, regex in self.rules if regex}
+        anchors = [a for a in ["main__build", "main_build", "$catalog=", default_schema, default_catalog] if a]
+        self.anchors = set()
+        for old, new, regex in self.rules:
+            anchor = "$catalog=" if regex else next((a for a in anchors if a in old), old)
+            self.anchors.add(anchor)
+        #A match is at most at the pattern length from its anchor. Keep a margin for the chained rules.
+        #Only depends on the patterns, so that the windows are the same for any target catalog/schema (see InstallTemplate)
+        self.margin = 4 * max([len(old) for old, new, regex in self.rules], default=0)
+        self.regex_extension = re.compile(r"[0-9a-z_\s$=]*")
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def get(default_catalog: str, default_schema: str, catalog: str, schema: str, custom_schema_supported: bool):
+        return SchemaReplacer(default_catalog, default_schema, catalog, schema, custom_schema_supported)
+
+    @staticmethod
+    def for_demo(demo_conf):
+        return SchemaReplacer.get(demo_conf.default_catalog, demo_conf.default_schema, demo_conf.catalog, demo_conf.schema,
+                                  demo_conf.custom_schema_supported)
+
+    @staticmethod
+    def get_rules(default_catalog, default_schema, catalog, schema, custom_schema_supported):
+        """Ordered list of (pattern, replacement, is_regex)"""
+        rules = []
+        def add(old, new, regex=False):
+            rules.append((old, new, regex))
+        def add_with_optional_escaped_quotes(old, new):
+            #In JSON content, quotes are escaped as \", but in parsed content they're not.
+            add(old.replace('"', '\\"'), new.replace('"', '\\"'))
+            add(old, new)
+
+        #main__build is used during the build process to avoid collision with default main.
+        # #main_build is used because agent don't support __ in their catalog name - TODO should improve this and move everything to main_build
+        add_with_optional_escaped_quotes('catalog = "main__build"', 'catalog = "main"')
+        add_with_optional_escaped_quotes('catalog = "main_build"', 'catalog = "main"')
+        add(f'main__build.{default_schema}', f'main.{default_schema}')
+        add(f'main_build.{default_schema}', f'main.{default_schema}')
+        add('Volumes/main__build', 'Volumes/main')
+        add('Volumes/main_build', 'Volumes/main')
+
+        #TODO we need to unify this across all demos.
+        if custom_schema_supported:
+            add(r"\$catalog=[0-9a-z_]*\s{1,3}\$schema=[0-9a-z_]*", f"$catalog={catalog} $schema={schema}", True)
+            add(r"\$catalog=[0-9a-z_]*\s{1,3}\$db=[0-9a-z_]*", f"$catalog={catalog} $db={schema}", True)
+            add(f"{default_catalog}.{default_schema}", f"{catalog}.{schema}")
+            add_with_optional_escaped_quotes(f'dbutils.widgets.text("catalog", "{default_catalog}"', f'dbutils.widgets.text("catalog", "{catalog}"')
+            add_with_optional_escaped_quotes(f'dbutils.widgets.text("schema", "{default_schema}"', f'dbutils.widgets.text("schema", "{schema}"')
+            add_with_optional_escaped_quotes(f'dbutils.widgets.text("db", "{default_schema}"', f'dbutils.widgets.text("db", "{schema}"')
+            add(f'Volumes/{default_catalog}/{default_schema}', f'Volumes/{catalog}/{schema}')
+
+            add_with_optional_escaped_quotes(f'catalog = "{default_catalog}"', f'catalog = "{catalog}"')
+            add_with_optional_escaped_quotes(f'dbName = db = "{default_schema}"', f'dbName = db = "{schema}"')
+            add_with_optional_escaped_quotes(f'schema = dbName = db = "{default_schema}"', f'schema = dbName = db = "{schema}"')
+            add_with_optional_escaped_quotes(f'db = "{default_schema}"', f'db = "{schema}"')
+            add_with_optional_escaped_quotes(f'schema = "{default_schema}"', f'schema = "{schema}"')
+            add(f'USE SCHEMA {default_schema}', f'USE SCHEMA {schema}')
+            add(f'USE CATALOG {default_catalog}', f'USE CATALOG {catalog}')
+            add(f'CREATE CATALOG IF NOT EXISTS {default_catalog}', f'CREATE CATALOG IF NOT EXISTS {catalog}')
+            add(f'CREATE SCHEMA IF NOT EXISTS {default_schema}', f'CREATE SCHEMA IF NOT EXISTS {schema}')
+        return rules
+
+    def replace_sequentially(self, content: str) -> str:
+        """Apply the rules one after the other on the content (reference implementation, one scan per rule)."""
+        for old, new, regex in self.rules:
+            if regex:
+                content = self.regex_rules[old].sub(new, content)
+            else:
+                content = content.replace(old, new)
+        return content
+
+    def get_windows(self, content: str):
+        """Sorted, non overlapping (start, end) windows containing all the possible rule matches."""
+        windows = []
+        for anchor in self.anchors:
+            i = content.find(anchor)
+            while i >= 0:
+                end = i + len(anchor)
+                if anchor == "$catalog=":
+                    #the regex rules ($catalog=xxx $schema=yyy) can extend further, on these characters only
+                    end = self.regex_extension.match(content, end).end()
+                windows.append((max(0, i - self.margin), end + self.margin))
+                i = content.find(anchor, i + 1)
+        windows.sort()
+        merged = []
+        for start, end in windows:
+            if len(merged) > 0 and start <= merged[-1][1] + SchemaReplacer.MERGE_DISTANCE:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def replace(self, content: str) -> str:
+        windows = self.get_windows(content)
+        if len(windows) == 0:
+            return content
+        parts = []
+        last = 0
+        for start, end in windows:
+            parts.append(content[last:start])
+            parts.append(self.replace_sequentially(content[start:end]))
+            last = end
+        parts.append(content[last:])
+        return "".join(parts)
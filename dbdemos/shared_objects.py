@@ -0,0 +1,58 @@
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .conf import DemoConf
+
+
+class SharedObjects:
+    """Content-addressed store of the bundle files which are identical across demos (ex: the global setup notebook).
+    Each file is saved once under bundles/_shared/objects/<sha256><extension>, and referenced by the bundles in their
+    conf.json: "shared_objects": {path in the install_package folder: object name}.
+    Folders starting with _ in bundles aren't demos."""
+    FOLDER = "_shared"
+
+    @staticmethod
+    def get_object_name(file_path: str) -> str:
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest() + Path(file_path).suffix
+
+    @staticmethod
+    def get_objects_path(bundles_path: str) -> str:
+        return bundles_path + "/" + SharedObjects.FOLDER + "/objects"
+
+    @staticmethod
+    def store(bundles_path: str, file_path: str) -> str:
+        """Move the file to the store (dropped if the same content is already stored) and return its object name."""
+        name = SharedObjects.get_object_name(file_path)
+        objects_path = SharedObjects.get_objects_path(bundles_path)
+        Path(objects_path).mkdir(parents=True, exist_ok=True)
+        if os.path.exists(objects_path + "/" + name):
+            os.remove(file_path)
+        else:
+            os.replace(file_path, objects_path + "/" + name)
+        return name
+
+    @staticmethod
+    def remove_unreferenced(bundles_path: str):
+        """Delete the objects which aren't referenced by any bundle anymore."""
+        referenced = set()
+        for conf_path in glob.glob(bundles_path + "/*/conf.json"):
+            with open(conf_path, "r") as f:
+                referenced.update(json.loads(f.read()).get("shared_objects", {}).values())
+        for object_path in glob.glob(SharedObjects.get_objects_path(bundles_path) + "/*"):
+            if os.path.basename(object_path) not in referenced:
+                os.remove(object_path)
+
+    @staticmethod
+    def get_resource_path(demo_conf: DemoConf, path: str) -> str:
+        """Resource path of a file of the bundle (bundles/<demo>/install_package/...), in the store if it's shared."""
+        prefix = "bundles/" + demo_conf.name + "/install_package/"
+        if path.startswith(prefix) and path[len(prefix):] in demo_conf.shared_objects:
+            return "bundles/" + SharedObjects.FOLDER + "/objects/" + demo_conf.shared_objects[path[len(prefix):]]
+        return path
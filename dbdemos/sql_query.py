@@ -1,17 +1,18 @@
 import logging
-from databricks.sdk import WorkspaceClient
-from databricks.sdk.service.sql import StatementState, ExecuteStatementRequestOnWaitTimeout
-from databricks.sdk.service.sql import ResultData, ResultManifest
-from typing import List, Dict, Any
+from typing import List, Dict, Any, TYPE_CHECKING
 import time
 
 from dbdemos.exceptions.dbdemos_exception import SQLQueryException
+if TYPE_CHECKING:
+    #The SDK is only imported when a query is executed (slow import)
+    from databricks.sdk import WorkspaceClient
+    from databricks.sdk.service.sql import ResultData, ResultManifest
 
 class SQLQueryExecutor:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def get_or_create_shared_warehouse(self, ws: WorkspaceClient) -> str:
+    def get_or_create_shared_warehouse(self, ws: 'WorkspaceClient') -> str:
         warehouses = ws.warehouses.list()
         
         # First, look for a shared warehouse
@@ -36,11 +37,12 @@ class SQLQueryExecutor:
         )
         return new_warehouse.id
 
-    def execute_query_as_list(self, ws: WorkspaceClient, query: str, timeout: int = 50, warehouse_id: str = None, debug: bool = False) -> tuple[ResultData, ResultManifest]:
+    def execute_query_as_list(self, ws: 'WorkspaceClient', query: str, timeout: int = 50, warehouse_id: str = None, debug: bool = False) -> 'tuple[ResultData, ResultManifest]':
         data, manifest = self.execute_query(ws, query, timeout, warehouse_id, debug)
         return self.get_results_formatted_as_list(data, manifest)
 
-    def execute_query(self, ws: WorkspaceClient, query: str, timeout: int = 50, warehouse_id: str = None, debug: bool = False) -> tuple[ResultData, ResultManifest]:
+    def execute_query(self, ws: 'WorkspaceClient', query: str, timeout: int = 50, warehouse_id: str = None, debug: bool = False) -> 'tuple[ResultData, ResultManifest]':
+        from databricks.sdk.service.sql import StatementState, ExecuteStatementRequestOnWaitTimeout, ResultData
         if not warehouse_id:
             warehouse_id = self.get_or_create_shared_warehouse(ws)
         if debug:
@@ -82,7 +84,7 @@ class SQLQueryExecutor:
             
         return combined_data, results.manifest
 
-    def get_results_formatted_as_list(self, result_data: ResultData, result_manifest: ResultManifest) -> List[Dict[str, Any]]:
+    def get_results_formatted_as_list(self, result_data: 'ResultData', result_manifest: 'ResultManifest') -> List[Dict[str, Any]]:
         column_names = [col.name for col in result_manifest.schema.columns]
         
         result_list = []
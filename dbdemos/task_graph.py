@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class TaskGraph:
+    """Runs a set of tasks as soon as their dependencies are completed, with up to max_workers tasks in parallel.
+
+    Tasks are functions without argument. Their return value is available in graph.results[name] once they're
+    completed, so a task can read the results of the tasks it depends on. When several tasks are ready, the highest
+    priority starts first (then the insertion order).
+    The first task failing stops the scheduling: the running tasks are completed and the exception is re-raised as-is.
+        graph = TaskGraph(max_workers=4)
+        graph.add("pipelines", lambda: create_pipelines())
+        graph.add("workflows", lambda: create_workflows(graph.results["pipelines"]), depends_on=["pipelines"])
+        results = graph.run()
+    """
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.results = {}
+        self.durations = {}
+
+    def add(self, name: str, fn, depends_on: list = None, priority: int = 0):
+        if name in self.tasks:
+            raise Exception(f"Task {name} is already defined in the graph.")
+        self.tasks[name] = {"fn": fn, "depends_on": list(depends_on or []), "priority": priority, "order": len(self.tasks)}
+        return self
+
+    def check(self):
+        for name, task in self.tasks.items():
+            for d in task["depends_on"]:
+                if d not in self.tasks:
+                    raise Exception(f"Task {name} depends on unknown task {d}.")
+        #Kahn's algorithm, any task left has a circular dependency
+        remaining = {name: set(task["depends_on"]) for name, task in self.tasks.items()}
+        while len(remaining) > 0:
+            ready = [name for name, deps in remaining.items() if len(deps) == 0]
+            if len(ready) == 0:
+                raise Exception(f"Circular dependency between tasks {sorted(remaining.keys())}.")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(self) -> dict:
+        self.check()
+        pending = dict(self.tasks)
+        running = {}
+        error = None
+
+        def run_task(name, fn):
+            start = time.time()
+            try:
+                return fn()
+            finally:
+                self.durations[name] = time.time() - start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while (len(pending) > 0 and error is None) or len(running) > 0:
+                if error is None:
+                    ready = [name for name, task in pending.items() if all(d in self.results for d in task["depends_on"])]
+                    ready.sort(key=lambda name: (-pending[name]["priority"], pending[name]["order"]))
+                    for name in ready[:max(0, self.max_workers - len(running))]:
+                        running[executor.submit(run_task, name, pending.pop(name)["fn"])] = name
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    else:
+                        self.results[name] = future.result()
+        if error is not None:
+            raise error
+        return self.results
+
+    def get_critical_path_duration(self) -> float:
+        """Longest chain of task durations through the graph, i.e. the minimum wall time of the run."""
+        finish = {}
+        def get_finish(name):
+            if name not in finish:
+                deps = self.tasks[name]["depends_on"]
+                finish[name] = self.durations.get(name, 0) + max([get_finish(d) for d in deps], default=0)
+            return finish[name]
+        return max([get_finish(name) for name in self.tasks], default=0)
@@ -21,6 +21,8 @@ Optional environment variables (sensible defaults shown)
   DBDEMOS_REPO_URL        Repo URL (default: https://github.com/databricks-demos/dbdemos-notebooks)
   DBDEMOS_BRANCH          Branch to bundle from (default: main)
   DBDEMOS_FORCE           "1"/"true" to force job re-execution (default: false)
+  DBDEMOS_INCREMENTAL     "1"/"true" to only export the notebooks changed since the previous packaging (default: false)
+  DBDEMOS_ASYNC           "1"/"true" to scan/run/export with asyncio, requires aiohttp (default: false)
 
 Exit codes
 ----------
@@ -157,6 +159,8 @@ def _run_stage(stage: str, fn):
 
 def package_all_demos(conf: Conf):
     force = _truthy(_optional_env("DBDEMOS_FORCE", "false"))
+    use_async = _truthy(_optional_env("DBDEMOS_ASYNC", "false"))
+    incremental = _truthy(_optional_env("DBDEMOS_INCREMENTAL", "false"))
 
     bundler = JobBundler(conf)
 
@@ -167,7 +171,7 @@ def package_all_demos(conf: Conf):
 
     _run_stage(
         "scan & load all bundles",
-        bundler.load_bundles_conf,
+        lambda: bundler.load_bundles_conf(use_async=use_async),
     )
 
     bundle_count = len(bundler.bundles)
@@ -183,14 +187,14 @@ def package_all_demos(conf: Conf):
     _run_stage(
         "run & wait for all bundle jobs",
         lambda: bundler.start_and_wait_bundle_jobs(
-            force_execution=force, skip_execution=False, recreate_jobs=False
+            force_execution=force, skip_execution=False, recreate_jobs=False, use_async=use_async
         ),
     )
 
     packager = Packager(conf, bundler)
     _run_stage(
         "package all demos",
-        packager.package_all,
+        lambda: packager.package_all(use_async=use_async, incremental=incremental),
     )
 
     print(f"\n✅ Successfully bundled & packaged all {bundle_count} demos.")
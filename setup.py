@@ -17,14 +17,17 @@ setup(
     include_package_data=True,
     install_requires=[
         "requests==2.33.0",
-        "pandas==3.0.1",
         "databricks-sdk==0.114.0",
         "cryptography==46.0.6",  # Transitive dep, pinned for CVE-2026-34073
     ],
     license="Databricks License",
     license_files = ('LICENSE',),
+    extras_require={
+        #only required to bundle the demos with use_async=True
+        "async": ["aiohttp"],
+    },
     tests_require=[
         "pytest"
     ],
-    python_requires=">=3.7"
+    python_requires=">=3.9"
 )
@@ -0,0 +1,56 @@
+"""Benchmark of the windowed schema replacement (SchemaReplacer.replace) against the sequential one (one scan per rule).
+Not collected by pytest. Run from the repo root, on the synthetic notebook and optionally on bundled notebooks
+(files or bundle folders, ex: dbdemos/bundles/lakehouse-retail-c360/install_package):
+
+    python -m test.bench_schema_replacer [paths...]
+"""
+import glob
+import os
+import sys
+import time
+
+from dbdemos.schema_replacer import SchemaReplacer
+
+from .test_schema_replacer import get_synthetic_notebook
+
+
+def get_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(f for pattern in ["*.html", "*.tpl.json"] for f in glob.glob(path + "/**/" + pattern, recursive=True))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def time_replace(replace, content: str, repeat: int) -> float:
+    """Best duration of the replacement, in seconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        replace(content)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def run(paths, repeat: int = 5):
+    replacer = SchemaReplacer("main", "dbdemos_retail", "my_catalog", "my_schema", True)
+    contents = [("synthetic notebook", get_synthetic_notebook())]
+    for file in get_files(paths):
+        with open(file, "r") as f:
+            contents.append((file, f.read()))
+    total_sequential, total_windowed = 0, 0
+    for name, content in contents:
+        if replacer.replace(content) != replacer.replace_sequentially(content):
+            raise Exception(f"The windowed replacement differs from the sequential one for {name}")
+        sequential = time_replace(replacer.replace_sequentially, content, repeat)
+        windowed = time_replace(replacer.replace, content, repeat)
+        total_sequential += sequential
+        total_windowed += windowed
+        print(f"{name} ({len(content)/1e6:.1f}MB): sequential {sequential*1000:.1f}ms, windowed {windowed*1000:.1f}ms, x{sequential/max(windowed, 1e-9):.1f}")
+    print(f"total: sequential {total_sequential*1000:.1f}ms, windowed {total_windowed*1000:.1f}ms, x{total_sequential/max(total_windowed, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,10 @@
+import base64
+import json
+import urllib.parse
+
+
+def get_notebook_html(commands):
+    """Minimal notebook html export, with the given commands in its model"""
+    model = {"name": "test", "language": "python", "commands": commands}
+    content = urllib.parse.quote(json.dumps(model), safe="()*''")
+    return "<html><script>__DATABRICKS_NOTEBOOK_MODEL = '"+base64.b64encode(content.encode('utf-8')).decode('utf-8')+"';</script></html>"
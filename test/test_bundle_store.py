@@ -0,0 +1,41 @@
+import os
+import sys
+
+from dbdemos.bundle_store import BundleStore
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_bundle_store_reads_archived_bundles(tmp_path, monkeypatch):
+    package = tmp_path / "bundle_store_package"
+    write(str(package / "__init__.py"), "")
+    bundle = str(package / "bundles" / "demo-a" / "install_package")
+    write(bundle + "/01-intro.html", "<html>intro</html>" * 1000)
+    write(bundle + "/_resources/00-setup.html", "setup")
+    write(str(package / "bundles" / "demo-a" / "conf.json"), "{}")
+    write(str(package / "bundles" / "demo-b" / "install_package" / "01-raw.html"), "raw")
+    BundleStore.write_archive(bundle)
+    BundleStore.write_archive(str(package / "bundles" / "missing"))
+    assert os.path.getsize(bundle + ".zip") < 1000
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    store = BundleStore("bundle_store_package")
+    #raw folder removed, as in the package
+    os.remove(bundle + "/01-intro.html")
+    assert store.read("bundles/demo-a/install_package/01-intro.html") == b"<html>intro</html>" * 1000
+    assert store.read("bundles/demo-a/install_package/_resources/00-setup.html") == b"setup"
+    assert store.isdir("bundles/demo-a/install_package/_resources") and not store.isdir("bundles/demo-a/install_package/01-intro.html")
+    try:
+        store.read("bundles/demo-a/install_package/02-missing.html")
+        assert False
+    except FileNotFoundError:
+        pass
+    #not archived: read from the package folder
+    assert store.read("bundles/demo-a/conf.json") == b"{}"
+    assert store.read("bundles/demo-b/install_package/01-raw.html") == b"raw"
+    store.close()
+    sys.modules.pop("bundle_store_package", None)
@@ -0,0 +1,320 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dbdemos.conf import Conf, DBClient
+
+
+class FakeWorkspaceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        FakeWorkspaceHandler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_workspace():
+    FakeWorkspaceHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_client(server, **kwargs):
+    conf = Conf("test@databricks.com", f"http://127.0.0.1:{server.server_port}", "local", "token")
+    return DBClient(conf, **kwargs)
+
+
+def test_session_reuses_connections():
+    server = start_fake_workspace()
+    try:
+        db = get_client(server)
+        for i in range(20):
+            assert db.get("2.0/workspace/list", {"path": f"/{i}"})["path"].startswith("/api/2.0/workspace/list")
+        assert len(FakeWorkspaceHandler.connections) == 1
+        db.close()
+    finally:
+        server.shutdown()
+
+
+class FlakyWorkspaceHandler(FakeWorkspaceHandler):
+    failures = {}
+
+    def do_GET(self):
+        remaining = FlakyWorkspaceHandler.failures.get(self.path.split("?")[0], 0)
+        if remaining > 0:
+            FlakyWorkspaceHandler.failures[self.path.split("?")[0]] = remaining - 1
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            status, code = (429, "REQUEST_LIMIT_EXCEEDED") if self.command == "GET" else (503, "TEMPORARILY_UNAVAILABLE")
+            body = json.dumps({"error_code": code}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            super().do_GET()
+
+    do_POST = do_GET
+
+
+def test_retry_policy_retries_throttled_and_idempotent_calls():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        db = get_client(server)
+        FlakyWorkspaceHandler.failures = {"/api/2.0/workspace/list": 2, "/api/2.0/workspace/mkdirs": 1, "/api/2.1/jobs/run-now": 1}
+        assert "path" in db.get("2.0/workspace/list")
+        #mkdirs is idempotent: the 503 is retried
+        assert "path" in db.post("2.0/workspace/mkdirs", {"path": "/test"})
+        #run-now isn't: the 503 error is returned as-is
+        assert db.post("2.1/jobs/run-now", {"job_id": 1})["error_code"] == "TEMPORARILY_UNAVAILABLE"
+        assert db.last_call_status() == 503 and not db.last_call_throttled()
+        summary = db.retry_policy.stats.get_summary()
+        assert summary["workspace/list"]["retries"] == 2 and summary["workspace/list"]["throttled"] == 2
+        assert summary["workspace/mkdirs"]["retries"] == 1 and summary["workspace/mkdirs"]["throttled"] == 0
+        assert summary["jobs/run-now"]["retries"] == 0
+    finally:
+        server.shutdown()
+
+
+class LostDeleteWorkspaceHandler(FakeWorkspaceHandler):
+    """The folder is deleted on the first call, but the response is lost (503)"""
+    deleted = False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if LostDeleteWorkspaceHandler.deleted:
+            status, code = 404, "RESOURCE_DOES_NOT_EXIST"
+        else:
+            LostDeleteWorkspaceHandler.deleted = True
+            status, code = 503, "TEMPORARILY_UNAVAILABLE"
+        body = json.dumps({"error_code": code, "message": "Path (/test) doesn't exist."}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_replayed_delete_of_a_deleted_folder_succeeds():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LostDeleteWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        db = get_client(server)
+        LostDeleteWorkspaceHandler.deleted = False
+        assert db.post("2.0/workspace/delete", {"path": "/test", "recursive": True}) == {}
+        assert db.retry_policy.stats.get_summary()["workspace/delete"]["retries"] == 1
+        #without replay, the folder didn't exist: the error is returned
+        assert db.post("2.0/workspace/delete", {"path": "/test", "recursive": True})["error_code"] == "RESOURCE_DOES_NOT_EXIST"
+    finally:
+        server.shutdown()
+
+
+def test_retry_policy_budget_and_delay():
+    from dbdemos.retry_policy import RetryPolicy, get_endpoint_family
+    assert get_endpoint_family("2.0/workspace/import") == "workspace/import"
+    assert get_endpoint_family("2.1/jobs/runs/get") == "jobs/runs"
+    assert get_endpoint_family("2.0/repos/1234") == "repos"
+    policy = RetryPolicy(max_retries=2, budgets={"workspace/import": 4})
+    assert policy.get_budget("workspace/import") == 4
+    assert policy.get_budget("workspace/list") == 2
+    #an import is only replayed when it overwrites the notebook
+    assert policy.should_retry("POST", "workspace/import", 3, 503, body={"path": "/nb", "overwrite": True})
+    assert not policy.should_retry("POST", "workspace/import", 0, 503, body={"path": "/nb", "overwrite": False})
+    assert policy.should_retry("POST", "workspace/import", 0, 429, body={"path": "/nb"})
+    assert not policy.should_retry("GET", "workspace/list", 2, 429)
+    assert policy.get_delay(0, "7") == 7
+    assert 1 <= policy.get_delay(1) <= 4
+    #429 without Retry-After: same minimum wait as before the retry policy
+    assert policy.get_delay(0, throttled=True) == 15 and policy.get_delay(0, "1", throttled=True) == 1
+
+
+def test_rate_limiter_throttles_configured_families_only():
+    import time
+    from dbdemos.rate_limiter import RateLimiter
+    limiter = RateLimiter({"lakeview": (10, 2)})
+    assert limiter.reserve("workspace/list") == 0
+    assert limiter.reserve("lakeview/dashboards") == 0
+    assert limiter.reserve("lakeview/dashboards") == 0
+    #Burst consumed: the next calls have to wait ~0.1sec each, increasingly
+    first, second = limiter.reserve("lakeview/dashboards"), limiter.reserve("lakeview/dashboards")
+    assert 0.05 < first < second <= 0.25
+    start = time.monotonic()
+    limiter.acquire("lakeview/dashboards")
+    assert time.monotonic() - start > 0.2
+
+
+def test_adaptive_concurrency_aimd():
+    from dbdemos.rate_limiter import AdaptiveConcurrency
+    concurrency = AdaptiveConcurrency(initial=2, max_limit=4, cooldown=0)
+    for _ in range(2):
+        concurrency.release(concurrency.acquire())
+    assert concurrency.limit == 3
+    for _ in range(10):
+        concurrency.release(concurrency.acquire())
+    assert concurrency.limit == 4
+    concurrency.release(concurrency.acquire(), healthy=False)
+    assert concurrency.limit == 2
+    concurrency.release(concurrency.acquire(), healthy=False)
+    concurrency.release(concurrency.acquire(), healthy=False)
+    assert concurrency.limit == 1 and concurrency.in_flight == 0
+
+
+def test_async_client_retries_and_runs_concurrently():
+    import asyncio
+    import pytest
+    pytest.importorskip("aiohttp")
+    from dbdemos.async_client import AsyncDBClient
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conf = Conf("test@databricks.com", f"http://127.0.0.1:{server.server_port}", "local", "token")
+        FlakyWorkspaceHandler.failures = {"/api/2.0/workspace/list": 2, "/api/2.1/jobs/run-now": 1}
+
+        async def run():
+            async with AsyncDBClient(conf, max_concurrency=5) as db:
+                results = await asyncio.gather(*[db.get("2.0/workspace/list", {"path": f"/{i}", "recursive": False}) for i in range(20)])
+                run_now = await db.post("2.1/jobs/run-now", {"job_id": 1})
+                return results, run_now, db.retry_policy.stats.get_summary()
+
+        results, run_now, summary = asyncio.run(run())
+        assert all(r["path"].startswith("/api/2.0/workspace/list") for r in results)
+        assert "recursive=False" in results[0]["path"]
+        assert run_now["error_code"] == "TEMPORARILY_UNAVAILABLE"
+        assert summary["workspace/list"]["calls"] == 20 and summary["workspace/list"]["throttled"] == 2
+    finally:
+        server.shutdown()
+
+
+class SlowWorkspaceHandler(FakeWorkspaceHandler):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        import time
+        with SlowWorkspaceHandler.lock:
+            SlowWorkspaceHandler.in_flight += 1
+            SlowWorkspaceHandler.max_in_flight = max(SlowWorkspaceHandler.max_in_flight, SlowWorkspaceHandler.in_flight)
+        time.sleep(0.05)
+        with SlowWorkspaceHandler.lock:
+            SlowWorkspaceHandler.in_flight -= 1
+        super().do_GET()
+
+
+def test_max_concurrency_caps_calls_in_flight():
+    from concurrent.futures import ThreadPoolExecutor
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        db = get_client(server, max_concurrency=3)
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda i: db.get("2.0/workspace/list", {"path": f"/{i}"}), range(20)))
+        assert len(results) == 20
+        assert SlowWorkspaceHandler.max_in_flight == 3
+    finally:
+        server.shutdown()
+
+
+class ExportWorkspaceHandler(FakeWorkspaceHandler):
+    content = bytes(range(256)) * 20000
+
+    def do_GET(self):
+        if "missing" in self.path:
+            body = json.dumps({"error_code": "RESOURCE_DOES_NOT_EXIST", "message": "missing"}).encode("utf-8")
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        #chunked raw content, as returned by a direct_download export
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(self.content), 100000):
+            chunk = self.content[i:i+100000]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("utf-8") + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def test_download_streams_the_export_to_disk(tmp_path):
+    import asyncio
+    import io
+    import pytest
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        db = get_client(server)
+        assert db.download("2.0/workspace/export", {"path": "/data", "format": "AUTO"}, str(tmp_path / "data.zip"), chunk_size=4096) == {}
+        assert (tmp_path / "data.zip").read_bytes() == ExportWorkspaceHandler.content and not (tmp_path / "data.zip.part").exists()
+        buffer = io.BytesIO()
+        assert db.download("2.0/workspace/export", {"path": "/nb", "format": "HTML"}, buffer) == {} and buffer.getvalue() == ExportWorkspaceHandler.content
+        assert "error_code" in db.download("2.0/workspace/export", {"path": "/missing"}, str(tmp_path / "missing"))
+        assert not (tmp_path / "missing").exists()
+
+        pytest.importorskip("aiohttp")
+        from dbdemos.async_client import AsyncDBClient
+        async def run():
+            async with AsyncDBClient(db.conf) as async_db:
+                return await async_db.download("2.0/workspace/export", {"path": "/data", "format": "AUTO"}, str(tmp_path / "async.zip"))
+        assert asyncio.run(run()) == {} and (tmp_path / "async.zip").read_bytes() == ExportWorkspaceHandler.content
+    finally:
+        server.shutdown()
+
+
+class DroppedExportWorkspaceHandler(ExportWorkspaceHandler):
+    drops = 0
+
+    def do_GET(self):
+        if DroppedExportWorkspaceHandler.drops > 0:
+            DroppedExportWorkspaceHandler.drops -= 1
+            #connection closed after half of the body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(self.content)))
+            self.end_headers()
+            self.wfile.write(self.content[:len(self.content)//2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        super().do_GET()
+
+
+def test_download_restarts_from_scratch_when_the_connection_drops(tmp_path):
+    import asyncio
+    import io
+    import pytest
+    from dbdemos.retry_policy import RetryPolicy
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DroppedExportWorkspaceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        db = get_client(server, retry_policy=RetryPolicy(base_delay=0.01))
+        for destination in [io.BytesIO(), str(tmp_path / "data.zip")]:
+            DroppedExportWorkspaceHandler.drops = 1
+            assert db.download("2.0/workspace/export", {"path": "/nb", "format": "HTML"}, destination) == {}
+            content = destination.getvalue() if isinstance(destination, io.BytesIO) else (tmp_path / "data.zip").read_bytes()
+            assert content == ExportWorkspaceHandler.content
+
+        pytest.importorskip("aiohttp")
+        from dbdemos.async_client import AsyncDBClient
+        async def run(buffer):
+            async with AsyncDBClient(db.conf, retry_policy=RetryPolicy(base_delay=0.01)) as async_db:
+                return await async_db.download("2.0/workspace/export", {"path": "/nb", "format": "HTML"}, buffer)
+        buffer = io.BytesIO()
+        DroppedExportWorkspaceHandler.drops = 1
+        assert asyncio.run(run(buffer)) == {} and buffer.getvalue() == ExportWorkspaceHandler.content
+    finally:
+        server.shutdown()
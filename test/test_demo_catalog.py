@@ -0,0 +1,26 @@
+import json
+import os
+
+from dbdemos.demo_catalog import DemoCatalog
+
+
+def test_demo_catalog(tmp_path):
+    bundles = str(tmp_path)
+    for name, category in [("demo-b", "governance"), ("demo-a", "lakehouse")]:
+        os.makedirs(f"{bundles}/{name}")
+        with open(f"{bundles}/{name}/conf.json", "w") as f:
+            f.write(json.dumps({"name": name, "category": category, "title": name.upper(), "description": "desc", "custom_schema_supported": True,
+                                "notebooks": [{"path": "01-intro"}]}))
+    os.makedirs(f"{bundles}/_shared")
+    DemoCatalog.build(bundles)
+
+    def get_resource(path):
+        with open(bundles + "/" + path[len("bundles/"):], "r") as f:
+            return f.read()
+    catalog = DemoCatalog.load(get_resource)
+    assert list(catalog.keys()) == ["demo-a", "demo-b"]
+    assert catalog["demo-b"].category == "governance" and catalog["demo-b"].title == "DEMO-B" and catalog["demo-b"].custom_schema_supported
+    assert catalog["demo-a"].tags == [] and not catalog["demo-a"].serverless_supported
+    #older package without catalog
+    os.remove(bundles + "/" + DemoCatalog.FILE_NAME)
+    assert DemoCatalog.load(get_resource) is None
@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+
+def test_import_is_fast():
+    #Fresh interpreter: the modules imported by the test session would hide the ones imported by dbdemos
+    script = """
+import json, sys, time
+start = time.perf_counter()
+import dbdemos
+duration = time.perf_counter() - start
+print(json.dumps({"duration": duration, "modules": [m for m in ["pkg_resources", "databricks.sdk", "pandas", "aiohttp"] if m in sys.modules]}))
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    #heavy dependencies are only imported when used
+    assert result["modules"] == []
+    #generous bound, ~0.2sec on a laptop: only catches an eager import of a large dependency
+    assert result["duration"] < 1.5, result
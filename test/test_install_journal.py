@@ -0,0 +1,29 @@
+import pytest
+
+from dbdemos.install_journal import InstallJournal
+
+
+def test_journal_resumes_completed_steps(tmp_path):
+    params = {"catalog": "main", "schema": "dbdemos"}
+    journal = InstallJournal("https://workspace", "/Users/test", "pipeline-bike", params, folder=str(tmp_path))
+    calls = []
+    def step(name, result):
+        def run():
+            calls.append(name)
+            return result
+        return run
+    assert journal.step("cluster", step("cluster", ("1234", "demo cluster")))() == ("1234", "demo cluster")
+    with pytest.raises(ValueError):
+        journal.step("dashboards", lambda: (_ for _ in ()).throw(ValueError("429")))()
+
+    resumed = InstallJournal("https://workspace", "/Users/test", "pipeline-bike", params, folder=str(tmp_path), resume=True)
+    assert resumed.get_completed_steps() == ["cluster"]
+    assert resumed.step("cluster", step("cluster", None), decode=tuple)() == ("1234", "demo cluster")
+    assert resumed.step("dashboards", step("dashboards", [{"uid": "abc"}]))() == [{"uid": "abc"}]
+    assert calls == ["cluster", "dashboards"]
+
+    #Different options or no resume: restart from scratch
+    assert InstallJournal("https://workspace", "/Users/test", "pipeline-bike", {"schema": "other"}, folder=str(tmp_path), resume=True).get_completed_steps() == []
+    assert InstallJournal("https://workspace", "/Users/test", "pipeline-bike", params, folder=str(tmp_path)).get_completed_steps() == []
+    resumed.delete()
+    assert InstallJournal("https://workspace", "/Users/test", "pipeline-bike", params, folder=str(tmp_path), resume=True).get_completed_steps() == []
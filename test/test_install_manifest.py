@@ -0,0 +1,46 @@
+import base64
+import json
+
+from dbdemos.install_manifest import InstallManifest
+
+
+def get_request(content, format="HTML"):
+    return {"path": "/Users/test/demo/nb", "content": base64.b64encode(content.encode("utf-8")).decode("utf-8"), "format": format}
+
+
+def test_manifest_detects_changed_and_removed_objects():
+    first = InstallManifest()
+    assert not first.is_unchanged("01-intro", "NOTEBOOK", get_request("intro"))
+    assert not first.is_unchanged("_resources/00-setup", "NOTEBOOK", get_request("setup"))
+    assert not first.is_unchanged("data", "DIRECTORY", get_request("zip", "AUTO"))
+
+    second = InstallManifest(json.loads(first.to_json())["objects"])
+    assert second.is_unchanged("01-intro", "NOTEBOOK", get_request("intro"))
+    assert not second.is_unchanged("_resources/00-setup", "NOTEBOOK", get_request("setup with a new schema"))
+    #Same content, different format: must be re-imported
+    assert not second.is_unchanged("02-new", "NOTEBOOK", get_request("intro", "AUTO"))
+    assert second.get_removed_objects() == [("data", "DIRECTORY")]
+
+
+class FakeDB:
+    def __init__(self):
+        self.files = {}
+
+    def post(self, path, json={}):
+        self.files[json["path"]] = json["content"]
+        return {}
+
+    def get(self, path, params={}):
+        if params["path"] in self.files:
+            return {"content": self.files[params["path"]]}
+        return {"error_code": "RESOURCE_DOES_NOT_EXIST"}
+
+
+def test_manifest_is_saved_with_the_demo():
+    db = FakeDB()
+    assert InstallManifest.load(db, "/Users/test/demo") is None
+    manifest = InstallManifest()
+    manifest.is_unchanged("01-intro", "NOTEBOOK", get_request("intro"))
+    manifest.save(db, "/Users/test/demo")
+    assert "/Users/test/demo/"+InstallManifest.PATH in db.files
+    assert InstallManifest.load(db, "/Users/test/demo").is_unchanged("01-intro", "NOTEBOOK", get_request("intro"))
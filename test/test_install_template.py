@@ -0,0 +1,54 @@
+from dbdemos.conf import DemoConf
+from dbdemos.install_template import InstallTemplate
+from dbdemos.notebook_parser import NotebookParser
+from dbdemos.rewrite_rules import RewriteRules
+
+from .notebook_helper import get_notebook_html
+
+
+def test_install_template(tmp_path):
+    demo_conf = DemoConf("/test-demo", {"name": "test-demo", "category": "test", "title": "Test", "description": "Test", "custom_schema_supported": True,
+                                        "default_catalog": "main", "default_schema": "dbdemos_test"}, "my_catalog", "my_schema")
+    results = {"data": "x" * 100000 + " main.dbdemos_test " + "y" * 100000}
+    html = get_notebook_html([
+        {"command": '%md <a dbdemos-pipeline-id="dlt" href="#joblist/pipelines/abcd">pipeline</a> <img width="1px" src="https://ppxrzfxige.execute-api.us-west-2.amazonaws.com/v1/analytics?a=b"/>'},
+        {"command": "#dbdemos__delete_this_cell\nprint('main.dbdemos_test')"},
+        {"command": "%run ./_resources/00-setup $catalog=main $schema=dbdemos_test", "results": results},
+        {"command": "spark.table('main__build.dbdemos_test.orders')", "results": results}])
+    InstallTemplate.from_content(NotebookParser(html).content, demo_conf).save(str(tmp_path / "test.tpl.json"))
+    template = InstallTemplate.load(lambda path: open(path).read(), str(tmp_path / "test.tpl.json"))
+    assert InstallTemplate.load(lambda path: open(path).read(), str(tmp_path / "missing.tpl.json")) is None
+    #only the slots are rewritten, the results in between are static
+    assert len(template.segments) > 1 and sum(len(s) for s in template.segments[1::2]) < 150000
+
+    rules = RewriteRules(demo_conf).with_resources(pipelines=[{"id": "dlt", "uid": "1234"}])
+    tracker_url = "https://tracker/test"
+    parser = NotebookParser(html)
+    parser.rewrite(rules)
+    parser.content = NotebookParser.replace_tracker_tag(parser.content, tracker_url)
+    parser.transform_commands([NotebookParser.remove_delete_cell_command, NotebookParser.remove_automl_result_links_command])
+    expected = parser.get_html()
+    installed = template.get_html(html, lambda slot: NotebookParser.replace_tracker_tag(rules.replace_schema(rules.replace_dynamic_links(slot)), tracker_url))
+    assert installed == expected
+    commands = NotebookParser(installed).get_notebook_model()["commands"]
+    assert len(commands) == 3 and "#joblist/pipelines/1234" in commands[0]["command"] and tracker_url in commands[0]["command"]
+    assert "$catalog=my_catalog $schema=my_schema" in commands[1]["command"]
+
+
+def test_install_template_from_the_packaged_content():
+    demo_conf = DemoConf("/test-demo", {"name": "test-demo", "category": "test", "title": "Test", "description": "Test",
+                                        "default_catalog": "main", "default_schema": "dbdemos_test"})
+    html = get_notebook_html([{"command": "#dbdemos__delete_this_cell"}, {"command": "spark.table('main.dbdemos_test.orders') # é"}])
+    #single pass with the install transformations, as done by the packager
+    parser = NotebookParser(html, lazy=True)
+    parser.transform_commands(InstallTemplate.TRANSFORMS)
+    content = parser.content
+    assert InstallTemplate.from_content(content, demo_conf, True).segments == InstallTemplate.from_content(NotebookParser(html).content, demo_conf).segments
+    #only the page around the model is packaged in the html, the content is rebuilt from the template
+    template = InstallTemplate.from_content(content, demo_conf, True)
+    wrapper = NotebookParser.set_html_content(html, "")
+    assert "__DATABRICKS_NOTEBOOK_MODEL = ''" in wrapper
+    assert template.get_html(wrapper, lambda slot: slot) == NotebookParser.set_html_content(html, content)
+    parser = NotebookParser(wrapper, content=template.get_packaged_content())
+    assert [c["command"] for c in parser.get_notebook_model()["commands"]] == ["spark.table('main.dbdemos_test.orders') # é"]
+    assert parser.get_html() == NotebookParser.set_html_content(html, content)
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dbdemos.conf import DemoConf
+from dbdemos.installer import Installer
+
+
+class FakeWarehouseDB:
+    def __init__(self):
+        self.warehouses = []
+        self.lock = threading.Lock()
+
+    def get(self, path, params={}):
+        with self.lock:
+            return [{"name": name, "id": name} for name in self.warehouses]
+
+    def post(self, path, json={}):
+        time.sleep(0.05)
+        with self.lock:
+            if json["name"] in self.warehouses:
+                return {"error_code": "INVALID_PARAMETER_VALUE", "message": f"{json['name']} already exists"}
+            self.warehouses.append(json["name"])
+            return {"id": json["name"]}
+
+
+def test_parallel_installs_create_the_shared_warehouse_once():
+    installer = Installer("test@databricks.com", "token", "https://test.cloud.databricks.com", "AWS", "1", "cluster")
+    installer.db = FakeWarehouseDB()
+    demo_conf = DemoConf("/test-demo", {"name": "test-demo", "category": "test", "title": "Test", "description": "Test"})
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        endpoints = list(executor.map(lambda i: installer.get_or_create_endpoint("test@databricks.com", demo_conf), range(5)))
+    assert installer.db.warehouses == ["dbdemos-shared-endpoint"]
+    assert all(e["name"] == "dbdemos-shared-endpoint" for e in endpoints)
+
+
+class FakeImportDB:
+    def __init__(self, status, response):
+        self.status, self.response = status, response
+
+    def post(self, path, json={}):
+        return self.response
+
+    def last_call_throttled(self):
+        return self.status == 429
+
+    def last_call_status(self):
+        return self.status
+
+
+def test_import_concurrency_only_backs_off_on_back_pressure():
+    installer = Installer("test@databricks.com", "token", "https://test.cloud.databricks.com", "AWS", "1", "cluster")
+    limit = installer.import_concurrency.limit
+    #user error of a demo: says nothing about the workspace load
+    installer.db = FakeImportDB(400, {"error_code": "RESOURCE_ALREADY_EXISTS"})
+    installer.import_to_workspace({"path": "/nb"})
+    assert installer.import_concurrency.limit >= limit
+    installer.db = FakeImportDB(503, {"error_code": "TEMPORARILY_UNAVAILABLE"})
+    installer.import_to_workspace({"path": "/nb"})
+    assert installer.import_concurrency.limit < limit
@@ -0,0 +1,17 @@
+import base64
+import io
+import json
+import zipfile
+
+from dbdemos.notebook_archive import NotebookArchive
+
+
+def test_archive_contains_one_model_per_notebook():
+    archive = NotebookArchive("_resources")
+    archive.add_notebook("00-setup", {"language": "python", "commands": [{"command": "print(1)", "position": 0}]})
+    archive.add_notebook("sql/01-queries", {"language": "sql", "commands": []})
+    archive.add_notebook("README", {"language": "markdown?", "commands": []})
+    assert 0 < archive.get_size() < NotebookArchive.MAX_SIZE
+    content = zipfile.ZipFile(io.BytesIO(base64.b64decode(archive.get_content())))
+    assert sorted(content.namelist()) == ["_resources/00-setup.python", "_resources/README.python", "_resources/sql/01-queries.sql"]
+    assert json.loads(content.read("_resources/00-setup.python"))["commands"][0]["command"] == "print(1)"
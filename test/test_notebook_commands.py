@@ -0,0 +1,64 @@
+import io
+
+from dbdemos.notebook_parser import NotebookParser
+
+from .notebook_helper import get_notebook_html
+
+
+def test_transform_commands():
+    p = NotebookParser(get_notebook_html([{"command": "%md # Title", "position": 0},
+                                          {"command": "#dbdemos__delete_this_cell\nprint(1)", "position": 1},
+                                          {"command": "%run ./_resources/00-setup $catalog=main", "position": 2}]))
+    p.replace_in_notebook("$catalog=main", "$catalog=test")
+    p.transform_commands([NotebookParser.remove_delete_cell_command, NotebookParser.hide_commands_and_results_command])
+    p.add_extra_cell("%md cluster", 1)
+    assert p.contains("$catalog=test")
+    html = p.get_html()
+    model = NotebookParser(html).get_notebook_model()
+    assert [c["command"] for c in model["commands"]] == ["%md # Title", "%md cluster", "%run ./_resources/00-setup $catalog=test"]
+    assert [c["position"] for c in model["commands"]] == [0, 1, 2]
+    assert model["commands"][2]["hideCommandResult"]
+
+
+def test_get_html_after_html_update():
+    p = NotebookParser(get_notebook_html([{"command": "print('main')", "position": 0}]))
+    p.remove_robots_meta()
+    p.html = p.html.replace('<html>', '<html><head><title>__DATABRICKS_NOTEBOOK</title></head>')
+    p.replace_in_notebook("main", "my_catalog")
+    html = p.get_html()
+    assert html.startswith('<html><head><title>__DATABRICKS_NOTEBOOK</title></head><script>')
+    assert NotebookParser(html).get_notebook_model()["commands"][0]["command"] == "print('my_catalog')"
+
+
+def test_lazy_parser():
+    commands = [{"command": "%run ./_resources/00-setup", "position": 3},
+                {"command": "#dbdemos__delete_this_cell", "results": {"type": "html", "data": "x" * 100000}},
+                {"command": "#hide_this_code\nprint('UNCOMMENT_FOR_DEMO')", "results": {"type": "html", "data": "y" * 100000}}]
+    html = get_notebook_html(commands)
+    outputs = []
+    for lazy in [False, True]:
+        p = NotebookParser(html, lazy)
+        p.remove_uncomment_tag()
+        p.set_environement_metadata("3")
+        p.transform_commands([NotebookParser.remove_delete_cell_command, NotebookParser.hide_commands_and_results_command])
+        f = io.StringIO()
+        p.write_html(f)
+        outputs.append(f.getvalue())
+    assert outputs[0] == outputs[1]
+    model = NotebookParser(outputs[1]).get_notebook_model()
+    assert model["environmentMetadata"] == {"client": "3"} and len(model["commands"]) == 2
+    assert model["commands"][1]["hideCommandCode"] and model["commands"][1]["position"] == 1
+
+
+def test_get_minisite_html():
+    html = get_notebook_html([{"command": "%md # Title\n## Subtitle"}, {"command": "#dbdemos__delete_this_cell\nprint(1)"}, {"command": "print(2)"}])
+    html = html.replace("<html>", '<html><head><meta name="robots" content="nofollow, noindex"></head><body>').replace("</html>", "<script>var a;</script></body></html>")
+    p = NotebookParser(html)
+    p.remove_robots_meta()
+    p.add_cell_as_html_for_seo()
+    p.remove_delete_cell()
+    p.add_javascript_to_minisite_relative_links("folder/01-intro")
+    minisite_html = NotebookParser(html).get_minisite_html("folder/01-intro")
+    assert minisite_html == p.get_html()
+    assert "nofollow" not in minisite_html and "<h1>Title" in minisite_html and "NOTEBOOK_DIR = 'folder'" in minisite_html
+    assert len(NotebookParser(minisite_html).get_notebook_model()["commands"]) == 2
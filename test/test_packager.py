@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+import types
+
+from dbdemos.conf import Conf, DemoConf
+from dbdemos.packager import Packager
+
+from .notebook_helper import get_notebook_html
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, path, params={}):
+        with self.lock:
+            self.calls.append((path, params.get("path", params.get("run_id"))))
+        if path == "2.0/workspace/get-status":
+            return {"object_type": "NOTEBOOK", "modified_at": 1}
+        if path == "2.1/jobs/runs/get":
+            return {"state": {"result_state": "SUCCESS"}, "tasks": [{"run_id": 42, "notebook_task": {"notebook_path": "/Repos/staging/demo/01-run"}}]}
+        if path == "2.1/jobs/runs/export":
+            return {"views": [{"content": get_notebook_html([{"command": "print('pre-run')", "position": 1}])}]}
+        return {"error_code": "BAD_REQUEST", "message": "exports are direct downloads"}
+
+    def download(self, path, params, destination):
+        with self.lock:
+            self.calls.append((path, params["path"]))
+        content = get_notebook_html([{"command": f"%run ./_resources/00-global-setup-v2\nprint('{params['path']}')", "position": 1}]).encode("utf-8")
+        if isinstance(destination, str):
+            with open(destination, "wb") as f:
+                f.write(content)
+        else:
+            destination.write(content)
+        return {}
+
+
+def get_demo_conf(name, notebooks):
+    return DemoConf("/"+name, {"name": name, "category": "test", "title": name, "description": name, "notebooks": [
+        {"path": path, "title": path, "description": path, "pre_run": pre_run, "publish_on_website": True, "add_cluster_setup_cell": False}
+        for path, pre_run in notebooks]})
+
+
+def test_package_all_schedules_all_demos_in_a_single_graph(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bundles = {"small": get_demo_conf("small", [("01-intro", False)]), "large": get_demo_conf("large", [("01-intro", False), ("01-run", True)])}
+    job_bundler = types.SimpleNamespace(conf=types.SimpleNamespace(get_repo_path=lambda: "/Repos/staging"), staging_reseted=True, bundles=bundles)
+    packager = Packager(Conf("test@databricks.com", "https://test.cloud.databricks.com", "1", "token"), job_bundler, max_workers=1)
+    packager.db = FakeDB()
+    packager.package_all(incremental=True)
+    exports = [c for c in packager.db.calls if c[0] in ["2.0/workspace/export", "2.1/jobs/runs/export"]]
+    #longest export first: the pre-run notebook of the large demo
+    assert exports[0] == ("2.1/jobs/runs/export", 42) and len(exports) == 5
+    for path in ["dbdemos/bundles/large/install_package/01-run.html", "dbdemos/bundles/small/install_package/01-intro.tpl.json",
+                 "dbdemos/minisite/large/01-run.html", "dbdemos/bundles/small/.packaging_manifest.json"]:
+        assert os.path.exists(path), path
+    #the notebook content is only in the template, the website page has it
+    assert "__DATABRICKS_NOTEBOOK_MODEL = ''" in open("dbdemos/bundles/large/install_package/01-run.html").read()
+    assert "__DATABRICKS_NOTEBOOK_MODEL = ''" not in open("dbdemos/minisite/large/01-run.html").read()
+    #the global setup notebook is shared by the 2 demos
+    shared = [json.load(open(f"dbdemos/bundles/{name}/conf.json"))["shared_objects"] for name in bundles]
+    assert shared[0] == shared[1] and os.listdir("dbdemos/bundles/_shared/objects") == [shared[0]["_resources/00-global-setup-v2.html"]]
+    assert not os.path.exists("dbdemos/bundles/small/install_package/_resources/00-global-setup-v2.html")
+    #the bundles & shared objects are shipped compressed
+    assert os.path.exists("dbdemos/bundles/large/install_package.zip") and os.path.exists("dbdemos/bundles/_shared/objects.zip")
+    assert [d["name"] for d in json.load(open("dbdemos/bundles/_catalog.json"))["demos"]] == ["large", "small"]
+
+    def package_again():
+        for name, notebooks in [("small", [("01-intro", False)]), ("large", [("01-intro", False), ("01-run", True)])]:
+            bundles[name] = get_demo_conf(name, notebooks)
+        packager.db = FakeDB()
+        packager.package_all(incremental=True)
+        return [c[1] for c in packager.db.calls if c[0] in ["2.0/workspace/export", "2.1/jobs/runs/export"]]
+
+    #nothing changed: no export
+    assert package_again() == ["/Repos/staging/_resources/00-global-setup-v2"] * 2
+    assert os.path.exists("dbdemos/minisite/small/01-intro.html") and os.path.exists("dbdemos/minisite/large/index.html")
+    #the processing code changed: everything is exported again
+    monkeypatch.setattr("dbdemos.packager.get_processing_version", lambda: "changed")
+    assert len(package_again()) == 5
+
+
+class FakeAsyncDB:
+    def __init__(self, conf, max_concurrency, rate_limiter=None):
+        self.db = FakeDB()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def get(self, path, params={}):
+        return self.db.get(path, params)
+
+    async def download(self, path, params, destination):
+        return self.db.download(path, params, destination)
+
+
+def test_package_all_async(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("dbdemos.async_client.AsyncDBClient", FakeAsyncDB)
+    bundles = {"small": get_demo_conf("small", [("01-intro", False)]), "large": get_demo_conf("large", [("01-intro", False), ("01-run", True)])}
+    job_bundler = types.SimpleNamespace(conf=types.SimpleNamespace(get_repo_path=lambda: "/Repos/staging"), staging_reseted=True, bundles=bundles)
+    packager = Packager(Conf("test@databricks.com", "https://test.cloud.databricks.com", "1", "token"), job_bundler, max_workers=1)
+    packager.package_all(use_async=True)
+    for path in ["dbdemos/bundles/large/install_package/01-run.tpl.json", "dbdemos/bundles/small/install_package.zip",
+                 "dbdemos/minisite/large/index.html", "dbdemos/bundles/_catalog.json"]:
+        assert os.path.exists(path), path
+
+
+def test_staging_repo_reset_once_when_demos_start_concurrently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    resets = []
+
+    def reset_staging_repo():
+        resets.append(1)
+        time.sleep(0.1)
+        job_bundler.staging_reseted = True
+
+    bundles = {name: get_demo_conf(name, [("01-intro", False)]) for name in ["a", "b", "c"]}
+    job_bundler = types.SimpleNamespace(conf=types.SimpleNamespace(get_repo_path=lambda: "/Repos/staging"), staging_reseted=False,
+                                        bundles=bundles, reset_staging_repo=reset_staging_repo)
+    packager = Packager(Conf("test@databricks.com", "https://test.cloud.databricks.com", "1", "token"), job_bundler)
+    packager.db = FakeDB()
+    threads = [threading.Thread(target=packager.start_package_demo, args=(demo_conf,)) for demo_conf in bundles.values()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(resets) == 1
@@ -0,0 +1,38 @@
+import os
+
+from dbdemos.packaging_manifest import PackagingManifest
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_packaging_manifest_skips_unchanged_notebooks(tmp_path):
+    root = str(tmp_path / "bundles" / "test-demo")
+    bundle = root + "/install_package"
+    intro, setup, removed = [bundle+"/01-intro.html"], [bundle+"/_resources/00-setup.html"], [bundle+"/02-removed.html"]
+    for path in intro + setup + removed:
+        write(path, path)
+    first = PackagingManifest.load(root)
+    first.add("01-intro", {"modified_at": 1}, intro, True)
+    first.add("_resources/00-setup", {"run_id": 10}, setup, False)
+    first.add("02-removed", {"modified_at": 1}, removed, False)
+    first.save()
+
+    second = PackagingManifest.load(root)
+    assert second.get_unchanged("01-intro", {"modified_at": 1}, intro)["requires_global_setup_v2"]
+    #new job run: exported again
+    assert second.get_unchanged("_resources/00-setup", {"run_id": 11}, setup) is None
+    assert second.get_unchanged("01-intro", {"modified_at": None}, intro) is None
+    second.add("_resources/00-setup", {"run_id": 11}, setup, False)
+    second.remove_stale_outputs(bundle)
+    assert os.path.exists(intro[0]) and os.path.exists(setup[0]) and not os.path.exists(removed[0])
+    second.save()
+
+    #output modified outside of the packaging: exported again
+    write(intro[0], "changed")
+    assert PackagingManifest.load(root).get_unchanged("01-intro", {"modified_at": 1}, intro) is None
+    write(root+"/"+PackagingManifest.FILE_NAME, "not a json")
+    assert PackagingManifest.load(root).previous_notebooks == {}
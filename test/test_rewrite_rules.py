@@ -0,0 +1,28 @@
+from dbdemos.conf import DemoConf
+from dbdemos.rewrite_rules import RewriteRules
+
+
+def get_demo_conf(catalog, schema):
+    return DemoConf("/test-demo", {"name": "test-demo", "category": "test", "title": "Test", "description": "Test",
+                                   "custom_schema_supported": True, "default_catalog": "main", "default_schema": "dbdemos_test"}, catalog, schema)
+
+
+def test_rewrite_rules():
+    rules = RewriteRules(get_demo_conf("my_catalog", "my_schema"))
+    definition = rules.replace_dashboard_schema('{"query": "SELECT * FROM `main__build`.dbdemos_test.orders join main.`dbdemos_test`.users"}')
+    assert definition == '{"query": "SELECT * FROM `my_catalog`.`my_schema`.orders join `my_catalog`.`my_schema`.users"}'
+
+    content = ('<a dbdemos-pipeline-id=\\"dlt-churn\\" href=\\"#joblist/pipelines/a6ba1d12-74d7\\">'
+               '<a dbdemos-repo-id=\\"dbt\\" href=\\"/#workspace/PLACEHOLDER/README.md\\">'
+               '<a dbdemos-workflow-id=\\"unknown\\" href=\\"/#job/1234\\"> select * from main.dbdemos_test.orders'
+               '<a dbdemos-pipeline-id=\\"dlt-churn\\" href=\\"#joblist/pipelines/a6ba1d12-74d7/updates\\"> pipeline a6ba1d12-74d7')
+    notebook_rules = rules.with_resources(pipelines=[{"id": "dlt-churn", "uid": "uuuiduuu"}], repos=[{"id": "dbt", "uid": "/Repos/test/dbt"}],
+                                          workflows=[{"id": "dbt", "uid": 5678}])
+    assert rules.links == {}
+    content = notebook_rules.replace_schema(notebook_rules.replace_dynamic_links(content))
+    assert '#joblist/pipelines/uuuiduuu\\">' in content and '#joblist/pipelines/uuuiduuu/updates' in content
+    #the uid is only replaced within the links
+    assert content.endswith('pipeline a6ba1d12-74d7')
+    assert '#workspace/Repos/test/dbt/README.md' in content
+    assert '/#job/1234' in content
+    assert 'my_catalog.my_schema.orders' in content
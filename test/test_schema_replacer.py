@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import json
+from dbdemos.schema_replacer import SchemaReplacer
+
+CONTENT = '''catalog = "main__build"
+catalog = \\"main_build\\"
+spark.sql("select * from main__build.dbdemos_retail.churn_users")
+spark.read.load("/Volumes/main__build/dbdemos_retail/raw")
+%run ./_resources/00-setup $catalog=main $schema=dbdemos_retail
+%run ./_resources/00-setup $catalog=main  $db=dbdemos_retail
+select * from main.dbdemos_retail.churn_users join main.dbdemos_retail_2.orders
+dbutils.widgets.text("catalog", "main", "Catalog")
+dbutils.widgets.text(\\"schema\\", \\"dbdemos_retail\\", \\"Schema\\")
+dbutils.widgets.text("db", "dbdemos_retail")
+/Volumes/main/dbdemos_retail/raw
+catalog = "main"
+schema = dbName = db = "dbdemos_retail"
+dbName = db = \\"dbdemos_retail\\"
+db = "dbdemos_retail"
+schema = "dbdemos_retail"
+USE SCHEMA dbdemos_retail; USE CATALOG main;
+CREATE CATALOG IF NOT EXISTS main; CREATE SCHEMA IF NOT EXISTS dbdemos_retail;
+'''
+
+CONFS = [("main", "dbdemos_retail", "main", "dbdemos_retail", True),
+         ("main", "dbdemos_retail", "my_catalog", "my_schema", True),
+         ("main", "dbdemos_retail", "main", "my_schema", True),
+         ("main", "dbdemos_retail", "my_catalog", "my_schema", False),
+         ("hive", "dbdemos_retail", "main", "dbdemos_retail", True)]
+
+
+def test_replace_is_equivalent_to_sequential_replace():
+    for conf in CONFS:
+        replacer = SchemaReplacer(*conf)
+        assert replacer.replace(CONTENT) == replacer.replace_sequentially(CONTENT), conf
+        escaped = json.dumps(CONTENT)
+        assert replacer.replace(escaped) == replacer.replace_sequentially(escaped), conf
+        #references spread in a large content, replaced in separate windows
+        spread = "".join("x" * 40000 + line for line in CONTENT.split("\n"))
+        assert replacer.replace(spread) == replacer.replace_sequentially(spread), conf
+    replacer = SchemaReplacer.get("main", "dbdemos_retail", "my_catalog", "my_schema", True)
+    assert SchemaReplacer.get("main", "dbdemos_retail", "my_catalog", "my_schema", True) is replacer
+    content = replacer.replace(CONTENT)
+    assert "main__build" not in content and "my_catalog.my_schema.churn_users" in content
+    assert "$catalog=my_catalog $schema=my_schema" in content and "/Volumes/my_catalog/my_schema/raw" in content
+
+
+def get_synthetic_notebook():
+    #~5MB notebook: a few cells referencing the catalog/schema, and large results (images)
+    image = base64.b64encode(hashlib.sha512(b"dbdemos").digest() * 20000).decode("utf-8")
+    commands = [{"command": CONTENT, "results": None}]
+    for i in range(2):
+        commands.append({"command": "display(spark.table('main.dbdemos_retail.churn_users'))", "results": {"data": image}})
+    return json.dumps({"commands": commands})
+
+
+def test_replace_large_notebook():
+    content = get_synthetic_notebook()
+    replacer = SchemaReplacer("main", "dbdemos_retail", "my_catalog", "my_schema", True)
+    assert replacer.replace(content) == replacer.replace_sequentially(content)
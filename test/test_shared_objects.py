@@ -0,0 +1,32 @@
+import json
+import os
+
+from dbdemos.conf import DemoConf
+from dbdemos.shared_objects import SharedObjects
+
+
+def test_shared_objects_store(tmp_path):
+    bundles = str(tmp_path)
+    names = []
+    for demo in ["demo-a", "demo-b"]:
+        os.makedirs(f"{bundles}/{demo}/install_package/_resources")
+        with open(f"{bundles}/{demo}/install_package/_resources/00-global-setup-v2.html", "w") as f:
+            f.write("<html>global setup</html>")
+        names.append(SharedObjects.store(bundles, f"{bundles}/{demo}/install_package/_resources/00-global-setup-v2.html"))
+        assert not os.path.exists(f"{bundles}/{demo}/install_package/_resources/00-global-setup-v2.html")
+    #stored once
+    assert names[0] == names[1] and names[0].endswith(".html")
+    assert os.listdir(SharedObjects.get_objects_path(bundles)) == [names[0]]
+
+    demo_conf = DemoConf("/demo-a", {"name": "demo-a", "category": "test", "title": "Test", "description": "Test"})
+    demo_conf.add_shared_object("_resources/00-global-setup-v2.html", names[0])
+    assert demo_conf.json_conf["shared_objects"] == {"_resources/00-global-setup-v2.html": names[0]}
+    assert SharedObjects.get_resource_path(demo_conf, "bundles/demo-a/install_package/_resources/00-global-setup-v2.html") == "bundles/_shared/objects/"+names[0]
+    assert SharedObjects.get_resource_path(demo_conf, "bundles/demo-a/install_package/01-intro.html") == "bundles/demo-a/install_package/01-intro.html"
+
+    with open(f"{bundles}/demo-a/conf.json", "w") as f:
+        f.write(json.dumps(demo_conf.json_conf))
+    with open(SharedObjects.get_objects_path(bundles) + "/unused.html", "w") as f:
+        f.write("removed from all the demos")
+    SharedObjects.remove_unreferenced(bundles)
+    assert os.listdir(SharedObjects.get_objects_path(bundles)) == [names[0]]
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from dbdemos.task_graph import TaskGraph
+
+
+def test_task_graph_runs_independent_tasks_in_parallel():
+    graph = TaskGraph(max_workers=4)
+    order = []
+    lock = threading.Lock()
+    def task(name, duration, value):
+        def run():
+            time.sleep(duration)
+            with lock:
+                order.append(name)
+            return value
+        return run
+    graph.add("cluster", task("cluster", 0.3, "c"))
+    graph.add("pipelines", task("pipelines", 0.2, "p"))
+    graph.add("workflows", lambda: graph.results["pipelines"] + "w", depends_on=["pipelines"])
+    graph.add("notebooks", lambda: graph.results["cluster"] + graph.results["workflows"], depends_on=["cluster", "workflows"])
+    start = time.time()
+    results = graph.run()
+    #cluster and pipelines => workflows run in parallel: the install takes the critical path, not the sum.
+    assert time.time() - start < 0.45
+    assert results["notebooks"] == "cpw"
+    assert order.index("pipelines") < order.index("cluster")
+    assert 0.25 < graph.get_critical_path_duration() < 0.45
+
+
+def test_task_graph_stops_on_first_error():
+    graph = TaskGraph(max_workers=2)
+    executed = []
+    def fail():
+        raise ValueError("folder already exists")
+    graph.add("folder_check", fail)
+    graph.add("notebooks", lambda: executed.append("notebooks"), depends_on=["folder_check"])
+    with pytest.raises(ValueError, match="folder already exists"):
+        graph.run()
+    assert executed == []
+
+
+def test_task_graph_rejects_invalid_dependencies():
+    graph = TaskGraph().add("a", lambda: 1, depends_on=["b"]).add("b", lambda: 2, depends_on=["a"])
+    with pytest.raises(Exception, match="Circular dependency"):
+        graph.run()
+    with pytest.raises(Exception, match="unknown task"):
+        TaskGraph().add("a", lambda: 1, depends_on=["missing"]).run()